@@ -0,0 +1,287 @@
+"""In-process stand-ins for the YouTube Data API and youtube_transcript_api, answering from a synthetic corpus
+(synthetic_corpus.py) after a configurable simulated latency.
+
+The responses have the shape of the real ones for the calls the scrapers make (search, videos, channels,
+commentThreads and playlistItems list calls, transcript listing and fetching), so the scrapers' own parsing and
+SQLite code runs unchanged:
+
+    clients = FakeYouTubeClients(FakeYouTube('synthetic_corpus/corpus.db', latency=0.05))
+    hydrate_videos(clients, video_ids, collected_at, keyword)
+"""
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scrapers'))
+from youtube_client import YouTubeClients
+
+LATENCY = 0.05 # Mean simulated seconds per API call
+JITTER = 0.5 # Latency is drawn uniformly from LATENCY * (1 +/- JITTER)
+TRANSCRIPT_SEGMENT_WORDS = 12 # Words per fetched transcript segment
+
+
+class FakeRequest:
+    """What resource.list(...) returns: executing it waits for the simulated latency, then answers."""
+
+    def __init__(self, backend, method, params):
+        self.backend = backend
+        self.method = method
+        self.params = params
+
+    def execute(self, *args, **kwargs):
+        self.backend.wait(self.method)
+        return getattr(self.backend, self.method.replace('.', '_'))(**self.params)
+
+
+class FakeResource:
+    def __init__(self, backend, name):
+        self.backend = backend
+        self.name = name
+
+    def list(self, **params):
+        return FakeRequest(self.backend, f'{self.name}.list', params)
+
+    def list_next(self, request, response):
+        """Request for the next page, or None after the last one (as in googleapiclient)."""
+        token = response.get('nextPageToken')
+        if not token:
+            return None
+        return FakeRequest(self.backend, request.method, dict(request.params, pageToken=token))
+
+
+def _page(offset, size, total):
+    """(offset, nextPageToken) for an offset-based page token."""
+    offset = int(offset or 0)
+    return offset, str(offset + size) if offset + size < total else None
+
+
+def _statistics(**counts):
+    # The API returns counts as strings and leaves hidden ones out
+    return {name: str(value) for name, value in counts.items() if value not in (None, 'N/A')}
+
+
+def _iso_duration(duration):
+    hours, minutes, seconds = (int(part) for part in duration.split(':'))
+    return f"PT{hours}H{minutes}M{seconds}S" if hours else f"PT{minutes}M{seconds}S"
+
+
+class FakeYouTube:
+    """The `youtube` client of YouTubeClients, serving the corpus database. Counts calls per method."""
+
+    def __init__(self, db_path, latency=LATENCY, jitter=JITTER, seed=0):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.calls = Counter()
+        self.waited = 0.0
+
+    def wait(self, method):
+        with self.lock:
+            delay = self.latency * self.random.uniform(1 - self.jitter, 1 + self.jitter)
+            self.calls[method] += 1
+            self.waited += delay
+        if delay > 0:
+            time.sleep(delay)
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def __getattr__(self, name):
+        if name in ('search', 'videos', 'channels', 'commentThreads', 'playlistItems'):
+            return lambda: FakeResource(self, name)
+        raise AttributeError(name)
+
+    def search_list(self, q, maxResults=5, pageToken=None, **params):
+        total = self.query("SELECT COUNT(*) FROM video_keywords WHERE keyword = ?", (q,))[0][0]
+        offset, token = _page(pageToken, maxResults, total)
+        rows = self.query("""
+            SELECT v.video_id, v.title, v.channel_title, v.published_at, v.channel_id
+            FROM video_keywords k JOIN videos v ON v.video_id = k.video_id
+            WHERE k.keyword = ? ORDER BY k.video_id LIMIT ? OFFSET ?
+        """, (q, maxResults, offset))
+        items = [{'kind': 'youtube#searchResult', 'id': {'kind': 'youtube#video', 'videoId': video_id},
+                  'snippet': {'title': title, 'channelTitle': channel_title, 'publishedAt': published_at,
+                              'channelId': channel_id}}
+                 for video_id, title, channel_title, published_at, channel_id in rows]
+        response = {'kind': 'youtube#searchListResponse', 'items': items,
+                    'pageInfo': {'totalResults': total, 'resultsPerPage': maxResults}}
+        if token:
+            response['nextPageToken'] = token
+        return response
+
+    def videos_list(self, id, part='snippet', **params):
+        video_ids = id.split(',')
+        rows = self.query(f"""
+            SELECT video_id, title, channel_title, published_at, description, tags, audio_language, textual_language,
+                   duration, definition, caption_availability, view_count, like_count, comment_count, channel_id
+            FROM videos WHERE video_id IN ({', '.join('?' * len(video_ids))})
+        """, video_ids)
+        items = []
+        for (video_id, title, channel_title, published_at, description, tags, audio_language, textual_language,
+             duration, definition, caption, views, likes, comments, channel_id) in rows:
+            snippet = {'publishedAt': published_at, 'channelId': channel_id, 'title': title,
+                       'description': description, 'channelTitle': channel_title, 'tags': tags.split(', ')}
+            if audio_language != 'N/A':
+                snippet['defaultAudioLanguage'] = audio_language
+            if textual_language != 'N/A':
+                snippet['defaultLanguage'] = textual_language
+            items.append({
+                'kind': 'youtube#video', 'id': video_id, 'snippet': snippet,
+                'contentDetails': {'duration': _iso_duration(duration), 'definition': definition, 'caption': caption},
+                'statistics': _statistics(viewCount=views, likeCount=likes, commentCount=comments),
+                'paidProductPlacementDetails': {'hasPaidProductPlacement': False},
+            })
+        return {'kind': 'youtube#videoListResponse', 'items': items}
+
+    def channels_list(self, id, part='snippet', **params):
+        channel_ids = id.split(',')
+        rows = self.query(f"""
+            SELECT channel_id, title, description, localized_title, localized_description, published_at, country,
+                   likes_playlist, uploads_playlist, view_count, subscriber_count, video_count
+            FROM channels WHERE channel_id IN ({', '.join('?' * len(channel_ids))})
+        """, channel_ids)
+        items = []
+        for (channel_id, title, description, localized_title, localized_description, published_at, country,
+             likes, uploads, views, subscribers, videos) in rows:
+            snippet = {'title': title, 'description': description, 'publishedAt': published_at,
+                       'localized': {'title': localized_title, 'description': localized_description}}
+            if country:
+                snippet['country'] = country
+            items.append({
+                'kind': 'youtube#channel', 'id': channel_id, 'snippet': snippet,
+                'contentDetails': {'relatedPlaylists': {'likes': likes, 'uploads': uploads}},
+                'statistics': _statistics(viewCount=views, subscriberCount=subscribers, videoCount=videos),
+            })
+        return {'kind': 'youtube#channelListResponse', 'items': items}
+
+    def commentThreads_list(self, videoId, maxResults=20, pageToken=None, **params):
+        total = self.query("SELECT COUNT(*) FROM comments WHERE video_id = ?", (videoId,))[0][0]
+        offset, token = _page(pageToken, maxResults, total)
+        threads = self.query("""
+            SELECT thread_id, top_level_text, top_level_like_count, top_level_published_at, top_level_updated_at,
+                   total_reply_count
+            FROM comments WHERE video_id = ? ORDER BY top_level_published_at DESC LIMIT ? OFFSET ?
+        """, (videoId, maxResults, offset))
+        items = []
+        for thread_id, text, likes, published_at, updated_at, reply_count in threads:
+            item = {'kind': 'youtube#commentThread', 'id': thread_id, 'snippet': {
+                'videoId': videoId, 'totalReplyCount': reply_count,
+                'topLevelComment': {'id': thread_id, 'snippet': {
+                    'textDisplay': text, 'likeCount': likes, 'publishedAt': published_at, 'updatedAt': updated_at}},
+            }}
+            if reply_count:
+                replies = self.query("""
+                    SELECT reply_id, reply_text, reply_like_count, reply_published_at, reply_updated_at
+                    FROM replies WHERE thread_id = ? ORDER BY reply_published_at LIMIT 5
+                """, (thread_id,))
+                item['replies'] = {'comments': [
+                    {'id': reply_id, 'snippet': {'textDisplay': reply_text, 'likeCount': reply_likes,
+                                                 'publishedAt': reply_published, 'updatedAt': reply_updated}}
+                    for reply_id, reply_text, reply_likes, reply_published, reply_updated in replies
+                ]}
+            items.append(item)
+        response = {'kind': 'youtube#commentThreadListResponse', 'items': items}
+        if token:
+            response['nextPageToken'] = token
+        return response
+
+    def playlistItems_list(self, playlistId, maxResults=5, pageToken=None, **params):
+        channel_id = 'UC' + playlistId[2:]
+        total = self.query("SELECT COUNT(*) FROM videos WHERE channel_id = ?", (channel_id,))[0][0]
+        offset, token = _page(pageToken, maxResults, total)
+        rows = self.query("""
+            SELECT video_id, published_at FROM videos WHERE channel_id = ?
+            ORDER BY published_at DESC LIMIT ? OFFSET ?
+        """, (channel_id, maxResults, offset))
+        response = {'kind': 'youtube#playlistItemListResponse', 'items': [
+            {'kind': 'youtube#playlistItem', 'contentDetails': {'videoId': video_id, 'videoPublishedAt': published_at}}
+            for video_id, published_at in rows
+        ]}
+        if token:
+            response['nextPageToken'] = token
+        return response
+
+    def close(self):
+        self.conn.close()
+
+
+class FakeYouTubeClients(YouTubeClients):
+    """YouTubeClients whose client is a FakeYouTube; key rotation works as usual over placeholder keys."""
+
+    def __init__(self, backend, api_keys=('fake-key',)):
+        super().__init__(list(api_keys))
+        self.backend = backend
+
+    @property
+    def youtube(self):
+        return self.backend
+
+
+class FakeTranscript:
+    def __init__(self, api, video_id, language_code, text, is_generated, is_translatable=True):
+        self.api = api
+        self.video_id = video_id
+        self.language_code = language_code
+        self.language = {'en': 'English'}.get(language_code, language_code)
+        self.text = text
+        self.is_generated = is_generated
+        self.is_translatable = is_translatable
+        self.translation_languages = [{'language': 'English', 'language_code': 'en'}] if is_translatable else []
+
+    def fetch(self):
+        self.api.wait('transcript.fetch')
+        words = self.text.split()
+        return [{'text': ' '.join(words[i:i + TRANSCRIPT_SEGMENT_WORDS]), 'start': i * 0.4,
+                 'duration': TRANSCRIPT_SEGMENT_WORDS * 0.4} for i in range(0, len(words), TRANSCRIPT_SEGMENT_WORDS)]
+
+    def translate(self, language_code):
+        return FakeTranscript(self.api, self.video_id, language_code, self.text, self.is_generated, False)
+
+
+class FakeTranscriptList:
+    def __init__(self, video_id, transcripts):
+        self.video_id = video_id
+        self.transcripts = transcripts
+
+    def __iter__(self):
+        return iter(self.transcripts)
+
+    def find_transcript(self, language_codes):
+        for code in language_codes:
+            for transcript in self.transcripts:
+                if transcript.language_code == code:
+                    return transcript
+        from youtube_transcript_api._errors import NoTranscriptFound
+        raise NoTranscriptFound(self.video_id, language_codes, self)
+
+
+class FakeTranscriptApi:
+    """Replaces YouTubeTranscriptApi in scrape_transcripts.py. Videos with a row in the corpus transcripts table
+    have one track (in the video's audio language, English when unset); the others raise TranscriptsDisabled."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def wait(self, call):
+        self.backend.wait(call)
+
+    def list_transcripts(self, video_id, proxies=None, cookies=None):
+        self.wait('transcript.list')
+        rows = self.backend.query("""
+            SELECT t.transcript, t.type, t.translatable, v.audio_language
+            FROM transcripts t JOIN videos v ON v.video_id = t.video_id WHERE t.video_id = ?
+        """, (video_id,))
+        if not rows:
+            from youtube_transcript_api._errors import TranscriptsDisabled
+            raise TranscriptsDisabled(video_id)
+        text, kind, translatable, language = rows[0]
+        language = 'en' if language in (None, 'N/A') else language.split('-')[0]
+        return FakeTranscriptList(video_id, [FakeTranscript(self, video_id, language, text,
+                                                            kind == 'auto-generated', translatable == 'true')])
@@ -0,0 +1,495 @@
+"""End-to-end benchmarks of the pipeline on a synthetic corpus, with results saved as JSON for comparison.
+
+Scenarios (run in this order; `--scenarios` selects some):
+- generate: builds the corpus with synthetic_corpus.py (skipped when a corpus with the same parameters exists);
+- scrape_videos, scrape_channels, scrape_comments, scrape_transcripts: the scrapers' own functions against the
+  fake backends of fake_backends.py, writing to a scratch database. Throttle and backoff sleeps are counted but
+  not slept (--keep-sleeps sleeps them); the simulated API latency is reported apart from the client-side time;
+- db_writes: comment and reply inserts committed row by row (as scrape_comments.py does) and in one executemany;
+- sampling: the keyword-weighted training sample of gpt_classifier_for_training_data.py;
+- classifier_training: interaction features, StandardScaler and logistic regression (and XGBoost if installed)
+  on the corpus embeddings, as in classification_gte-Qwen2-7B-instruct.ipynb;
+- classifier_inference: scoring every embedding with the sklearn pipeline and with numpy_scorer.ScoringModel;
+- coverage_statistics: per-subtopic medians of sql_subtopic_coverage.ipynb (one query per video) and the same
+  from one join.
+
+    python run_benchmarks.py --videos 100000 --latency 0.05
+    python run_benchmarks.py --compare results/20250115-120000.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ('scrapers', 'filtering', 'sql_subtopics_classification'):
+    sys.path.insert(0, os.path.join(ROOT, folder))
+
+import synthetic_corpus
+from category_terms import category_terms
+from fake_backends import FakeTranscriptApi, FakeYouTube, FakeYouTubeClients, LATENCY
+from instrumentation import metrics
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+SAMPLE_VIDEOS = 200 # Videos per scraper scenario
+SEARCH_KEYWORDS = 3 # Keywords paged by scrape_videos
+SEARCH_PAGES = 4 # search.list pages per keyword
+ROW_COMMIT_ROWS = 2000 # Rows inserted with a commit each in db_writes (fsync-bound)
+TRAINING_SAMPLE = 3000 # Rows drawn by the sampling scenario, as in gpt_classifier_for_training_data.py
+SPLIT = (0.7, 0.15) # Train and validation shares; the rest is the test split
+SCENARIOS = ['generate', 'scrape_videos', 'scrape_channels', 'scrape_comments', 'scrape_transcripts', 'db_writes',
+             'sampling', 'classifier_training', 'classifier_inference', 'coverage_statistics']
+
+
+class Skipped(Exception):
+    """A scenario that cannot run here (missing optional dependency)."""
+
+
+class Context:
+    """State shared by the scenarios of one run: paths, options, the fake backend and trained models."""
+
+    def __init__(self, args, workdir):
+        self.args = args
+        self.corpus_dir = args.corpus
+        self.corpus_db = os.path.join(args.corpus, synthetic_corpus.DATABASE_FILE)
+        self.workdir = workdir
+        self.models = {}
+        self._sample = None
+
+    def backend(self):
+        return FakeYouTube(self.corpus_db, latency=self.args.latency, seed=self.args.seed)
+
+    def scratch_db(self, name):
+        path = os.path.join(self.workdir, f'{name}.db')
+        if os.path.exists(path):
+            os.remove(path)
+        return sqlite3.connect(path, check_same_thread=False)
+
+    def sample_video_ids(self):
+        """The same `--sample-videos` video_ids for every scraper scenario."""
+        if self._sample is None:
+            conn = sqlite3.connect(self.corpus_db)
+            ids = [row[0] for row in conn.execute("SELECT video_id FROM videos ORDER BY video_id")]
+            conn.close()
+            rng = np.random.default_rng(self.args.seed)
+            self._sample = [ids[i] for i in rng.choice(len(ids), min(self.args.sample_videos, len(ids)), replace=False)]
+        return self._sample
+
+
+def api_details(backend, elapsed):
+    """API calls made, simulated latency and the time spent outside of it (parsing, SQLite, Python)."""
+    return {'api_calls': dict(backend.calls), 'simulated_latency_seconds': round(backend.waited, 4),
+            'client_seconds': round(elapsed - backend.waited, 4)}
+
+
+def scenario_generate(ctx):
+    args = ctx.args
+    parameters = synthetic_corpus.corpus_parameters(args, args.videos, args.embedding_dim, args.seed)
+    info = synthetic_corpus.load_info(ctx.corpus_dir)
+    if info is not None and info['parameters'] == parameters and not args.regenerate:
+        raise Skipped(f"corpus in {ctx.corpus_dir} already has these parameters (--regenerate rebuilds it)")
+    counts = synthetic_corpus.generate(ctx.corpus_dir, args.videos, args.embedding_dim, args.seed, args)
+    return {'items': counts['videos'], 'rows': counts}
+
+
+def scenario_scrape_videos(ctx):
+    from scrape_videos import create_table, hydrate_videos, insert_results, search_page, table_name_for
+    backend = ctx.backend()
+    clients = FakeYouTubeClients(backend)
+    conn = ctx.scratch_db('scrape_videos')
+    cursor = conn.cursor()
+    collected_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    hydrated = 0
+    start = time.perf_counter()
+    for keyword in synthetic_corpus.KEYWORDS[:ctx.args.search_keywords]:
+        create_table(cursor, keyword)
+        page_token = None
+        for _ in range(ctx.args.search_pages):
+            _, video_ids, page_token = search_page(clients, keyword, page_token)
+            rows = list(hydrate_videos(clients, video_ids, collected_at, keyword).values())
+            if rows:
+                insert_results(cursor, table_name_for(keyword), rows)
+                conn.commit()
+            hydrated += len(rows)
+            if not page_token:
+                break
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return {'items': hydrated, 'seconds': elapsed, **api_details(backend, elapsed)}
+
+
+def scenario_scrape_channels(ctx):
+    from scrape_channels import create_tables, fetch_channel_info, save_channel
+    backend = ctx.backend()
+    clients = FakeYouTubeClients(backend)
+    conn = ctx.scratch_db('scrape_channels')
+    video_ids = ctx.sample_video_ids()
+    conn.execute("CREATE TABLE videos (video_id TEXT PRIMARY KEY)")
+    conn.executemany("INSERT INTO videos VALUES (?)", [(video_id,) for video_id in video_ids])
+    create_tables(conn.cursor())
+    conn.commit()
+    saved = 0
+    start = time.perf_counter()
+    for video_id in video_ids:
+        channel_data = fetch_channel_info(clients, video_id)
+        if channel_data:
+            save_channel(conn, video_id, channel_data)
+            saved += 1
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return {'items': saved, 'seconds': elapsed, **api_details(backend, elapsed)}
+
+
+def scenario_scrape_comments(ctx):
+    from scrape_comments import create_tables, fetch_comments
+    backend = ctx.backend()
+    clients = FakeYouTubeClients(backend)
+    conn = ctx.scratch_db('scrape_comments')
+    create_tables(conn.cursor())
+    start = time.perf_counter()
+    for video_id in ctx.sample_video_ids():
+        fetch_comments(clients, conn, video_id)
+    elapsed = time.perf_counter() - start
+    rows = sum(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ('comments', 'replies'))
+    conn.close()
+    return {'items': rows, 'seconds': elapsed, 'videos': len(ctx.sample_video_ids()), **api_details(backend, elapsed)}
+
+
+def scenario_scrape_transcripts(ctx):
+    try:
+        import scrape_transcripts
+    except ImportError as e:
+        raise Skipped(f"scrape_transcripts.py cannot be imported: {e}")
+    backend = ctx.backend()
+    scrape_transcripts.YouTubeTranscriptApi = FakeTranscriptApi(backend)
+    conn = ctx.scratch_db('scrape_transcripts')
+    scrape_transcripts.create_tables(conn.cursor())
+    start = time.perf_counter()
+    for index, video_id in enumerate(ctx.sample_video_ids()):
+        scrape_transcripts.fetch_transcript(conn, video_id, index)
+    elapsed = time.perf_counter() - start
+    rows = conn.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0]
+    conn.close()
+    return {'items': rows, 'seconds': elapsed, 'videos': len(ctx.sample_video_ids()), **api_details(backend, elapsed)}
+
+
+def scenario_db_writes(ctx):
+    from scrape_comments import create_tables
+    source = sqlite3.connect(ctx.corpus_db)
+    comment_sql = "INSERT OR REPLACE INTO comments VALUES (?, ?, ?, ?, ?, ?, ?)"
+    reply_sql = "INSERT OR REPLACE INTO replies VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+    conn = ctx.scratch_db('db_writes_rows')
+    create_tables(conn.cursor())
+    subset = source.execute("SELECT * FROM comments LIMIT ?", (ctx.args.row_commit_rows,)).fetchall()
+    start = time.perf_counter()
+    for row in subset:
+        conn.execute(comment_sql, row)
+        conn.commit()
+    row_commit = time.perf_counter() - start
+    conn.close()
+
+    # Rows are streamed from the corpus database into executemany, so memory stays flat at any scale
+    conn = ctx.scratch_db('db_writes_bulk')
+    create_tables(conn.cursor())
+    start = time.perf_counter()
+    with conn:
+        conn.executemany(comment_sql, source.execute("SELECT * FROM comments"))
+        conn.executemany(reply_sql, source.execute("SELECT * FROM replies"))
+    bulk = time.perf_counter() - start
+    rows = sum(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ('comments', 'replies'))
+    conn.close()
+    source.close()
+    return {'items': rows, 'seconds': bulk, 'row_commit_rows': len(subset),
+            'row_commit_rows_per_second': round(len(subset) / max(row_commit, 1e-9), 1),
+            'executemany_rows_per_second': round(rows / max(bulk, 1e-9), 1)}
+
+
+def scenario_sampling(ctx):
+    start = time.perf_counter()
+    conn = sqlite3.connect(ctx.corpus_db)
+    df = pd.read_sql_query("""
+        SELECT v.video_id, v.title, v.description, t.transcript, v.keywords
+        FROM videos v LEFT JOIN transcripts t ON v.video_id = t.video_id
+        WHERE t.transcript IS NOT NULL
+    """, conn)
+    conn.close()
+    loaded = time.perf_counter() - start
+    keyword_counts = Counter(k.strip() for keywords in df['keywords'] if keywords for k in keywords.split(','))
+    df['sampling_weight'] = df['keywords'].apply(
+        lambda x: sum(1 / keyword_counts[k.strip()] for k in x.split(',') if k.strip() in keyword_counts) if x else 0)
+    df['sampling_weight'] /= df['sampling_weight'].sum()
+    # Weighted sampling without replacement needs headroom, which small corpora do not have
+    sample = df.sample(n=min(len(df) // 2, ctx.args.training_sample), weights='sampling_weight', random_state=42)
+    elapsed = time.perf_counter() - start
+    return {'items': len(df), 'seconds': elapsed, 'load_seconds': round(loaded, 4), 'sampled': len(sample)}
+
+
+def load_embeddings(ctx):
+    """Embeddings (memory-mapped) and labels in row order, split like the notebook: train, val, test."""
+    embeddings = np.load(os.path.join(ctx.corpus_dir, synthetic_corpus.EMBEDDINGS_FILE), mmap_mode='r')
+    with open(os.path.join(ctx.corpus_dir, synthetic_corpus.MAPPING_FILE), 'r') as f:
+        video_ids = [line.strip() for line in f]
+    conn = sqlite3.connect(ctx.corpus_db)
+    labels = dict(conn.execute("SELECT video_id, predicted_label FROM videos"))
+    conn.close()
+    y = np.array([labels[video_id] for video_id in video_ids], dtype=int)
+    order = np.random.default_rng(ctx.args.seed).permutation(len(y))
+    train_end, val_end = int(len(y) * SPLIT[0]), int(len(y) * (SPLIT[0] + SPLIT[1]))
+    return embeddings, y, np.sort(order[:train_end]), np.sort(order[train_end:val_end]), np.sort(order[val_end:])
+
+
+def train_models(ctx):
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import roc_auc_score
+    from sklearn.preprocessing import StandardScaler
+    from export_scoring_model import create_interaction_features
+
+    embeddings, y, train, val, test = load_embeddings(ctx)
+    timings = {}
+    start = time.perf_counter()
+    X_train = create_interaction_features(np.asarray(embeddings[train]))
+    scaler = StandardScaler().fit(X_train)
+    X_train = scaler.transform(X_train)
+    timings['features_seconds'] = round(time.perf_counter() - start, 4)
+
+    classifiers = {'logistic_regression': lambda: LogisticRegression(max_iter=1000)}
+    try:
+        from xgboost import XGBClassifier
+        classifiers['xgboost'] = lambda: XGBClassifier(n_estimators=100, max_depth=4, learning_rate=0.1,
+                                                       tree_method='hist', n_jobs=os.cpu_count())
+    except ImportError:
+        timings['xgboost'] = 'skipped: xgboost is not installed'
+    X_test = scaler.transform(create_interaction_features(np.asarray(embeddings[test])))
+    for name, build in classifiers.items():
+        start = time.perf_counter()
+        model = build().fit(X_train, y[train])
+        timings[f'{name}_seconds'] = round(time.perf_counter() - start, 4)
+        timings[f'{name}_test_roc_auc'] = round(float(roc_auc_score(y[test], model.predict_proba(X_test)[:, 1])), 4)
+        ctx.models[name] = model
+    ctx.scaler = scaler
+    return len(train), timings
+
+
+def scenario_classifier_training(ctx):
+    start = time.perf_counter()
+    rows, timings = train_models(ctx)
+    return {'items': rows, 'seconds': time.perf_counter() - start, **timings}
+
+
+def scenario_classifier_inference(ctx):
+    from export_scoring_model import INTERACTION, compile_model, create_interaction_features
+    from numpy_scorer import CHUNK_SIZE, FORMAT_VERSION, ScoringModel
+    if not ctx.models:
+        train_models(ctx)
+    embeddings = np.load(os.path.join(ctx.corpus_dir, synthetic_corpus.EMBEDDINGS_FILE), mmap_mode='r')
+    details = {}
+    total = 0.0
+    for name, model in ctx.models.items():
+        start = time.perf_counter()
+        sklearn_probas = np.concatenate([
+            model.predict_proba(ctx.scaler.transform(create_interaction_features(np.asarray(embeddings[i:i + CHUNK_SIZE]))))[:, 1]
+            for i in range(0, len(embeddings), CHUNK_SIZE)
+        ])
+        sklearn_seconds = time.perf_counter() - start
+
+        header, arrays = compile_model(model)
+        arrays.update(scaler_mean=ctx.scaler.mean_, scaler_scale=ctx.scaler.scale_)
+        header.update(format_version=FORMAT_VERSION, model_class=type(model).__name__,
+                      interaction=list(INTERACTION), threshold=0.5)
+        scorer = ScoringModel(header, arrays)
+        start = time.perf_counter()
+        numpy_probas = np.concatenate([scorer.predict_proba(embeddings[i:i + CHUNK_SIZE])
+                                       for i in range(0, len(embeddings), CHUNK_SIZE)])
+        numpy_seconds = time.perf_counter() - start
+        total += sklearn_seconds + numpy_seconds
+        details[name] = {
+            'sklearn_rows_per_second': round(len(embeddings) / max(sklearn_seconds, 1e-9), 1),
+            'numpy_scorer_rows_per_second': round(len(embeddings) / max(numpy_seconds, 1e-9), 1),
+            'max_probability_difference': float(np.abs(sklearn_probas - numpy_probas).max()),
+        }
+    return {'items': len(embeddings) * len(ctx.models), 'seconds': total, 'models': details}
+
+
+def coverage_rows(rows):
+    """Notebook conversions: counts that do not parse are skipped, durations become minutes."""
+    views, likes, comments, durations = [], [], [], []
+    for view_count, like_count, comment_count, duration in rows:
+        for values, value in ((views, view_count), (likes, like_count), (comments, comment_count)):
+            try:
+                if value is not None:
+                    values.append(int(value))
+            except ValueError:
+                pass
+        if duration:
+            parts = duration.split(':')
+            try:
+                if len(parts) == 3:
+                    h, m, s = map(int, parts)
+                    durations.append(h * 60 + m + s / 60)
+                elif len(parts) == 2:
+                    m, s = map(int, parts)
+                    durations.append(m + s / 60)
+            except ValueError:
+                pass
+    median = lambda values: statistics.median(values) if values else None
+    return {'median_view': median(views), 'median_like': median(likes), 'median_comment': median(comments),
+            'median_duration_min': median(durations)}
+
+
+def scenario_coverage_statistics(ctx):
+    start = time.perf_counter()
+    category_videos = defaultdict(list)
+    with open(os.path.join(ctx.corpus_dir, synthetic_corpus.SUBTOPICS_FILE), 'r', encoding='utf-8') as f:
+        for line in f:
+            data = json.loads(line)
+            for category in data.get('matching_categories', []):
+                if category in category_terms:
+                    category_videos[category].append(data.get('video_id'))
+    parsed = time.perf_counter() - start
+
+    # sql_subtopic_coverage.ipynb cell 5: one SELECT per (category, video)
+    start = time.perf_counter()
+    conn = sqlite3.connect(ctx.corpus_db)
+    per_video = {}
+    for category, video_ids in category_videos.items():
+        rows = []
+        for video_id in video_ids:
+            row = conn.execute("SELECT view_count, like_count, comment_count, duration FROM videos WHERE video_id = ?",
+                               (video_id,)).fetchone()
+            if row:
+                rows.append(row)
+        per_video[category] = coverage_rows(rows)
+    per_video_seconds = time.perf_counter() - start
+
+    # The same statistics from one join against a temporary (category, video_id) table
+    start = time.perf_counter()
+    conn.execute("CREATE TEMP TABLE video_categories (category TEXT, video_id TEXT)")
+    conn.executemany("INSERT INTO video_categories VALUES (?, ?)",
+                     [(category, video_id) for category, video_ids in category_videos.items() for video_id in video_ids])
+    grouped = defaultdict(list)
+    for category, *row in conn.execute("""
+        SELECT c.category, v.view_count, v.like_count, v.comment_count, v.duration
+        FROM video_categories c JOIN videos v ON v.video_id = c.video_id
+    """):
+        grouped[category].append(row)
+    joined = {category: coverage_rows(rows) for category, rows in grouped.items()}
+    join_seconds = time.perf_counter() - start
+    conn.close()
+
+    lookups = sum(len(video_ids) for video_ids in category_videos.values())
+    return {'items': lookups, 'seconds': parsed + per_video_seconds, 'parse_seconds': round(parsed, 4),
+            'per_video_query_seconds': round(per_video_seconds, 4), 'join_seconds': round(join_seconds, 4),
+            'categories': len(category_videos), 'results_match': per_video == joined}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    versions = {}
+    for module in ('numpy', 'pandas', 'sklearn', 'xgboost'):
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            versions[module] = None
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+            'sqlite': sqlite3.sqlite_version, 'git_commit': git_commit(), 'packages': versions}
+
+
+def run_scenario(ctx, name):
+    start = time.perf_counter()
+    try:
+        result = globals()[f'scenario_{name}'](ctx)
+    except Skipped as e:
+        return {'status': 'skipped', 'reason': str(e)}
+    except ImportError as e:
+        return {'status': 'skipped', 'reason': f"missing dependency: {e}"}
+    except Exception as e:
+        return {'status': 'failed', 'error': f"{type(e).__name__}: {e}", 'traceback': traceback.format_exc()}
+    seconds = result.pop('seconds', time.perf_counter() - start)
+    items = result.pop('items')
+    return {'status': 'ok', 'seconds': round(seconds, 4), 'items': items,
+            'items_per_second': round(items / max(seconds, 1e-9), 1), **result}
+
+
+def compare(results, previous_path):
+    """Print each scenario's time against a previous results file (ratio > 1 is slower)."""
+    with open(previous_path, 'r') as f:
+        previous = json.load(f)
+    print(f"\nCompared with {previous_path} ({previous['created_at']}, commit {previous['environment']['git_commit']}):")
+    for name, result in results['scenarios'].items():
+        before = previous['scenarios'].get(name, {})
+        if result['status'] != 'ok' or before.get('status') != 'ok':
+            continue
+        ratio = result['seconds'] / max(before['seconds'], 1e-9)
+        print(f"  {name:22s} {before['seconds']:9.3f}s -> {result['seconds']:9.3f}s  x{ratio:.2f}"
+              f"{'  (different item count)' if before['items'] != result['items'] else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the end-to-end benchmarks on a synthetic corpus.")
+    synthetic_corpus.add_corpus_arguments(parser)
+    parser.add_argument('--corpus', default=os.path.join(tempfile.gettempdir(), synthetic_corpus.CORPUS_DIR))
+    parser.add_argument('--regenerate', action='store_true', help="Rebuild the corpus even if it matches")
+    parser.add_argument('--scenarios', nargs='+', default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument('--latency', type=float, default=LATENCY, help="Mean simulated seconds per API call")
+    parser.add_argument('--keep-sleeps', action='store_true', help="Sleep the scrapers' throttle and backoff delays")
+    parser.add_argument('--sample-videos', type=int, default=SAMPLE_VIDEOS)
+    parser.add_argument('--search-keywords', type=int, default=SEARCH_KEYWORDS)
+    parser.add_argument('--search-pages', type=int, default=SEARCH_PAGES)
+    parser.add_argument('--row-commit-rows', type=int, default=ROW_COMMIT_ROWS)
+    parser.add_argument('--training-sample', type=int, default=TRAINING_SAMPLE)
+    parser.add_argument('--results', default=None, help=f"Results file (default: {RESULTS_DIR}/<timestamp>.json)")
+    parser.add_argument('--compare', default=None, help="Previous results file to compare with")
+    args = parser.parse_args()
+
+    if not args.keep_sleeps:
+        metrics.sleep = lambda seconds, reason: metrics.inc('sleep_seconds_total', seconds, reason=reason)
+    os.makedirs(args.corpus, exist_ok=True)
+    if 'generate' not in args.scenarios and synthetic_corpus.load_info(args.corpus) is None:
+        args.scenarios = ['generate'] + args.scenarios
+
+    results = {'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'environment': environment(),
+               'config': vars(args), 'scenarios': {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        ctx = Context(args, workdir)
+        for name in [name for name in SCENARIOS if name in args.scenarios]:
+            result = run_scenario(ctx, name)
+            results['scenarios'][name] = result
+            if result['status'] == 'ok':
+                print(f"{name:22s} {result['seconds']:9.3f}s  {result['items']:>9} items  "
+                      f"{result['items_per_second']:>12.1f}/s")
+            else:
+                print(f"{name:22s} {result['status']}: {result.get('reason') or result.get('error')}")
+    results['corpus'] = synthetic_corpus.load_info(args.corpus)
+    results['sleep_seconds_skipped'] = 0 if args.keep_sleeps else metrics.total('sleep_seconds_total')
+
+    path = args.results or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {path}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""Synthetic corpus with the layout of the real dataset, for benchmarks that cannot use the live API or the
+private ds_edu_videos.db.
+
+It writes, under one output directory:
+- corpus.db: videos (keyword-table columns plus channel_id, predicted_label and confidence), channels,
+  comments, replies and transcripts, with the columns the scrapers create, and a video_keywords table that the
+  fake search backend (fake_backends.py) pages through;
+- video_embeddings.npy and video_id_mapping.txt, laid out like filtering/embeddings_gte-Qwen2-7B-instruct/
+  and separable by the relevance label stored in videos.predicted_label (float32, EMBEDDING_DIM wide);
+- subtopics.jsonl: records like sql_subtopics_classification_results_qwen3.jsonl for the relevant videos;
+- corpus.json: the generation parameters and row counts.
+
+Everything is drawn from one seed, in chunks, so 1M videos fit in memory.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql_subtopics_classification'))
+from category_terms import category_terms
+
+CORPUS_DIR = 'synthetic_corpus'
+DATABASE_FILE = 'corpus.db'
+EMBEDDINGS_FILE = 'video_embeddings.npy'
+MAPPING_FILE = 'video_id_mapping.txt'
+SUBTOPICS_FILE = 'subtopics.jsonl'
+INFO_FILE = 'corpus.json' # Parameters and row counts of the generated corpus
+VIDEOS = 10000 # Default scale; 10k to 1M
+VIDEOS_PER_CHANNEL = 25
+COMMENTS_PER_VIDEO = 5.0 # Poisson mean of top-level comments per video
+REPLIES_PER_COMMENT = 0.3 # Poisson mean of replies per top-level comment
+TRANSCRIPT_SHARE = 0.7 # Share of videos with a transcript
+TRANSCRIPT_WORDS = 300 # Words per transcript (real ones are longer; raise for I/O-heavy runs)
+RELEVANT_SHARE = 0.6 # Share of videos with predicted_label = 1
+EMBEDDING_DIM = 256 # The real store is 3584 wide
+MISSING_SHARE = 0.01 # Share of counts stored as 'N/A', as hydrate_videos does for hidden statistics
+CHUNK_SIZE = 20000 # Videos generated and written at a time
+SEED = 42
+
+ID_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+# search_keywords.json-style keywords, used for videos.keywords and the fake search backend
+KEYWORDS = ['SQL', 'SQL join', 'SQL subqueries', 'SQL group by', 'relational algebra', 'database normalization',
+            'transaction processing', 'concurrency control', 'data modeling', 'data warehousing', 'NoSQL database management systems',
+            'database optimization query optimization', 'data mining', 'data security', 'database recovery']
+LANGUAGES = ['en', 'en-US', 'en-GB', 'es', 'pt', 'hi', 'N/A']
+LANGUAGE_WEIGHTS = [0.45, 0.15, 0.05, 0.05, 0.05, 0.05, 0.2]
+INVALID_CATEGORIES = ['Database Design', 'Normalization'] # Off-list names the LLM sometimes returns
+
+
+def create_tables(conn):
+    """Tables with the columns created by scrape_videos.py (keyword tables, merged into videos),
+    scrape_channels.py, scrape_comments.py and scrape_transcripts.py."""
+    conn.executescript("""
+    CREATE TABLE IF NOT EXISTS videos (
+        video_id TEXT PRIMARY KEY, title TEXT, channel_title TEXT, published_at TEXT, description TEXT, tags TEXT,
+        audio_language TEXT, textual_language TEXT, duration TEXT, definition TEXT, caption_availability TEXT,
+        view_count INTEGER, like_count INTEGER, comment_count INTEGER, paid_product_placement TEXT,
+        collected_at TEXT, keywords TEXT, channel_id TEXT, predicted_label INTEGER, confidence REAL
+    );
+    CREATE TABLE IF NOT EXISTS channels (
+        channel_id TEXT PRIMARY KEY, title TEXT, description TEXT, localized_title TEXT, localized_description TEXT,
+        published_at TEXT, country TEXT, likes_playlist TEXT, uploads_playlist TEXT,
+        view_count INTEGER, subscriber_count INTEGER, video_count INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS comments (
+        thread_id TEXT PRIMARY KEY, video_id TEXT NOT NULL, top_level_text TEXT, top_level_like_count INTEGER,
+        top_level_published_at TEXT, top_level_updated_at TEXT, total_reply_count INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS replies (
+        reply_id TEXT PRIMARY KEY, thread_id TEXT NOT NULL, video_id TEXT NOT NULL, reply_text TEXT,
+        reply_like_count INTEGER, reply_published_at TEXT, reply_updated_at TEXT
+    );
+    CREATE TABLE IF NOT EXISTS transcripts (
+        video_id TEXT PRIMARY KEY, transcript TEXT, type TEXT, translatable TEXT
+    );
+    CREATE TABLE IF NOT EXISTS video_keywords (
+        keyword TEXT, video_id TEXT, PRIMARY KEY (keyword, video_id)
+    ) WITHOUT ROWID;
+    """)
+
+
+def create_indexes(conn):
+    # Lookups of the fake API backend; created after the bulk load
+    conn.executescript("""
+    CREATE INDEX IF NOT EXISTS idx_videos_channel ON videos (channel_id);
+    CREATE INDEX IF NOT EXISTS idx_comments_video ON comments (video_id);
+    CREATE INDEX IF NOT EXISTS idx_replies_thread ON replies (thread_id);
+    """)
+
+
+def random_ids(rng, n, length, prefix=''):
+    """n random YouTube-style ids of `length` characters from ID_ALPHABET."""
+    table = np.frombuffer(ID_ALPHABET.encode(), dtype='S1')
+    codes = rng.integers(0, len(ID_ALPHABET), size=(n, length))
+    return [prefix + s.decode() for s in table[codes].view(f'S{length}').ravel()]
+
+
+def random_timestamps(rng, n, start='2008-01-01', end='2025-01-01'):
+    seconds = rng.integers(np.datetime64(start, 's').astype(int), np.datetime64(end, 's').astype(int), size=n)
+    return [s + 'Z' for s in np.datetime_as_string(seconds.astype('datetime64[s]'), unit='s')]
+
+
+class TextGenerator:
+    """Word salad from a fixed vocabulary, with SQL index terms mixed into the text of relevant videos."""
+
+    def __init__(self, rng, vocabulary_size=5000):
+        syllables = ['da', 'ta', 'ba', 'se', 'que', 'ry', 'in', 'dex', 'lo', 'gic', 'ma', 'tri', 'on', 'al', 'ver', 'sa']
+        parts = rng.integers(0, len(syllables), size=(vocabulary_size, 3))
+        self.words = np.array([''.join(syllables[p] for p in row[:2 + i % 2]) for i, row in enumerate(parts)])
+        self.terms = np.array(sorted({term for terms in category_terms.values() for term in terms}))
+        self.rng = rng
+
+    def texts(self, n, words, relevant=None, term_share=0.15):
+        indices = self.rng.integers(0, len(self.words), size=(n, words))
+        tokens = self.words[indices].astype(object)
+        if relevant is not None:
+            mask = (self.rng.random((n, words)) < term_share) & np.asarray(relevant, dtype=bool)[:, None]
+            tokens[mask] = self.terms[self.rng.integers(0, len(self.terms), size=int(mask.sum()))]
+        return [' '.join(row) for row in tokens]
+
+
+def duration_string(seconds):
+    """str(timedelta) form stored by hydrate_videos, e.g. 0:12:05."""
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def maybe_missing(rng, values):
+    return ['N/A' if missing else int(v) for v, missing in zip(values, rng.random(len(values)) < MISSING_SHARE)]
+
+
+def generate_channels(conn, rng, text, n_channels):
+    channel_ids = random_ids(rng, n_channels, 22, prefix='UC')
+    titles = text.texts(n_channels, 3)
+    descriptions = text.texts(n_channels, 30)
+    published = random_timestamps(rng, n_channels, end='2022-01-01')
+    countries = rng.choice(['US', 'IN', 'GB', 'DE', 'BR', None], size=n_channels)
+    subscribers = rng.lognormal(8, 2.5, size=n_channels).astype(int)
+    conn.executemany("INSERT INTO channels VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [
+        (cid, titles[i], descriptions[i], titles[i], descriptions[i], published[i], countries[i],
+         'LL' + cid[2:], 'UU' + cid[2:], int(subscribers[i] * 40), int(subscribers[i]), 0)
+        for i, cid in enumerate(channel_ids)
+    ])
+    return channel_ids, titles
+
+
+def generate_chunk(conn, rng, text, video_ids, channel_ids, channel_titles, relevant, collected_at, args):
+    n = len(video_ids)
+    channel_index = rng.integers(0, len(channel_ids), size=n)
+    titles = text.texts(n, 8, relevant)
+    descriptions = text.texts(n, 60, relevant)
+    views = rng.lognormal(8, 2.5, size=n).astype(int)
+    likes = (views * rng.uniform(0.005, 0.05, size=n)).astype(int)
+    n_comments = rng.poisson(args.comments_per_video, size=n)
+    keywords = [', '.join(rng.choice(KEYWORDS, size=k, replace=False)) for k in rng.integers(1, 4, size=n)]
+    languages = rng.choice(LANGUAGES, size=n, p=LANGUAGE_WEIGHTS)
+    video_rows = [(
+        video_ids[i], titles[i], channel_titles[channel_index[i]], published, descriptions[i],
+        ', '.join(titles[i].split()[:4]), languages[i], languages[i] if i % 3 else 'N/A',
+        duration_string(int(rng.integers(60, 3 * 3600))), 'hd' if i % 4 else 'sd', 'true' if i % 2 else 'false',
+        view, like, comment, 'False', collected_at, keywords[i], channel_ids[channel_index[i]], int(relevant[i]),
+        None,
+    ) for i, (published, view, like, comment) in enumerate(zip(
+        random_timestamps(rng, n), maybe_missing(rng, views), maybe_missing(rng, likes), maybe_missing(rng, n_comments)))]
+    conn.executemany(f"INSERT INTO videos VALUES ({', '.join('?' * 20)})", video_rows)
+    conn.executemany("INSERT OR IGNORE INTO video_keywords VALUES (?, ?)",
+                     [(k, video_ids[i]) for i in range(n) for k in keywords[i].split(', ')])
+
+    has_transcript = rng.random(n) < args.transcript_share
+    transcript_rows = np.flatnonzero(has_transcript)
+    transcripts = text.texts(len(transcript_rows), args.transcript_words, relevant[transcript_rows])
+    conn.executemany("INSERT INTO transcripts VALUES (?, ?, ?, ?)", [
+        (video_ids[i], transcripts[j], 'auto-generated' if i % 3 else 'creator-uploaded', 'true')
+        for j, i in enumerate(transcript_rows)
+    ])
+
+    # Comments, with a pool of short texts so that exact and near duplicates occur as in real spam
+    comment_video = np.repeat(np.arange(n), n_comments)
+    n_threads = len(comment_video)
+    thread_ids = random_ids(rng, n_threads, 24, prefix='Ug')
+    pool = text.texts(2000, 12)
+    comment_texts = [pool[k] if k < len(pool) else f"{pool[k % len(pool)]} {k}" for k in rng.integers(0, 3 * len(pool), size=n_threads)]
+    n_replies = rng.poisson(args.replies_per_comment, size=n_threads)
+    published = random_timestamps(rng, n_threads, start='2015-01-01')
+    likes = rng.geometric(0.3, size=n_threads) - 1
+    conn.executemany("INSERT INTO comments VALUES (?, ?, ?, ?, ?, ?, ?)", [
+        (thread_ids[t], video_ids[comment_video[t]], comment_texts[t], int(likes[t]), published[t], published[t],
+         int(n_replies[t])) for t in range(n_threads)
+    ])
+    reply_thread = np.repeat(np.arange(n_threads), n_replies)
+    reply_suffixes = random_ids(rng, len(reply_thread), 22)
+    reply_texts = text.texts(len(reply_thread), 8)
+    reply_published = random_timestamps(rng, len(reply_thread), start='2015-01-01')
+    conn.executemany("INSERT INTO replies VALUES (?, ?, ?, ?, ?, ?, ?)", [
+        (f"{thread_ids[t]}.{reply_suffixes[r]}", thread_ids[t], video_ids[comment_video[t]], reply_texts[r], 0,
+         reply_published[r], reply_published[r]) for r, t in enumerate(reply_thread)
+    ])
+    return titles, n_threads, len(reply_thread), len(transcript_rows)
+
+
+def write_subtopics(f, rng, video_ids, titles, relevant):
+    """One JSONL record per relevant video; some with no category or an off-list one, as in the real output."""
+    categories = np.array(list(category_terms))
+    for i in np.flatnonzero(relevant):
+        draw = rng.random()
+        if draw < 0.05:
+            matching = []
+        else:
+            matching = list(rng.choice(categories, size=int(rng.integers(1, 4)), replace=False))
+            if draw < 0.08:
+                matching.append(str(rng.choice(INVALID_CATEGORIES)))
+        raw = json.dumps({'matching_categories': matching}, indent=2)
+        f.write(json.dumps({'video_id': video_ids[i], 'en_title': titles[i], 'matching_categories': matching,
+                            'raw_model_output': raw}) + '\n')
+
+
+def generate(output_dir=CORPUS_DIR, videos=VIDEOS, embedding_dim=EMBEDDING_DIM, seed=SEED, args=None):
+    """Write the corpus to `output_dir`; returns row counts. `args` carries the per-video ratios (argparse defaults)."""
+    if args is None:
+        parser = argparse.ArgumentParser()
+        add_corpus_arguments(parser)
+        args = parser.parse_args([])
+    os.makedirs(output_dir, exist_ok=True)
+    db_path = os.path.join(output_dir, DATABASE_FILE)
+    for name in (DATABASE_FILE, INFO_FILE):
+        if os.path.exists(os.path.join(output_dir, name)):
+            os.remove(os.path.join(output_dir, name))
+    rng = np.random.default_rng(seed)
+    text = TextGenerator(rng)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    create_tables(conn)
+
+    channel_ids, channel_titles = generate_channels(conn, rng, text, max(1, videos // VIDEOS_PER_CHANNEL))
+    embeddings = np.lib.format.open_memmap(os.path.join(output_dir, EMBEDDINGS_FILE), mode='w+',
+                                           dtype=np.float32, shape=(videos, embedding_dim))
+    direction = rng.normal(size=embedding_dim).astype(np.float32)
+    direction /= np.linalg.norm(direction)
+    collected_at = '2025-01-15 12:00:00'
+    counts = {'videos': videos, 'channels': len(channel_ids), 'comments': 0, 'replies': 0, 'transcripts': 0}
+    with open(os.path.join(output_dir, MAPPING_FILE), 'w') as mapping, \
+            open(os.path.join(output_dir, SUBTOPICS_FILE), 'w', encoding='utf-8') as subtopics:
+        for start in range(0, videos, CHUNK_SIZE):
+            n = min(CHUNK_SIZE, videos - start)
+            video_ids = random_ids(rng, n, 11)
+            relevant = rng.random(n) < RELEVANT_SHARE
+            titles, comments, replies, transcripts = generate_chunk(
+                conn, rng, text, video_ids, channel_ids, channel_titles, relevant, collected_at, args)
+            counts['comments'] += comments
+            counts['replies'] += replies
+            counts['transcripts'] += transcripts
+            # Unit-norm rows whose projection on one direction depends on the label, with overlapping classes
+            block = rng.normal(size=(n, embedding_dim)).astype(np.float32)
+            block += np.where(relevant, 1.0, -1.0).astype(np.float32)[:, None] * direction * 2.0
+            embeddings[start:start + n] = block / np.linalg.norm(block, axis=1, keepdims=True)
+            mapping.writelines(f"{video_id}\n" for video_id in video_ids)
+            write_subtopics(subtopics, rng, video_ids, titles, relevant)
+            conn.commit()
+    embeddings.flush()
+    create_indexes(conn)
+    conn.execute("UPDATE channels SET video_count = (SELECT COUNT(*) FROM videos v WHERE v.channel_id = channels.channel_id)")
+    conn.commit()
+    conn.close()
+    with open(os.path.join(output_dir, INFO_FILE), 'w') as f:
+        json.dump({'parameters': corpus_parameters(args, videos, embedding_dim, seed), 'counts': counts}, f, indent=2)
+    return counts
+
+
+def corpus_parameters(args, videos, embedding_dim, seed):
+    return {'videos': videos, 'embedding_dim': embedding_dim, 'seed': seed,
+            'comments_per_video': args.comments_per_video, 'replies_per_comment': args.replies_per_comment,
+            'transcript_share': args.transcript_share, 'transcript_words': args.transcript_words}
+
+
+def load_info(output_dir=CORPUS_DIR):
+    """corpus.json of a generated corpus, or None."""
+    path = os.path.join(output_dir, INFO_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def add_corpus_arguments(parser):
+    """Scale and shape options, shared with run_benchmarks.py."""
+    parser.add_argument('--videos', type=int, default=VIDEOS)
+    parser.add_argument('--comments-per-video', type=float, default=COMMENTS_PER_VIDEO)
+    parser.add_argument('--replies-per-comment', type=float, default=REPLIES_PER_COMMENT)
+    parser.add_argument('--transcript-share', type=float, default=TRANSCRIPT_SHARE)
+    parser.add_argument('--transcript-words', type=int, default=TRANSCRIPT_WORDS)
+    parser.add_argument('--embedding-dim', type=int, default=EMBEDDING_DIM)
+    parser.add_argument('--seed', type=int, default=SEED)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic corpus with the dataset's schemas.")
+    parser.add_argument('--output', default=CORPUS_DIR)
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    counts = generate(args.output, args.videos, args.embedding_dim, args.seed, args)
+    print(f"Generated {', '.join(f'{n} {table}' for table, n in counts.items())} in {args.output} "
+          f"({time.perf_counter() - start:.1f}s).")
+
+
+if __name__ == "__main__":
+    main()
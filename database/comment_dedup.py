@@ -0,0 +1,367 @@
+import argparse
+import re
+import sqlite3
+import string
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from fts_search import has_compressed_store
+
+DATABASE_FILE = 'ds_edu_videos.db' # SQLite database file with the scraped comments
+SHINGLE_SIZE = 5 # Bytes per shingle of the normalised text
+NUM_PERM = 128 # MinHash signature length
+BANDS = 16 # LSH bands of NUM_PERM // BANDS rows; candidates collide in at least one band
+SIMILARITY_THRESHOLD = 0.8 # Estimated Jaccard similarity above which two comments are near-duplicates
+CHUNK_SIZE = 5000 # Comments shingled, hashed and written per chunk
+PERM_BLOCK = 32 # Hash functions applied at once; bounds memory at shingles x PERM_BLOCK
+SEED = 1 # Fixes the hash functions; stored signatures are only comparable for the same SEED and NUM_PERM
+TOP_CLUSTERS = 10 # Largest clusters printed after a run
+
+# Deduplicated sources: table -> (key column, text column)
+TEXT_COLUMNS = {
+    'comments': ('thread_id', 'top_level_text'),
+    'replies': ('reply_id', 'reply_text'),
+}
+
+_rng = np.random.default_rng(SEED)
+# Multiply-add-shift universal hash functions ((a * x + b) mod 2**64) >> 32 of 32-bit shingle hashes x
+HASH_A = _rng.integers(0, 1 << 63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+HASH_B = _rng.integers(0, 1 << 63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2)
+BAND_MULTIPLIERS = _rng.integers(0, 1 << 63, size=NUM_PERM // BANDS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+SHINGLE_POWERS = np.uint64(257) ** np.arange(SHINGLE_SIZE - 1, -1, -1, dtype=np.uint64)
+
+URL_PATTERN = re.compile(r'https?://\S+')
+PUNCTUATION = str.maketrans('', '', string.punctuation)
+
+
+def create_tables(conn):
+    # One row per deduplicated comment or reply; cluster_id is the id of the cluster's earliest member
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS comment_minhash (
+        id INTEGER PRIMARY KEY,
+        source TEXT NOT NULL,
+        record_id TEXT NOT NULL,
+        signature BLOB,
+        cluster_id INTEGER NOT NULL,
+        UNIQUE (source, record_id)
+    );
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS comment_minhash_cluster ON comment_minhash (cluster_id)")
+    # LSH buckets of every stored signature, so new comments are matched without re-reading old ones
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS comment_lsh_buckets (
+        band INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        id INTEGER NOT NULL REFERENCES comment_minhash(id),
+        PRIMARY KEY (band, bucket, id)
+    ) WITHOUT ROWID;
+    """)
+    for source in TEXT_COLUMNS:
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({source})")}
+        if columns and 'duplicate_cluster' not in columns:
+            conn.execute(f"ALTER TABLE {source} ADD COLUMN duplicate_cluster INTEGER")
+
+
+def drop_tables(conn):
+    conn.execute("DROP TABLE IF EXISTS comment_lsh_buckets")
+    conn.execute("DROP TABLE IF EXISTS comment_minhash")
+    for source in TEXT_COLUMNS:
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({source})")}
+        if 'duplicate_cluster' in columns:
+            conn.execute(f"UPDATE {source} SET duplicate_cluster = NULL")
+    conn.commit()
+
+
+def text_view(conn, source):
+    """Table to read text from: the source itself, or its *_text view when compressed_text.py is in use."""
+    if not has_compressed_store(conn):
+        return source
+    from compressed_text import CompressedTextStore
+    CompressedTextStore(conn).create_views()
+    return f"{source}_text"
+
+
+def normalise(text):
+    """Lower-case, URLs replaced and punctuation dropped, so "Thanks!!" and "thanks" share their shingles."""
+    text = URL_PATTERN.sub(' url ', (text or '').lower()).translate(PUNCTUATION)
+    return ' '.join(text.split())
+
+
+def shingle_hashes(texts, k=SHINGLE_SIZE):
+    """32-bit hashes of the k-byte shingles of each normalised text: (hashes, index of the owning text).
+
+    All texts of a chunk are concatenated and hashed with one sliding window; windows that cross two texts are
+    dropped. Texts shorter than k are padded to one shingle, empty texts have none.
+    """
+    encoded = []
+    for text in texts:
+        data = normalise(text).encode('utf-8')
+        encoded.append(data.ljust(k) if data else data)
+    lengths = np.array([len(data) for data in encoded], dtype=np.int64)
+    counts = np.maximum(lengths - k + 1, 0)
+    if not counts.sum():
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+    windows = sliding_window_view(data, k) @ SHINGLE_POWERS  # Exact for k <= 7 (257**7 < 2**64)
+    owner = np.repeat(np.arange(len(texts)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    window_index = np.repeat(np.cumsum(lengths) - lengths, counts) + offsets
+    hashes = (windows[window_index] * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)
+    return hashes, owner
+
+
+def minhash_signatures(hashes, owner, n):
+    """(n, NUM_PERM) uint32 MinHash signatures and a mask of the texts that had shingles."""
+    signatures = np.full((n, NUM_PERM), np.iinfo(np.uint32).max, dtype=np.uint32)
+    has_shingles = np.zeros(n, dtype=bool)
+    if len(hashes):
+        present, starts = np.unique(owner, return_index=True)
+        has_shingles[present] = True
+        for block in range(0, NUM_PERM, PERM_BLOCK):
+            a = HASH_A[block:block + PERM_BLOCK, None]
+            b = HASH_B[block:block + PERM_BLOCK, None]
+            # (hash functions, shingles) layout: the per-text minimum then runs along contiguous memory
+            permuted = ((a * hashes + b) >> np.uint64(32)).astype(np.uint32)
+            signatures[present, block:block + PERM_BLOCK] = np.minimum.reduceat(permuted, starts, axis=1).T
+    return signatures, has_shingles
+
+
+def band_keys(signatures):
+    """(n, BANDS) int64 bucket keys, one hash of the NUM_PERM // BANDS signature rows per band."""
+    bands = signatures.reshape(len(signatures), BANDS, -1).astype(np.uint64)
+    return (bands * BAND_MULTIPLIERS).sum(axis=2).view(np.int64)
+
+
+def similarity(left, right):
+    """Estimated Jaccard similarity of paired signatures."""
+    return (left == right).mean(axis=1)
+
+
+class UnionFind:
+    """Clusters keyed by integer id; the smallest id of a cluster is its root, so cluster ids stay stable."""
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        self.parent.setdefault(item, item)
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def chunk_candidates(keys, ids):
+    """Pairs of ids in the chunk sharing a bucket: neighbours after sorting each band, so a bucket of m
+    comments gives m - 1 pairs instead of m * (m - 1) / 2."""
+    pairs = []
+    for band in range(keys.shape[1]):
+        order = np.argsort(keys[:, band], kind='stable')
+        sorted_keys = keys[order, band]
+        same = np.flatnonzero(sorted_keys[1:] == sorted_keys[:-1])
+        pairs.append(np.column_stack([ids[order[same]], ids[order[same + 1]]]))
+    return np.unique(np.concatenate(pairs), axis=0) if pairs else np.empty((0, 2), dtype=np.int64)
+
+
+def stored_collisions(conn, keys, ids):
+    """(new id, band, bucket, stored cluster id, stored member id) for every stored bucket entry a new comment
+    falls into."""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS chunk_buckets (band INTEGER, bucket INTEGER, id INTEGER)")
+    conn.execute("DELETE FROM chunk_buckets")
+    bands = np.broadcast_to(np.arange(keys.shape[1]), keys.shape)
+    conn.executemany("INSERT INTO chunk_buckets VALUES (?, ?, ?)", zip(
+        bands.ravel().tolist(), keys.ravel().tolist(), np.repeat(ids, keys.shape[1]).tolist()
+    ))
+    # CROSS JOIN keeps the chunk as the outer loop, so stored buckets are probed by primary key, not scanned
+    return conn.execute("""
+        SELECT c.id, c.band, c.bucket, m.cluster_id, b.id
+        FROM chunk_buckets c
+        CROSS JOIN comment_lsh_buckets b ON b.band = c.band AND b.bucket = c.bucket
+        JOIN comment_minhash m ON m.id = b.id
+    """).fetchall()
+
+
+def load_signatures(conn, ids):
+    signatures = {}
+    ids = list(ids)
+    for start in range(0, len(ids), 500):
+        batch = ids[start:start + 500]
+        rows = conn.execute(
+            f"SELECT id, signature FROM comment_minhash WHERE id IN ({', '.join('?' * len(batch))})", batch
+        )
+        signatures.update((row_id, np.frombuffer(data, dtype=np.uint32)) for row_id, data in rows)
+    return signatures
+
+
+def process_chunk(conn, source, rows, first_id, threshold=SIMILARITY_THRESHOLD):
+    """MinHash, match and store one chunk of (record_id, text) rows; returns the number of rows relabelled."""
+    record_ids = [row[0] for row in rows]
+    hashes, owner = shingle_hashes([row[1] for row in rows])
+    signatures, has_shingles = minhash_signatures(hashes, owner, len(rows))
+    ids = np.arange(first_id, first_id + len(rows))
+    keys = band_keys(signatures[has_shingles])
+    hashed_ids = ids[has_shingles]
+
+    clusters = UnionFind()
+    new_signature = {int(i): signatures[i - first_id] for i in hashed_ids}
+
+    # Matches inside the chunk
+    pairs = chunk_candidates(keys, hashed_ids)
+    if len(pairs):
+        matched = similarity(signatures[pairs[:, 0] - first_id], signatures[pairs[:, 1] - first_id]) >= threshold
+        for a, b in pairs[matched].tolist():
+            clusters.union(a, b)
+
+    # Matches against clusters stored by earlier chunks and runs; one colliding member per cluster is compared
+    collisions = stored_collisions(conn, keys, hashed_ids) if len(hashed_ids) else []
+    candidates = {}
+    for new_id, _, _, cluster_id, member in collisions:
+        candidates[new_id, cluster_id] = min(member, candidates.get((new_id, cluster_id), member))
+    stored = load_signatures(conn, set(candidates.values()))
+    for (new_id, cluster_id), member in candidates.items():
+        if similarity(new_signature[new_id][None], stored[member][None])[0] >= threshold:
+            clusters.union(new_id, cluster_id)
+
+    clustered = {}
+    for row_id in new_signature:
+        clustered.setdefault(clusters.find(row_id), []).append(row_id)
+
+    # Stored clusters merged into an older one are relabelled with every member written back; a stored
+    # singleton that new comments joined gets its label. Members are read before any cluster is relabelled.
+    changes = []
+    relabel = []
+    for cluster_id in {cluster_id for _, cluster_id in candidates}:
+        root = clusters.find(cluster_id)
+        if root != cluster_id:
+            members = conn.execute(
+                "SELECT source, record_id FROM comment_minhash WHERE cluster_id = ?", (cluster_id,)
+            ).fetchall()
+            relabel.append((root, cluster_id))
+        elif root in clustered:
+            members = conn.execute(
+                "SELECT source, record_id FROM comment_minhash WHERE cluster_id = ? LIMIT 2", (cluster_id,)
+            ).fetchall()
+            members = members if len(members) == 1 else []
+        else:
+            continue
+        changes.extend((member_source, record_id, root) for member_source, record_id in members)
+    conn.executemany("UPDATE comment_minhash SET cluster_id = ? WHERE cluster_id = ?", relabel)
+
+    conn.executemany(
+        "INSERT INTO comment_minhash (id, source, record_id, signature, cluster_id) VALUES (?, ?, ?, ?, ?)",
+        [(int(row_id), source, record_id, signatures[i].tobytes() if has_shingles[i] else None,
+          clusters.find(int(row_id))) for i, (row_id, record_id) in enumerate(zip(ids, record_ids))]
+    )
+
+    # A bucket keeps one member per cluster: enough to match later comments, and copy-pasted spam does not
+    # grow the buckets it falls into
+    occupied = {(band, bucket, clusters.find(cluster_id)) for _, band, bucket, cluster_id, _ in collisions}
+    bucket_rows = []
+    for row_id, row_keys in zip(hashed_ids.tolist(), keys.tolist()):
+        root = clusters.find(row_id)
+        for band, bucket in enumerate(row_keys):
+            if (band, bucket, root) not in occupied:
+                occupied.add((band, bucket, root))
+                bucket_rows.append((band, bucket, row_id))
+    conn.executemany("INSERT INTO comment_lsh_buckets (band, bucket, id) VALUES (?, ?, ?)", bucket_rows)
+
+    for root, members in clustered.items():
+        if len(members) > 1 or root < first_id:
+            changes.extend((source, record_ids[row_id - first_id], root) for row_id in members)
+
+    for change_source, (key_column, _) in TEXT_COLUMNS.items():
+        conn.executemany(
+            f"UPDATE {change_source} SET duplicate_cluster = ? WHERE {key_column} = ?",
+            [(cluster_id, record_id) for s, record_id, cluster_id in changes if s == change_source]
+        )
+    return len(changes)
+
+
+def deduplicate(conn, sources=tuple(TEXT_COLUMNS), chunk_size=CHUNK_SIZE, threshold=SIMILARITY_THRESHOLD):
+    """Assign every comment and reply not seen before to a near-duplicate cluster. Incremental: only rows
+    without a signature are read, and they are matched against the stored LSH buckets."""
+    create_tables(conn)
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    processed = 0
+    for source in sources:
+        if source not in existing:
+            continue
+        key_column, text_column = TEXT_COLUMNS[source]
+        cursor = conn.execute(f"""
+            SELECT s.{key_column}, s.{text_column} FROM {text_view(conn, source)} s
+            LEFT JOIN comment_minhash m ON m.source = ? AND m.record_id = s.{key_column}
+            WHERE m.id IS NULL
+        """, (source,))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            start = time.perf_counter()
+            first_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM comment_minhash").fetchone()[0]
+            relabelled = process_chunk(conn, source, rows, first_id, threshold)
+            conn.commit()
+            processed += len(rows)
+            print(f"{source}: {len(rows)} rows hashed, {relabelled} cluster labels written "
+                  f"in {time.perf_counter() - start:.1f}s")
+    return processed
+
+
+def top_clusters(conn, limit=TOP_CLUSTERS):
+    """Largest clusters with the number of videos they appear on and the text of their first member.
+    Clusters repeated across many videos are usually spam or bots; within one video, "thanks!" variants."""
+    return conn.execute(f"""
+        SELECT m.cluster_id, COUNT(*) AS size,
+               COUNT(DISTINCT COALESCE(c.video_id, r.video_id)) AS videos,
+               (SELECT COALESCE(cr.top_level_text, rr.reply_text)
+                FROM comment_minhash root
+                LEFT JOIN {text_view(conn, 'comments')} cr ON root.source = 'comments' AND cr.thread_id = root.record_id
+                LEFT JOIN {text_view(conn, 'replies')} rr ON root.source = 'replies' AND rr.reply_id = root.record_id
+                WHERE root.id = m.cluster_id) AS text
+        FROM comment_minhash m
+        LEFT JOIN comments c ON m.source = 'comments' AND c.thread_id = m.record_id
+        LEFT JOIN replies r ON m.source = 'replies' AND r.reply_id = m.record_id
+        GROUP BY m.cluster_id
+        HAVING COUNT(*) > 1
+        ORDER BY size DESC
+        LIMIT ?
+    """, (limit,)).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate comments and replies with MinHash LSH.")
+    parser.add_argument('--db', default=DATABASE_FILE)
+    parser.add_argument('--sources', nargs='+', default=list(TEXT_COLUMNS), choices=list(TEXT_COLUMNS))
+    parser.add_argument('--threshold', type=float, default=SIMILARITY_THRESHOLD)
+    parser.add_argument('--rebuild', action='store_true', help="Drop stored signatures and clusters first")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    if args.rebuild:
+        drop_tables(conn)
+    processed = deduplicate(conn, args.sources, threshold=args.threshold)
+
+    total, duplicates, clusters = conn.execute("""
+        SELECT COUNT(*), COALESCE(SUM(size), 0), COUNT(size) FROM comment_minhash m
+        LEFT JOIN (SELECT cluster_id, COUNT(*) AS size FROM comment_minhash GROUP BY cluster_id HAVING COUNT(*) > 1) s
+            ON s.cluster_id = m.id
+    """).fetchone()
+    print(f"Hashed {processed} new rows. {duplicates} of {total} comments and replies are in {clusters} "
+          f"near-duplicate clusters.")
+    if {'comments', 'replies'} <= {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}:
+        for cluster_id, size, videos, text in top_clusters(conn):
+            print(f"{size:7d} comments on {videos:5d} videos  [{cluster_id}] {(text or '')[:80]!r}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+import argparse
+import hashlib
+import re
+import sqlite3
+from datetime import datetime
+
+import zstandard
+
+DATABASE_FILE = 'ds_edu_videos.db' # SQLite database file with the scraped text
+PUNCTUATED_DATABASE_FILE = 'ds_edu_videos_punctuated.db' # Copy with transcripts.punctuated_transcript
+DICTIONARY_SIZE = 112640 # Bytes per trained zstd dictionary (zstd's default 110 KiB)
+TRAINING_SAMPLES = 5000 # Texts sampled per source to train its dictionary
+COMPRESSION_LEVEL = 19
+CHUNK_SIZE = 1000 # Rows compressed and written per executemany
+
+# Large text columns moved into the compressed store: source table -> (key column, text column)
+TEXT_COLUMNS = {
+    'transcripts': ('video_id', 'transcript'),
+    'comments': ('thread_id', 'top_level_text'),
+    'replies': ('reply_id', 'reply_text'),
+}
+
+
+def clean_transcript(text):
+    """Same cleaning as notebooks/engagement_modeling.ipynb."""
+    if not isinstance(text, str):
+        return ""
+    text = re.sub(r'\[.*?\]', '', text) # remove text in brackets
+    text = re.sub(r'\s+', ' ', text) # remove extra whitespace
+    text = re.sub(r'\n', ' ', text) # remove newlines
+    return text.strip()
+
+
+def create_tables(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS zstd_dictionaries (
+        dict_id INTEGER PRIMARY KEY,
+        source TEXT NOT NULL,
+        dictionary BLOB NOT NULL,
+        created_at TEXT
+    );
+    """)
+    # Compressed texts keyed by a hash of their content, so repeated comments and identical variants are stored once
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS text_blobs (
+        blob_id INTEGER PRIMARY KEY,
+        hash BLOB NOT NULL UNIQUE,
+        dict_id INTEGER REFERENCES zstd_dictionaries(dict_id),
+        data BLOB
+    );
+    """)
+    # One row per (record, variant): raw, punctuated and cleaned transcripts share the record key
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS text_records (
+        source TEXT NOT NULL,
+        record_id TEXT NOT NULL,
+        variant TEXT NOT NULL,
+        blob_id INTEGER NOT NULL REFERENCES text_blobs(blob_id),
+        PRIMARY KEY (source, record_id, variant)
+    ) WITHOUT ROWID;
+    """)
+    # Records with their compressed text, as read by the views here and in fts_search.py
+    conn.execute("""
+    CREATE VIEW IF NOT EXISTS text_variants AS
+    SELECT r.source, r.record_id, r.variant, b.dict_id, b.data
+    FROM text_records r JOIN text_blobs b ON b.blob_id = r.blob_id;
+    """)
+
+
+def content_hash(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+class CompressedTextStore:
+    """Transparent read/write adapter for zstd-compressed text with one trained dictionary per source.
+
+    Reads go through `get`, `iter_variant` or the SQL views created by `create_views`, which expose the
+    original column names, so callers do not deal with compression.
+    """
+
+    def __init__(self, conn, level=COMPRESSION_LEVEL):
+        self.conn = conn
+        self.level = level
+        self.dictionaries = {}  # dict_id -> ZstdCompressionDict
+        self.latest = {}  # source -> newest dict_id
+        self.compressors = {}
+        self.decompressors = {}
+        old_layout = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'text_variants'").fetchone()
+        if old_layout:
+            # Legacy rename leaves views that read text_variants (fts_search.py) pointing at the name, not the table
+            conn.execute("PRAGMA legacy_alter_table = ON")
+            conn.execute("ALTER TABLE text_variants RENAME TO text_variants_unshared")
+            conn.execute("PRAGMA legacy_alter_table = OFF")
+        create_tables(conn)
+        for dict_id, source, data in conn.execute("SELECT dict_id, source, dictionary FROM zstd_dictionaries ORDER BY dict_id"):
+            self._add_dictionary(dict_id, source, data)
+        conn.create_function('zstd_text', 2, self._decompress, deterministic=True)
+        if old_layout:
+            self._share_blobs()
+
+    def _share_blobs(self):
+        """Move a store written before text_blobs existed (one blob per record) into the shared layout."""
+        cursor = self.conn.execute("SELECT source, record_id, variant, dict_id, data FROM text_variants_unshared")
+        while True:
+            rows = cursor.fetchmany(CHUNK_SIZE)
+            if not rows:
+                break
+            for source, record_id, variant, dict_id, data in rows:
+                text_hash = content_hash(self._decompress(dict_id, data))
+                self.conn.execute("INSERT OR IGNORE INTO text_blobs (hash, dict_id, data) VALUES (?, ?, ?)",
+                                  (text_hash, dict_id, data))
+                self.conn.execute("""
+                    INSERT OR REPLACE INTO text_records (source, record_id, variant, blob_id)
+                    SELECT ?, ?, ?, blob_id FROM text_blobs WHERE hash = ?
+                """, (source, record_id, variant, text_hash))
+        self.conn.execute("DROP TABLE text_variants_unshared")
+        self.conn.commit()
+
+    def _add_dictionary(self, dict_id, source, data):
+        # An empty dictionary means training failed (too few samples) and plain zstd is used
+        self.dictionaries[dict_id] = zstandard.ZstdCompressionDict(data) if data else None
+        self.latest[source] = dict_id
+
+    def train(self, source, samples, dict_size=DICTIONARY_SIZE):
+        """Train a dictionary for `source` from sample texts and make it the one new writes use."""
+        samples = [s.encode('utf-8') for s in samples if s]
+        try:
+            dictionary = zstandard.train_dictionary(dict_size, samples, level=self.level).as_bytes()
+        except zstandard.ZstdError:
+            dictionary = b''
+        cursor = self.conn.execute(
+            "INSERT INTO zstd_dictionaries (source, dictionary, created_at) VALUES (?, ?, ?)",
+            (source, dictionary, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        )
+        self._add_dictionary(cursor.lastrowid, source, dictionary)
+        return cursor.lastrowid
+
+    def _compressor(self, dict_id):
+        if dict_id not in self.compressors:
+            self.compressors[dict_id] = zstandard.ZstdCompressor(level=self.level, dict_data=self.dictionaries[dict_id])
+        return self.compressors[dict_id]
+
+    def _decompress(self, dict_id, data):
+        if data is None:
+            return None
+        if dict_id not in self.decompressors:
+            self.decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=self.dictionaries[dict_id])
+        return self.decompressors[dict_id].decompress(data).decode('utf-8')
+
+    def compress(self, source, text):
+        dict_id = self.latest[source]
+        return dict_id, self._compressor(dict_id).compress(text.encode('utf-8'))
+
+    def put_many(self, source, variant, rows):
+        """Write (record_id, text) pairs for one variant; existing values are replaced.
+
+        Only texts whose hash is not stored yet are compressed; the others point to the existing blob.
+        """
+        rows = [(record_id, text, content_hash(text)) for record_id, text in rows if text is not None]
+        hashes = list({text_hash for _, _, text_hash in rows})
+        blob_ids = {}
+        for start in range(0, len(hashes), CHUNK_SIZE):
+            chunk = hashes[start:start + CHUNK_SIZE]
+            blob_ids.update(self.conn.execute(
+                f"SELECT hash, blob_id FROM text_blobs WHERE hash IN ({', '.join('?' * len(chunk))})", chunk))
+        for _, text, text_hash in rows:
+            if text_hash not in blob_ids:
+                cursor = self.conn.execute("INSERT INTO text_blobs (hash, dict_id, data) VALUES (?, ?, ?)",
+                                           (text_hash, *self.compress(source, text)))
+                blob_ids[text_hash] = cursor.lastrowid
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO text_records (source, record_id, variant, blob_id) VALUES (?, ?, ?, ?)",
+            [(source, record_id, variant, blob_ids[text_hash]) for record_id, _, text_hash in rows]
+        )
+        return len(rows)
+
+    def prune(self):
+        """Delete blobs no record points to any more (after texts were replaced); returns how many."""
+        cursor = self.conn.execute(
+            "DELETE FROM text_blobs WHERE blob_id NOT IN (SELECT blob_id FROM text_records)")
+        self.conn.commit()
+        return cursor.rowcount
+
+    def put(self, source, record_id, text, variant='raw'):
+        self.put_many(source, variant, [(record_id, text)])
+
+    def get(self, source, record_id, variant='raw'):
+        row = self.conn.execute(
+            "SELECT dict_id, data FROM text_variants WHERE source = ? AND record_id = ? AND variant = ?",
+            (source, record_id, variant)
+        ).fetchone()
+        return self._decompress(*row) if row else None
+
+    def iter_variant(self, source, variant='raw'):
+        """Stream (record_id, text) for a whole variant; only compressed bytes are read from disk."""
+        cursor = self.conn.execute(
+            "SELECT record_id, dict_id, data FROM text_variants WHERE source = ? AND variant = ?",
+            (source, variant)
+        )
+        for record_id, dict_id, data in cursor:
+            yield record_id, self._decompress(dict_id, data)
+
+    def create_views(self):
+        """TEMP views with the original table layout, reading text from the plain column or the store.
+
+        transcripts_text also exposes punctuated_transcript and clean_transcript when those variants exist.
+        """
+        self.conn.executescript("""
+        CREATE TEMP VIEW IF NOT EXISTS transcripts_text AS
+        SELECT t.video_id,
+               COALESCE(t.transcript, zstd_text(raw.dict_id, raw.data)) AS transcript,
+               zstd_text(p.dict_id, p.data) AS punctuated_transcript,
+               zstd_text(c.dict_id, c.data) AS clean_transcript,
+               t.type, t.translatable
+        FROM transcripts t
+        LEFT JOIN text_variants raw ON raw.source = 'transcripts' AND raw.record_id = t.video_id AND raw.variant = 'raw'
+        LEFT JOIN text_variants p ON p.source = 'transcripts' AND p.record_id = t.video_id AND p.variant = 'punctuated'
+        LEFT JOIN text_variants c ON c.source = 'transcripts' AND c.record_id = t.video_id AND c.variant = 'cleaned';
+
+        CREATE TEMP VIEW IF NOT EXISTS comments_text AS
+        SELECT cm.thread_id, cm.video_id,
+               COALESCE(cm.top_level_text, zstd_text(tv.dict_id, tv.data)) AS top_level_text,
+               cm.top_level_like_count, cm.top_level_published_at, cm.top_level_updated_at, cm.total_reply_count
+        FROM comments cm
+        LEFT JOIN text_variants tv ON tv.source = 'comments' AND tv.record_id = cm.thread_id AND tv.variant = 'raw';
+
+        CREATE TEMP VIEW IF NOT EXISTS replies_text AS
+        SELECT r.reply_id, r.thread_id, r.video_id,
+               COALESCE(r.reply_text, zstd_text(tv.dict_id, tv.data)) AS reply_text,
+               r.reply_like_count, r.reply_published_at, r.reply_updated_at
+        FROM replies r
+        LEFT JOIN text_variants tv ON tv.source = 'replies' AND tv.record_id = r.reply_id AND tv.variant = 'raw';
+        """)
+
+
+def open_store(db_path=DATABASE_FILE):
+    """Connect to the database with the compressed store and its views ready, e.g.
+    pd.read_sql_query("SELECT * FROM transcripts_text", conn)."""
+    conn = sqlite3.connect(db_path)
+    store = CompressedTextStore(conn)
+    store.create_views()
+    return conn, store
+
+
+def compress_source(store, source, drop_plain=False):
+    """Move plain text rows of one source into the store. Incremental: rows already stored are skipped."""
+    conn = store.conn
+    key_column, text_column = TEXT_COLUMNS[source]
+    if source not in store.latest:
+        samples = [row[0] for row in conn.execute(
+            f"SELECT {text_column} FROM {source} WHERE {text_column} IS NOT NULL ORDER BY RANDOM() LIMIT ?",
+            (TRAINING_SAMPLES,)
+        )]
+        if not samples:
+            return 0
+        store.train(source, samples)
+
+    cursor = conn.execute(f"""
+        SELECT s.{key_column}, s.{text_column} FROM {source} s
+        LEFT JOIN text_records tr ON tr.source = ? AND tr.record_id = s.{key_column} AND tr.variant = 'raw'
+        WHERE s.{text_column} IS NOT NULL AND tr.record_id IS NULL
+    """, (source,))
+    written = 0
+    while True:
+        rows = cursor.fetchmany(CHUNK_SIZE)
+        if not rows:
+            break
+        written += store.put_many(source, 'raw', rows)
+        if drop_plain:
+            conn.executemany(f"UPDATE {source} SET {text_column} = NULL WHERE {key_column} = ?",
+                             [(row[0],) for row in rows])
+        conn.commit()
+    return written
+
+
+def import_punctuated(store, punctuated_db, cleaned=True):
+    """Store punctuated_transcript (and its cleaned form) from the punctuated copy as variants of each transcript."""
+    punctuated = sqlite3.connect(punctuated_db)
+    cursor = punctuated.execute("SELECT video_id, punctuated_transcript FROM transcripts WHERE punctuated_transcript IS NOT NULL")
+    written = 0
+    while True:
+        rows = cursor.fetchmany(CHUNK_SIZE)
+        if not rows:
+            break
+        written += store.put_many('transcripts', 'punctuated', rows)
+        if cleaned:
+            store.put_many('transcripts', 'cleaned', [(video_id, clean_transcript(text)) for video_id, text in rows])
+        store.conn.commit()
+    punctuated.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move transcript and comment text into zstd-compressed storage.")
+    parser.add_argument('--db', default=DATABASE_FILE)
+    parser.add_argument('--punctuated-db', help=f"Import punctuated transcripts as a variant, e.g. {PUNCTUATED_DATABASE_FILE}")
+    parser.add_argument('--sources', nargs='+', default=list(TEXT_COLUMNS), choices=list(TEXT_COLUMNS))
+    parser.add_argument('--drop-plain', action='store_true', help="Set the plain text columns to NULL once compressed")
+    parser.add_argument('--vacuum', action='store_true', help="VACUUM afterwards so the file actually shrinks")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    store = CompressedTextStore(conn)
+    for source in args.sources:
+        written = compress_source(store, source, drop_plain=args.drop_plain)
+        print(f"{source}: compressed {written} new rows.")
+    if args.punctuated_db:
+        written = import_punctuated(store, args.punctuated_db)
+        print(f"transcripts: stored {written} punctuated variants.")
+
+    pruned = store.prune()
+    if pruned:
+        print(f"Removed {pruned} texts no longer referenced.")
+
+    raw_bytes = conn.execute(
+        "SELECT COALESCE(SUM(LENGTH(CAST(zstd_text(dict_id, data) AS BLOB))), 0) FROM text_variants").fetchone()[0]
+    stored_bytes, blobs = conn.execute("SELECT COALESCE(SUM(LENGTH(data)), 0), COUNT(*) FROM text_blobs").fetchone()
+    records = conn.execute("SELECT COUNT(*) FROM text_records").fetchone()[0]
+    if stored_bytes:
+        print(f"Store holds {stored_bytes / 1e6:.1f} MB for {raw_bytes / 1e6:.1f} MB of text ({raw_bytes / stored_bytes:.1f}x); "
+              f"{records} records share {blobs} distinct texts.")
+
+    if args.vacuum:
+        conn.execute("VACUUM")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import time
+import zlib
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from fts_search import has_compressed_store
+
+DATABASE_FILE = 'ds_edu_videos.db' # SQLite database file to export
+EXPORT_DIR = 'ds_edu_videos_parquet' # Root of the Parquet dataset
+MANIFEST_FILE = 'manifest.json' # Per-partition fingerprints, in EXPORT_DIR
+MANIFEST_VERSION = 1
+BUCKETS = 16 # video_id hash buckets of the per-video tables
+CHUNK_SIZE = 10000 # Rows fetched from SQLite at a time
+COMPRESSION = 'zstd'
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__' # Hive directory name for rows without a partition value
+
+# Exported tables: partition column (None writes one file), the column each partition is sorted by (tight
+# min/max statistics, so readers skip row groups) and rows per row group (transcripts are large rows)
+TABLES = {
+    'videos': {'partition': 'published_year', 'sort': 'published_at', 'row_group_rows': 50000},
+    'channels': {'partition': None, 'sort': 'channel_id', 'row_group_rows': 50000},
+    'transcripts': {'partition': 'bucket', 'sort': 'video_id', 'row_group_rows': 2000},
+    'comments': {'partition': 'bucket', 'sort': 'video_id', 'row_group_rows': 50000},
+    'replies': {'partition': 'bucket', 'sort': 'video_id', 'row_group_rows': 50000},
+    'video_languages': {'partition': None, 'sort': 'video_id', 'row_group_rows': 50000},
+}
+PARTITION_EXPRESSIONS = {
+    None: "''",
+    'published_year': "CASE WHEN published_at GLOB '[0-9][0-9][0-9][0-9]*' THEN CAST(substr(published_at, 1, 4) AS INTEGER) END",
+    'bucket': "video_bucket(video_id)",
+}
+# Counts the scrapers store as 'N/A' when missing, which makes SQLite keep them as TEXT
+INTEGER_COLUMNS = {
+    'view_count', 'like_count', 'comment_count', 'subscriber_count', 'video_count', 'top_level_like_count',
+    'total_reply_count', 'reply_like_count', 'predicted_label',
+}
+# Run times the scrapers write with datetime.now(), in the collecting machine's local time without an offset;
+# exported as timestamps without a time zone. The API's *_at columns are UTC ('...Z').
+LOCAL_TIME_COLUMNS = {'collected_at', 'detected_at'}
+
+
+def video_bucket(video_id, buckets=BUCKETS):
+    """Bucket of a video_id; stable across runs and machines (crc32, not hash())."""
+    return zlib.crc32(video_id.encode('utf-8')) % buckets if video_id is not None else None
+
+
+def row_hash(*values):
+    return zlib.crc32('\x1f'.join(map(repr, values)).encode('utf-8'))
+
+
+def register_functions(conn, buckets=BUCKETS):
+    conn.create_function('video_bucket', 1, lambda video_id: video_bucket(video_id, buckets), deterministic=True)
+    conn.create_function('row_hash', -1, row_hash, deterministic=True)
+
+
+def source_table(conn, table):
+    """The table itself, or its *_text view when compressed_text.py moved the text out of it."""
+    if table in ('transcripts', 'comments', 'replies') and has_compressed_store(conn):
+        from compressed_text import CompressedTextStore
+        CompressedTextStore(conn).create_views()
+        return f"{table}_text"
+    return table
+
+
+def arrow_type(name, declared):
+    declared = (declared or '').upper()
+    if name in INTEGER_COLUMNS or 'INT' in declared:
+        return pa.int64()
+    if name in LOCAL_TIME_COLUMNS:
+        return pa.timestamp('us')
+    if name.endswith('_at'):
+        return pa.timestamp('us', tz='UTC')
+    if any(t in declared for t in ('REAL', 'FLOA', 'DOUB')):
+        return pa.float64()
+    if 'BLOB' in declared:
+        return pa.binary()
+    return pa.string()
+
+
+def arrow_schema(conn, source):
+    return pa.schema([(row[1], arrow_type(row[1], row[2])) for row in conn.execute(f"PRAGMA table_info({source})")])
+
+
+def to_arrow(rows, schema):
+    """Typed Arrow table from SQLite rows; values that do not parse ('N/A' counts and dates) become null."""
+    df = pd.DataFrame.from_records(rows, columns=schema.names)
+    for field in schema:
+        column = df[field.name]
+        if pa.types.is_integer(field.type):
+            df[field.name] = pd.to_numeric(column, errors='coerce').round().astype('Int64')
+        elif pa.types.is_floating(field.type):
+            df[field.name] = pd.to_numeric(column, errors='coerce')
+        elif pa.types.is_timestamp(field.type):
+            df[field.name] = pd.to_datetime(column, errors='coerce', utc=field.type.tz is not None, format='ISO8601')
+        elif pa.types.is_string(field.type):
+            df[field.name] = column.map(lambda value: None if value is None else str(value)).astype(object)
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def partition_key(value):
+    return NULL_PARTITION if value is None else str(value)
+
+
+def partition_path(table, partition, key):
+    if partition is None:
+        return os.path.join(table, 'part-0.parquet')
+    return os.path.join(table, f"{partition}={key}", 'part-0.parquet')
+
+
+def partition_fingerprints(conn, source, partition, columns):
+    """{partition key: 'rows:checksum'} in one scan; a partition is re-exported only when this changes."""
+    hashed = ", ".join(f'"{c}"' for c in columns)
+    rows = conn.execute(f"""
+        SELECT {PARTITION_EXPRESSIONS[partition]} AS partition_value, COUNT(*), SUM(row_hash({hashed}))
+        FROM {source} GROUP BY partition_value
+    """)
+    return {partition_key(value): f"{count}:{checksum}" for value, count, checksum in rows}
+
+
+def write_partitions(conn, out_dir, table, source, schema, keys):
+    """Stream the partitions in `keys` out of SQLite, one partition after the other; returns {key: rows}."""
+    config = TABLES[table]
+    partition = config['partition']
+    sort_index = schema.get_field_index(config['sort'])
+    values = [None if key == NULL_PARTITION else (int(key) if partition else key) for key in keys]
+    condition = " OR ".join(
+        (["partition_value IN (" + ", ".join("?" * len([v for v in values if v is not None])) + ")"]
+         if any(v is not None for v in values) else []) +
+        (["partition_value IS NULL"] if None in values else [])
+    )
+    columns = ", ".join(f'"{name}"' for name in schema.names)
+    cursor = conn.execute(f"""
+        SELECT partition_value, {columns} FROM (
+            SELECT {PARTITION_EXPRESSIONS[partition]} AS partition_value, {columns} FROM {source}
+        )
+        WHERE {condition}
+        ORDER BY partition_value, "{config['sort']}"
+    """, [v for v in values if v is not None])
+
+    written = {}
+    writer = None
+    current = None
+    buffer = []
+
+    def flush():
+        if buffer:
+            writer.write_table(to_arrow(buffer, schema), row_group_size=config['row_group_rows'])
+            written[current] += len(buffer)
+            buffer.clear()
+
+    def close():
+        if writer is not None:
+            flush()
+            writer.close()
+            path = os.path.join(out_dir, partition_path(table, partition, current))
+            os.replace(os.path.join(os.path.dirname(path), '.part-0.parquet.tmp'), path)
+
+    while True:
+        rows = cursor.fetchmany(CHUNK_SIZE)
+        if not rows:
+            break
+        for row in rows:
+            key = partition_key(row[0])
+            if key != current or writer is None:
+                close()
+                current = key
+                written[key] = 0
+                path = os.path.join(out_dir, partition_path(table, partition, key))
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Written under a dot name, which dataset readers ignore, and renamed once complete
+                writer = pq.ParquetWriter(
+                    os.path.join(os.path.dirname(path), '.part-0.parquet.tmp'), schema, compression=COMPRESSION,
+                    write_statistics=True, sorting_columns=[pq.SortingColumn(sort_index)] if sort_index >= 0 else None
+                )
+            buffer.append(row[1:])
+            if len(buffer) >= config['row_group_rows']:
+                flush()
+    close()
+    return written
+
+
+def load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_FILE)
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+    return {'version': MANIFEST_VERSION, 'tables': {}}
+
+
+def save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def export_table(conn, out_dir, table, manifest, full=False, buckets=BUCKETS):
+    """Export the partitions of `table` whose fingerprint changed since the last run and remove those that
+    disappeared. Returns (partitions written, partitions unchanged, rows written)."""
+    config = TABLES[table]
+    partition = config['partition']
+    source = source_table(conn, table)
+    schema = arrow_schema(conn, source)
+    schema_description = {field.name: str(field.type) for field in schema}
+
+    previous = manifest['tables'].get(table, {})
+    if previous.get('schema') != schema_description or previous.get('buckets') != buckets or full:
+        previous = {}
+        shutil.rmtree(os.path.join(out_dir, table), ignore_errors=True)
+    old_partitions = previous.get('partitions', {})
+
+    fingerprints = partition_fingerprints(conn, source, partition, schema.names)
+    changed = [key for key, fingerprint in fingerprints.items()
+               if old_partitions.get(key, {}).get('fingerprint') != fingerprint]
+    for key in set(old_partitions) - set(fingerprints):
+        shutil.rmtree(os.path.dirname(os.path.join(out_dir, old_partitions[key]['path'])), ignore_errors=True)
+
+    written = write_partitions(conn, out_dir, table, source, schema, changed) if changed else {}
+    partitions = {}
+    for key, fingerprint in fingerprints.items():
+        path = partition_path(table, partition, key)
+        entry = old_partitions.get(key) if key not in written else {
+            'path': path, 'rows': written[key], 'fingerprint': fingerprint,
+            'bytes': os.path.getsize(os.path.join(out_dir, path)),
+        }
+        partitions[key] = entry
+    manifest['tables'][table] = {
+        'source': source, 'partition_by': partition, 'sorted_by': config['sort'], 'buckets': buckets,
+        'schema': schema_description, 'partitions': partitions,
+        'exported_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    save_manifest(out_dir, manifest)
+    return len(written), len(fingerprints) - len(changed), sum(written.values())
+
+
+def read_table(table, columns=None, filter=None, export_dir=EXPORT_DIR):
+    """Read only `columns`, and only the partitions and row groups that can match `filter`, into pandas, e.g.
+    read_table('videos', ['video_id', 'view_count'], ds.field('published_year') >= 2020)."""
+    dataset = ds.dataset(
+        os.path.join(export_dir, table), format='parquet',
+        partitioning=ds.HivePartitioning.discover(null_fallback=NULL_PARTITION)
+    )
+    return dataset.to_table(columns=columns, filter=filter).to_pandas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the database to a partitioned Parquet dataset.")
+    parser.add_argument('--db', default=DATABASE_FILE)
+    parser.add_argument('--output', default=EXPORT_DIR)
+    parser.add_argument('--tables', nargs='+', default=list(TABLES), choices=list(TABLES))
+    parser.add_argument('--buckets', type=int, default=BUCKETS)
+    parser.add_argument('--full', action='store_true', help="Rewrite every partition, ignoring the manifest")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    register_functions(conn, args.buckets)
+    os.makedirs(args.output, exist_ok=True)
+    manifest = load_manifest(args.output)
+    manifest['source'] = os.path.abspath(args.db)
+
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")}
+    for table in args.tables:
+        if table not in existing:
+            continue
+        start = time.perf_counter()
+        written, unchanged, rows = export_table(conn, args.output, table, manifest, args.full, args.buckets)
+        size = sum(p['bytes'] for p in manifest['tables'][table]['partitions'].values())
+        print(f"{table}: {written} partitions written ({rows} rows), {unchanged} unchanged, "
+              f"{size / 1e6:.1f} MB in {time.perf_counter() - start:.1f}s")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
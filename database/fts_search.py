@@ -0,0 +1,219 @@
+import argparse
+import re
+import sqlite3
+import time
+
+DATABASE_FILE = 'ds_edu_videos.db' # SQLite database file to index
+TOKENIZER = 'porter unicode61 remove_diacritics 2' # "subqueries" also matches "subquery"
+
+# Indexed sources: FTS table -> content table, its key column, indexed text columns and the column weights for bm25
+FTS_SOURCES = {
+    'videos_fts': {
+        'table': 'videos', 'key': 'video_id', 'columns': ['title', 'description'], 'weights': [10.0, 1.0],
+    },
+    'transcripts_fts': {
+        'table': 'transcripts', 'key': 'video_id', 'columns': ['transcript'], 'weights': [1.0],
+    },
+    'comments_fts': {
+        'table': 'comments', 'key': 'thread_id', 'columns': ['top_level_text'], 'weights': [1.0],
+    },
+}
+
+
+def has_compressed_store(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'text_variants'").fetchone() is not None
+
+
+def register_compressed_text(conn):
+    """Make zstd_text() available when text was moved into database/compressed_text.py storage."""
+    if has_compressed_store(conn):
+        from compressed_text import CompressedTextStore
+        CompressedTextStore(conn)
+
+
+def content_table(conn, fts_table):
+    """Content source of an FTS table: the base table, or a view that also reads compressed text."""
+    source = FTS_SOURCES[fts_table]
+    if fts_table == 'videos_fts' or not has_compressed_store(conn):
+        return source['table']
+
+    # Columns set to NULL by compressed_text.py --drop-plain are read back from text_variants. FTS5 looks up
+    # content= in its own schema, so unlike the compressed_text.py views this one cannot be TEMP
+    view = f"{source['table']}_fts_content"
+    column = source['columns'][0]
+    conn.execute(f"""
+        CREATE VIEW IF NOT EXISTS {view} AS
+        SELECT s.rowid AS rowid, s.{source['key']} AS {source['key']},
+               COALESCE(s.{column}, zstd_text(tv.dict_id, tv.data)) AS {column}
+        FROM {source['table']} s
+        LEFT JOIN text_variants tv
+            ON tv.source = '{source['table']}' AND tv.record_id = s.{source['key']} AND tv.variant = 'raw'
+    """)
+    return view
+
+
+def stored_content(conn, fts_table):
+    """content= the FTS table was created with, or None if it does not exist."""
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_table,)).fetchone()
+    if row is None:
+        return None
+    match = re.search(r"\bcontent='([^']*)'", row[0])
+    return match.group(1) if match else None
+
+
+def create_index(conn, fts_table):
+    """Create an external-content FTS5 table and the triggers that keep it in sync with its table."""
+    source = FTS_SOURCES[fts_table]
+    table = source['table']
+    columns = ", ".join(source['columns'])
+    new_values = ", ".join(f"new.{c}" for c in source['columns'])
+    old_values = ", ".join(f"old.{c}" for c in source['columns'])
+    # NULL text means the row was compressed (or never had text); such rows keep their existing index entry
+    new_present = " OR ".join(f"new.{c} IS NOT NULL" for c in source['columns'])
+    old_present = " OR ".join(f"old.{c} IS NOT NULL" for c in source['columns'])
+
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+            {columns}, content='{content_table(conn, fts_table)}', content_rowid='rowid', tokenize='{TOKENIZER}'
+        )
+    """)
+    conn.executescript(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} WHEN {new_present} BEGIN
+            INSERT INTO {fts_table}(rowid, {columns}) VALUES (new.rowid, {new_values});
+        END;
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} WHEN {old_present} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+        END;
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {columns} ON {table}
+        WHEN ({old_present}) AND ({new_present}) BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+            INSERT INTO {fts_table}(rowid, {columns}) VALUES (new.rowid, {new_values});
+        END;
+    """)
+
+
+def build_indexes(conn, rebuild=False):
+    """Create missing indexes and fill them. `rebuild` re-reads every row, which also drops stale entries
+    left by INSERT OR REPLACE writers that ran without PRAGMA recursive_triggers."""
+    register_compressed_text(conn)
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for fts_table, source in FTS_SOURCES.items():
+        if source['table'] not in existing:
+            continue
+        is_new = fts_table not in existing
+        if not is_new and stored_content(conn, fts_table) != content_table(conn, fts_table):
+            # Text was compressed after the index was built (or the store was removed): the index has to
+            # read from the other source, and CREATE ... IF NOT EXISTS would keep the old one
+            print(f"{fts_table}: content source changed, re-creating the index")
+            drop_index(conn, fts_table)
+            is_new = True
+        create_index(conn, fts_table)
+        if is_new or rebuild:
+            start = time.perf_counter()
+            conn.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+            conn.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('optimize')")
+            print(f"{fts_table}: indexed {source['table']} in {time.perf_counter() - start:.1f}s")
+    conn.commit()
+
+
+def drop_index(conn, fts_table):
+    for suffix in ('ai', 'ad', 'au'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {fts_table}_{suffix}")
+    conn.execute(f"DROP TABLE IF EXISTS {fts_table}")
+
+
+def drop_indexes(conn):
+    for fts_table, source in FTS_SOURCES.items():
+        drop_index(conn, fts_table)
+        conn.execute(f"DROP VIEW IF EXISTS {source['table']}_fts_content")
+    conn.commit()
+
+
+def open_index(db_path=DATABASE_FILE):
+    """Connection ready for search(); registers zstd_text() if the compressed store is in use."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA recursive_triggers = ON")  # REPLACE then fires the delete triggers
+    register_compressed_text(conn)
+    return conn
+
+
+def search(conn, query, sources=tuple(FTS_SOURCES), limit=20, predicted_label=None, channel_id=None,
+           channel_title=None, snippet_tokens=12):
+    """Ranked full-text search over titles/descriptions, transcripts and comments.
+
+    `query` uses FTS5 syntax ("correlated subqueries", NEAR(join index), sql AND NOT excel).
+    Returns hits ordered by BM25 (lower is better) with the source, video_id, title and a snippet
+    where matches are wrapped in [ ].
+    """
+    filters = []
+    params = []
+    if predicted_label is not None:
+        filters.append("v.predicted_label = ?")
+        params.append(predicted_label)
+    if channel_id is not None:
+        filters.append("v.channel_id = ?")
+        params.append(channel_id)
+    if channel_title is not None:
+        filters.append("v.channel_title = ?")
+        params.append(channel_title)
+    where = "".join(f" AND {f}" for f in filters)
+
+    hits = []
+    for fts_table in sources:
+        source = FTS_SOURCES[fts_table]
+        weights = ", ".join(str(w) for w in source['weights'])
+        if source['table'] == 'videos':
+            join = f"JOIN videos v ON v.rowid = {fts_table}.rowid"
+            item = "v.video_id"
+        else:
+            join = (f"JOIN {source['table']} s ON s.rowid = {fts_table}.rowid "
+                    f"JOIN videos v ON v.video_id = s.video_id")
+            item = f"s.{source['key']}"
+        rows = conn.execute(f"""
+            SELECT {item}, v.video_id, v.title, bm25({fts_table}, {weights}) AS score,
+                   snippet({fts_table}, -1, '[', ']', '...', {snippet_tokens})
+            FROM {fts_table} {join}
+            WHERE {fts_table} MATCH ?{where}
+            ORDER BY score
+            LIMIT ?
+        """, [query] + params + [limit]).fetchall()
+        hits.extend({
+            'source': source['table'], 'id': row[0], 'video_id': row[1], 'title': row[2],
+            'score': row[3], 'snippet': row[4],
+        } for row in rows)
+
+    hits.sort(key=lambda hit: hit['score'])
+    return hits[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search over videos, transcripts and comments.")
+    parser.add_argument('command', choices=['build', 'rebuild', 'drop', 'search'])
+    parser.add_argument('query', nargs='?', help="FTS5 query, e.g. '\"correlated subqueries\"'")
+    parser.add_argument('--db', default=DATABASE_FILE)
+    parser.add_argument('--sources', nargs='+', default=list(FTS_SOURCES), choices=list(FTS_SOURCES))
+    parser.add_argument('--label', type=int, help="Only videos with this predicted_label")
+    parser.add_argument('--channel-id')
+    parser.add_argument('--channel-title')
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    conn = open_index(args.db)
+    if args.command in ('build', 'rebuild'):
+        build_indexes(conn, rebuild=args.command == 'rebuild')
+    elif args.command == 'drop':
+        drop_indexes(conn)
+    else:
+        start = time.perf_counter()
+        hits = search(conn, args.query, sources=args.sources, limit=args.limit, predicted_label=args.label,
+                      channel_id=args.channel_id, channel_title=args.channel_title)
+        elapsed = (time.perf_counter() - start) * 1000
+        for hit in hits:
+            print(f"{hit['score']:8.3f}  {hit['source']:<11} {hit['video_id']}  {hit['title']}")
+            print(f"          {hit['snippet']}")
+        print(f"{len(hits)} hits in {elapsed:.1f} ms")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+EMBEDDINGS_DIR = 'embeddings_gte-Qwen2-7B-instruct'
+EMBEDDINGS_FILE = os.path.join(EMBEDDINGS_DIR, 'video_embeddings.npy') # Full-precision base store (n x 3584)
+MAPPING_FILE = os.path.join(EMBEDDINGS_DIR, 'video_id_mapping.txt') # Row index -> video_id
+VARIANTS_DIR = os.path.join(EMBEDDINGS_DIR, 'variants') # Compact copies of the base store
+BENCHMARK_FILE = os.path.join(EMBEDDINGS_DIR, 'variants_benchmark.json')
+PCA_DIMS = (1024, 256) # Output sizes of the PCA projections
+TRUNCATE_DIMS = (1024, 512) # Matryoshka-style prefix truncations (re-normalised)
+PCA_SAMPLE = 20000 # Rows used to fit the PCA basis
+CHUNK_SIZE = 4096 # Rows converted at a time, so building never holds two full copies in memory
+KNN_QUERIES = 200 # Queries for the nearest-neighbour recall check against float32
+KNN_K = 10
+
+
+class EmbeddingVariant:
+    """One representation of the embedding store. `data` is memory-mapped; `rows` returns float32 features
+    for the selected row indices, decoding int8 on the fly. `params` holds the int8 range or PCA basis."""
+
+    def __init__(self, name, data, params=None):
+        self.name = name
+        self.data = data
+        self.params = params or {}
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + sum(p.nbytes for p in self.params.values())
+
+    def rows(self, indices):
+        block = np.asarray(self.data[indices])
+        if 'scale' in self.params:
+            return block.astype(np.float32) * self.params['scale'] + self.params['offset']
+        return block.astype(np.float32)
+
+
+def load_mapping(mapping_file=MAPPING_FILE):
+    with open(mapping_file, 'r') as f:
+        return {line.strip(): idx for idx, line in enumerate(f)}
+
+
+def split_indices(mapping, embeddings_dir=EMBEDDINGS_DIR):
+    """Row indices of the train/val/test video_ids, in the order of the *_ids.txt files (and y_*.npy)."""
+    splits = {}
+    for split in ('train', 'val', 'test'):
+        with open(os.path.join(embeddings_dir, f'{split}_ids.txt'), 'r') as f:
+            splits[split] = np.array([mapping[line.strip()] for line in f if line.strip()])
+    return splits
+
+
+def split_labels(splits, embeddings_dir=EMBEDDINGS_DIR):
+    """y_train.npy is the SMOTE output: the original rows first, synthetic rows appended, so the labels of
+    the real training videos are its first len(train_ids) entries."""
+    labels = {}
+    for split in ('train', 'val', 'test'):
+        y = np.load(os.path.join(embeddings_dir, f'y_{split}.npy'), allow_pickle=True).astype(int)
+        labels[split] = y[:len(splits[split])]
+    return labels
+
+
+def _write_chunked(path, n_rows, n_cols, dtype, convert, source):
+    """Write convert(source[i:j]) for consecutive chunks into a new .npy file without building it in memory."""
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(n_rows, n_cols))
+    for start in range(0, n_rows, CHUNK_SIZE):
+        out[start:start + CHUNK_SIZE] = convert(np.asarray(source[start:start + CHUNK_SIZE], dtype=np.float32))
+    out.flush()
+    return out
+
+
+def fit_pca(embeddings, max_dim, sample=PCA_SAMPLE, seed=42):
+    """Mean and the top `max_dim` principal axes, from the eigendecomposition of the sample covariance."""
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(len(embeddings), size=min(sample, len(embeddings)), replace=False))
+    X = np.asarray(embeddings[rows], dtype=np.float64)
+    mean = X.mean(axis=0)
+    X -= mean
+    eigenvalues, eigenvectors = np.linalg.eigh(X.T @ X / (len(X) - 1))
+    order = np.argsort(eigenvalues)[::-1][:max_dim]
+    explained = eigenvalues[order] / eigenvalues.sum()
+    return mean.astype(np.float32), eigenvectors[:, order].T.astype(np.float32), explained
+
+
+def build_variants(embeddings_file=EMBEDDINGS_FILE, variants_dir=VARIANTS_DIR,
+                   pca_dims=PCA_DIMS, truncate_dims=TRUNCATE_DIMS):
+    """Write float16, int8, PCA and truncated versions of the base store to `variants_dir`."""
+    os.makedirs(variants_dir, exist_ok=True)
+    base = np.load(embeddings_file, mmap_mode='r')
+    n, d = base.shape
+
+    _write_chunked(os.path.join(variants_dir, 'float16.npy'), n, d, np.float16,
+                   lambda X: X.astype(np.float16), base)
+
+    # int8 scalar quantisation with a per-dimension range: x ~ q * scale + offset, q in [-128, 127]
+    low = np.full(d, np.inf, dtype=np.float32)
+    high = np.full(d, -np.inf, dtype=np.float32)
+    for start in range(0, n, CHUNK_SIZE):
+        chunk = np.asarray(base[start:start + CHUNK_SIZE], dtype=np.float32)
+        low = np.minimum(low, chunk.min(axis=0))
+        high = np.maximum(high, chunk.max(axis=0))
+    scale = np.maximum(high - low, 1e-12) / 255
+    offset = low + 128 * scale
+    _write_chunked(os.path.join(variants_dir, 'int8.npy'), n, d, np.int8,
+                   lambda X: np.clip(np.rint((X - offset) / scale), -128, 127).astype(np.int8), base)
+    np.savez(os.path.join(variants_dir, 'int8_params.npz'), scale=scale, offset=offset)
+
+    if pca_dims:
+        mean, components, explained = fit_pca(base, max(pca_dims))
+        for k in pca_dims:
+            _write_chunked(os.path.join(variants_dir, f'pca{k}.npy'), n, k, np.float32,
+                           lambda X, k=k: (X - mean) @ components[:k].T, base)
+            np.savez(os.path.join(variants_dir, f'pca{k}_params.npz'), mean=mean, components=components[:k])
+            print(f"pca{k}: {explained[:k].sum():.1%} of the variance retained")
+
+    # Matryoshka-style: keep the leading dimensions and re-normalise. gte-Qwen2 is not trained for this,
+    # so the benchmark decides whether the prefixes are usable.
+    for k in truncate_dims:
+        _write_chunked(os.path.join(variants_dir, f'truncate{k}.npy'), n, k, np.float32,
+                       lambda X, k=k: X[:, :k] / np.linalg.norm(X[:, :k], axis=1, keepdims=True), base)
+
+
+def load_variant(name, embeddings_file=EMBEDDINGS_FILE, variants_dir=VARIANTS_DIR):
+    """'float32' is the base store itself; other names are files written by build_variants."""
+    if name == 'float32':
+        return EmbeddingVariant(name, np.load(embeddings_file, mmap_mode='r'))
+    data = np.load(os.path.join(variants_dir, f'{name}.npy'), mmap_mode='r')
+    params = {}
+    params_file = os.path.join(variants_dir, f'{name}_params.npz')
+    if os.path.exists(params_file):
+        with np.load(params_file) as p:
+            params = {key: p[key] for key in p.files}
+    return EmbeddingVariant(name, data, params)
+
+
+def available_variants(variants_dir=VARIANTS_DIR):
+    names = sorted(f[:-4] for f in os.listdir(variants_dir) if f.endswith('.npy'))
+    return ['float32'] + names
+
+
+def cost_aware_threshold(y_true, probas, cost_matrix):
+    """Same threshold selection as classification_gte-Qwen2-7B-instruct.ipynb."""
+    thresholds = np.linspace(0, 1, 100)
+    costs = []
+    for t in thresholds:
+        pred = (probas >= t).astype(int)
+        fn = np.sum((y_true == 1) & (pred == 0)) * cost_matrix["FN"]
+        fp = np.sum((y_true == 0) & (pred == 1)) * cost_matrix["FP"]
+        costs.append(fn + fp)
+    return thresholds[np.argmin(costs)]
+
+
+def knn_recall(variant, reference, k=KNN_K, queries=KNN_QUERIES, seed=0):
+    """Share of each query's k nearest neighbours (cosine, float32 store) that the variant also returns."""
+    def normalized(X):
+        return X / np.linalg.norm(X, axis=1, keepdims=True)
+
+    def top_k(store, query_rows):
+        Q = normalized(store.rows(query_rows))
+        scores = np.empty((len(query_rows), len(store.data)), dtype=np.float32)
+        for start in range(0, len(store.data), CHUNK_SIZE):
+            block = normalized(store.rows(np.arange(start, min(start + CHUNK_SIZE, len(store.data)))))
+            scores[:, start:start + len(block)] = Q @ block.T
+        scores[np.arange(len(query_rows)), query_rows] = -np.inf  # exclude the query itself
+        return np.argpartition(-scores, k, axis=1)[:, :k]
+
+    rng = np.random.default_rng(seed)
+    query_rows = rng.choice(len(reference.data), size=min(queries, len(reference.data)), replace=False)
+    expected = top_k(reference, query_rows)
+    found = top_k(variant, query_rows)
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(expected, found)]))
+
+
+def benchmark_variant(variant, splits, labels, reference=None):
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import f1_score, roc_auc_score
+    from sklearn.preprocessing import StandardScaler
+
+    start = time.perf_counter()
+    X = {split: variant.rows(indices) for split, indices in splits.items()}
+    load_time = time.perf_counter() - start
+
+    # Real training rows with class weights instead of the SMOTE copy, so every variant sees the same data
+    start = time.perf_counter()
+    scaler = StandardScaler().fit(X['train'])
+    model = LogisticRegression(class_weight='balanced', max_iter=1000, random_state=42)
+    model.fit(scaler.transform(X['train']), labels['train'])
+    train_time = time.perf_counter() - start
+
+    val_proba = model.predict_proba(scaler.transform(X['val']))[:, 1]
+    test_proba = model.predict_proba(scaler.transform(X['test']))[:, 1]
+    threshold = cost_aware_threshold(labels['val'], val_proba, {"FN": 1, "FP": 2})
+    test_pred = (test_proba >= threshold).astype(int)
+    return {
+        'dims': int(variant.data.shape[1]),
+        'dtype': str(variant.data.dtype),
+        'memory_mb': variant.nbytes / 1e6,
+        'load_time': load_time,
+        'train_time': train_time,
+        'val_roc_auc': float(roc_auc_score(labels['val'], val_proba)),
+        'test_roc_auc': float(roc_auc_score(labels['test'], test_proba)),
+        'test_f1_macro': float(f1_score(labels['test'], test_pred, average='macro')),
+        'knn_recall': knn_recall(variant, reference) if reference is not None else 1.0,
+    }
+
+
+def benchmark(names, embeddings_file=EMBEDDINGS_FILE, variants_dir=VARIANTS_DIR, knn=True):
+    embeddings_dir = os.path.dirname(embeddings_file)
+    mapping = load_mapping(os.path.join(embeddings_dir, 'video_id_mapping.txt'))
+    splits = split_indices(mapping, embeddings_dir)
+    labels = split_labels(splits, embeddings_dir)
+    reference = load_variant('float32', embeddings_file, variants_dir)
+    results = {}
+    for name in names:
+        variant = load_variant(name, embeddings_file, variants_dir)
+        use_reference = reference if knn and name != 'float32' else None
+        results[name] = benchmark_variant(variant, splits, labels, use_reference)
+    return results
+
+
+def print_results(results):
+    header = (f"{'Variant':<14} {'Dims':>5} {'dtype':>8} {'Memory MB':>10} {'x smaller':>9} {'Load (s)':>8} "
+              f"{'Train (s)':>9} {'Val AUC':>8} {'Test AUC':>8} {'Test F1':>8} {f'kNN@{KNN_K}':>7}")
+    print(header)
+    print("-" * len(header))
+    base = results.get('float32', {}).get('memory_mb')
+    for name, r in results.items():
+        ratio = f"{base / r['memory_mb']:.1f}" if base else "-"
+        print(f"{name:<14} {r['dims']:5d} {r['dtype']:>8} {r['memory_mb']:10.1f} {ratio:>9} {r['load_time']:8.3f} "
+              f"{r['train_time']:9.2f} {r['val_roc_auc']:8.3f} {r['test_roc_auc']:8.3f} {r['test_f1_macro']:8.3f} "
+              f"{r['knn_recall']:7.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and benchmark compact versions of video_embeddings.npy.")
+    parser.add_argument('command', choices=['build', 'benchmark'])
+    parser.add_argument('--embeddings', default=EMBEDDINGS_FILE)
+    parser.add_argument('--variants-dir', default=VARIANTS_DIR)
+    parser.add_argument('--pca-dims', type=int, nargs='*', default=list(PCA_DIMS))
+    parser.add_argument('--truncate-dims', type=int, nargs='*', default=list(TRUNCATE_DIMS))
+    parser.add_argument('--variants', nargs='+', help="Variants to benchmark (default: all built)")
+    parser.add_argument('--no-knn', action='store_true', help="Skip the nearest-neighbour recall check")
+    parser.add_argument('--output', default=BENCHMARK_FILE)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_variants(args.embeddings, args.variants_dir, args.pca_dims, args.truncate_dims)
+        for name in available_variants(args.variants_dir):
+            print(f"{name}: {load_variant(name, args.embeddings, args.variants_dir).nbytes / 1e6:.1f} MB")
+        return
+
+    names = args.variants or available_variants(args.variants_dir)
+    results = benchmark(names, args.embeddings, args.variants_dir, knn=not args.no_knn)
+    print_results(results)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
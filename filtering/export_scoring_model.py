@@ -0,0 +1,239 @@
+"""Compile best_model.pkl and scaler.pkl into the NumPy artifact read by numpy_scorer.py, and check parity."""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+from sklearn.isotonic import IsotonicRegression
+
+from numpy_scorer import ARTIFACT_FILE, EMBEDDINGS_DIR, FORMAT_VERSION, ScoringModel
+
+MODEL_FILE = os.path.join(EMBEDDINGS_DIR, 'best_model.pkl')
+SCALER_FILE = os.path.join(EMBEDDINGS_DIR, 'scaler.pkl')
+COST_MATRIX = {"FN": 1, "FP": 2} # Validation cost the threshold minimises (notebook cell 5)
+INTERACTION = (0, 1) # Columns multiplied by create_interaction_features
+TOLERANCE = 1e-6 # Largest accepted probability difference in the parity check
+
+
+def create_interaction_features(X):
+    interaction = X[:, 0] * X[:, 1]  # Assume the first two columns are important features
+    return np.c_[X, interaction]
+
+
+def cost_aware_threshold(y_true, probas, cost_matrix):
+    thresholds = np.linspace(0, 1, 100) # 100 thresholds from 0 to 1
+    costs = []
+    for t in thresholds:
+        pred = (probas >= t).astype(int)
+        fn = np.sum((y_true == 1) & (pred == 0)) * cost_matrix["FN"]
+        fp = np.sum((y_true == 0) & (pred == 1)) * cost_matrix["FP"]
+        costs.append(fn + fp)
+    return thresholds[np.argmin(costs)]
+
+
+def _pad(rows, dtype, fill=0):
+    out = np.full((len(rows), max(len(r) for r in rows)), fill, dtype=dtype)
+    for i, row in enumerate(rows):
+        out[i, :len(row)] = row
+    return out
+
+
+def _tree_arrays(trees):
+    """Stack per-tree (feature, threshold, left, right, default_left, value) lists into padded arrays. Leaves
+    become their own children so traversal can run a fixed number of steps."""
+    stacked = {}
+    for i, name in enumerate(('feature', 'threshold', 'left', 'right', 'default_left', 'value')):
+        dtype = {'feature': np.int32, 'left': np.int32, 'right': np.int32, 'default_left': bool}.get(name, np.float64)
+        stacked[name] = _pad([tree[i] for tree in trees], dtype)
+    return stacked
+
+
+def _depth(left, right):
+    depth = np.zeros(len(left), dtype=int)
+    for node in range(len(left)):  # Children always have higher ids than their parent in both libraries
+        if left[node] != node:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+def compile_xgboost(model):
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+    if learner['objective']['name'] != 'binary:logistic' or learner['gradient_booster']['name'] != 'gbtree':
+        raise ValueError(f"Only gbtree boosters with binary:logistic can be exported, "
+                         f"not {learner['gradient_booster']['name']} with {learner['objective']['name']}")
+    gbtree = learner['gradient_booster']['model']
+    trees = gbtree['trees']
+    best_iteration = getattr(model, 'best_iteration', None)
+    if best_iteration is not None:
+        trees = trees[:gbtree['iteration_indptr'][best_iteration + 1]]
+    compiled = []
+    max_depth = 0
+    for tree in trees:
+        left = np.array(tree['left_children'])
+        right = np.array(tree['right_children'])
+        leaf = left == -1
+        nodes = np.arange(len(left))
+        left, right = np.where(leaf, nodes, left), np.where(leaf, nodes, right)
+        conditions = np.array(tree['split_conditions'], dtype=np.float32).astype(np.float64)
+        compiled.append((np.where(leaf, 0, tree['split_indices']), conditions, left, right,
+                         np.array(tree['default_left'], dtype=bool), np.where(leaf, conditions, 0.0)))
+        max_depth = max(max_depth, _depth(left, right))
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    header = {'kind': 'trees', 'comparison': '<', 'aggregate': 'sum', 'depth': max_depth,
+              'base_margin': float(np.log(base_score / (1 - base_score))), 'trees': len(compiled)}
+    return header, _tree_arrays(compiled)
+
+
+def compile_random_forest(model):
+    compiled = []
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        leaf = tree.children_left == -1
+        nodes = np.arange(tree.node_count)
+        left, right = np.where(leaf, nodes, tree.children_left), np.where(leaf, nodes, tree.children_right)
+        counts = tree.value[:, 0, :]
+        positive = list(estimator.classes_).index(1)
+        missing_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool)).astype(bool)
+        compiled.append((np.where(leaf, 0, tree.feature), tree.threshold, left, right, missing_left,
+                         counts[:, positive] / counts.sum(axis=1)))
+        max_depth = max(max_depth, _depth(left, right))
+    header = {'kind': 'trees', 'comparison': '<=', 'aggregate': 'mean', 'depth': max_depth, 'trees': len(compiled)}
+    return header, _tree_arrays(compiled)
+
+
+def compile_calibrated_svm(model):
+    header = {'kind': 'calibrated_svm', 'folds': []}
+    arrays = {}
+    for fold, calibrated in enumerate(model.calibrated_classifiers_):
+        svc = calibrated.estimator
+        calibrator = calibrated.calibrators[0]
+        spec = {'kernel': svc.kernel, 'intercept': float(svc.intercept_[0])}
+        if svc.kernel == 'linear':
+            arrays[f'fold{fold}_coef'] = np.asarray(svc.coef_[0], dtype=np.float64)
+        elif svc.kernel == 'rbf':
+            spec['gamma'] = float(svc._gamma)
+            arrays[f'fold{fold}_support_vectors'] = svc.support_vectors_
+            arrays[f'fold{fold}_dual_coef'] = svc.dual_coef_[0]
+        else:
+            raise ValueError(f"SVM kernel {svc.kernel!r} cannot be exported")
+        if isinstance(calibrator, IsotonicRegression):
+            spec['calibration'] = 'isotonic'
+            arrays[f'fold{fold}_iso_x'] = calibrator.X_thresholds_
+            arrays[f'fold{fold}_iso_y'] = calibrator.y_thresholds_
+        else:
+            spec.update(calibration='sigmoid', a=float(calibrator.a_), b=float(calibrator.b_))
+        header['folds'].append(spec)
+    return header, arrays
+
+
+def compile_model(model):
+    """(header, arrays) describing `model` for ScoringModel."""
+    name = type(model).__name__
+    if name == 'LogisticRegression':
+        return {'kind': 'linear', 'intercept': float(model.intercept_[0])}, {'coef': model.coef_[0].astype(np.float64)}
+    if name == 'CalibratedClassifierCV':
+        return compile_calibrated_svm(model)
+    if name == 'MLPClassifier':
+        arrays = {}
+        for layer, (weights, bias) in enumerate(zip(model.coefs_, model.intercepts_)):
+            arrays[f'layer{layer}_weights'], arrays[f'layer{layer}_bias'] = weights, bias
+        return {'kind': 'mlp', 'activation': model.activation, 'layers': len(model.coefs_)}, arrays
+    if name == 'XGBClassifier':
+        return compile_xgboost(model)
+    if name == 'RandomForestClassifier':
+        return compile_random_forest(model)
+    raise ValueError(f"No exporter for {name}")
+
+
+def export(model_file=MODEL_FILE, scaler_file=SCALER_FILE, embeddings_dir=EMBEDDINGS_DIR, output=ARTIFACT_FILE,
+           threshold=None):
+    model = joblib.load(model_file)
+    scaler = joblib.load(scaler_file)
+    header, arrays = compile_model(model)
+
+    n_features = scaler.n_features_in_
+    arrays['scaler_mean'] = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+    arrays['scaler_scale'] = scaler.scale_ if scaler.with_std else np.ones(n_features)
+
+    X_val = np.load(os.path.join(embeddings_dir, 'X_val.npy'))
+    y_val = np.load(os.path.join(embeddings_dir, 'y_val.npy'), allow_pickle=True).astype(int)
+    val_proba = model.predict_proba(scaler.transform(create_interaction_features(X_val)))[:, 1]
+    if threshold is None:
+        threshold = float(cost_aware_threshold(y_val, val_proba, COST_MATRIX))
+    if type(model).__name__ != 'CalibratedClassifierCV':  # only calibrate non-probabilistic models
+        calibrator = IsotonicRegression(out_of_bounds='clip').fit(val_proba, y_val)
+        arrays['calibrator_x'], arrays['calibrator_y'] = calibrator.X_thresholds_, calibrator.y_thresholds_
+
+    with open(model_file, 'rb') as f:
+        model_sha256 = hashlib.sha256(f.read()).hexdigest()
+    header.update({
+        'format_version': FORMAT_VERSION, 'model_class': type(model).__name__, 'model_sha256': model_sha256,
+        'n_features': n_features - 1, 'interaction': list(INTERACTION), 'threshold': threshold,
+        'cost_matrix': COST_MATRIX, 'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    np.savez_compressed(output, header=np.array(json.dumps(header)), **arrays)
+    return model, scaler
+
+
+def check_parity(model, scaler, artifact=ARTIFACT_FILE, embeddings_dir=EMBEDDINGS_DIR, tolerance=TOLERANCE):
+    """Compare the artifact with the pickled pipeline on the validation and test embeddings; True if they agree."""
+    scoring_model = ScoringModel.load(artifact)
+    agree = True
+    for split in ('val', 'test'):
+        X = np.load(os.path.join(embeddings_dir, f'X_{split}.npy'))
+        expected = model.predict_proba(scaler.transform(create_interaction_features(X)))[:, 1]
+        probas = scoring_model.predict_proba(X)
+        difference = float(np.max(np.abs(probas - expected))) if len(X) else 0.0
+        labels_differ = int(np.sum((probas >= scoring_model.threshold) != (expected >= scoring_model.threshold)))
+        print(f"{split}: {len(X)} rows, max |p_numpy - p_model| = {difference:.2e}, {labels_differ} labels differ")
+        agree &= difference <= tolerance and labels_differ == 0
+    return agree
+
+
+def cold_start(code):
+    """Seconds a fresh interpreter takes to run `code`, i.e. what a scoring worker pays before its first row."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the classifier to a NumPy scoring artifact.")
+    parser.add_argument('--model', default=MODEL_FILE)
+    parser.add_argument('--scaler', default=SCALER_FILE)
+    parser.add_argument('--embeddings-dir', default=EMBEDDINGS_DIR)
+    parser.add_argument('--output', default=ARTIFACT_FILE)
+    parser.add_argument('--threshold', type=float, help="Use this threshold instead of the validation optimum")
+    parser.add_argument('--check', action='store_true', help="Only run the parity check on an existing artifact")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    if args.check:
+        model, scaler = joblib.load(args.model), joblib.load(args.scaler)
+    else:
+        model, scaler = export(args.model, args.scaler, args.embeddings_dir, args.output, args.threshold)
+        header = ScoringModel.load(args.output).header
+        print(f"Exported {header['model_class']} to {args.output} ({os.path.getsize(args.output) / 1e6:.2f} MB, "
+              f"threshold {header['threshold']:.3f}).")
+
+    pickle_time = cold_start(f"import joblib; joblib.load({os.path.abspath(args.model)!r})")
+    artifact_time = cold_start(f"import sys; sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r}); "
+                               f"from numpy_scorer import ScoringModel; ScoringModel.load({os.path.abspath(args.output)!r})")
+    print(f"Worker start (imports and load in a new process): {pickle_time:.2f}s with joblib, "
+          f"{artifact_time:.2f}s with numpy_scorer.")
+
+    if not check_parity(model, scaler, args.output, args.embeddings_dir, args.tolerance):
+        raise SystemExit("Parity check failed: the artifact does not reproduce the model's predictions.")
+    print("Parity check passed.")
+
+
+if __name__ == "__main__":
+    main()
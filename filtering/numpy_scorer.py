@@ -0,0 +1,162 @@
+"""Relevance scoring with the artifact written by export_scoring_model.py, using NumPy only (no joblib, sklearn,
+imblearn or XGBoost import)."""
+import argparse
+import csv
+import json
+import os
+import time
+
+import numpy as np
+
+EMBEDDINGS_DIR = 'embeddings_gte-Qwen2-7B-instruct'
+ARTIFACT_FILE = os.path.join(EMBEDDINGS_DIR, 'scoring_model.npz') # Written by export_scoring_model.py
+EMBEDDINGS_FILE = os.path.join(EMBEDDINGS_DIR, 'video_embeddings.npy')
+MAPPING_FILE = os.path.join(EMBEDDINGS_DIR, 'video_id_mapping.txt') # Row index -> video_id
+PREDICTIONS_FILE = os.path.join(EMBEDDINGS_DIR, 'unlabeled_predictions.csv')
+FORMAT_VERSION = 1 # Artifact layout version; bumped when the layout changes
+CHUNK_SIZE = 4096 # Rows scored at a time; tree models hold CHUNK_SIZE x trees node indices
+
+
+def _sigmoid(z):
+    return np.exp(-np.logaddexp(0, -z))
+
+
+ACTIVATIONS = {
+    'identity': lambda z: z,
+    'relu': lambda z: np.maximum(z, 0),
+    'tanh': np.tanh,
+    'logistic': _sigmoid,
+}
+
+
+def _traverse(X, feature, threshold, left, right, default_left, value, depth, strict):
+    """Leaf value reached in every tree by every row: (rows, trees). Trees are padded to the same number of
+    nodes; a leaf is its own left and right child, so rows that reach a leaf early stay there."""
+    trees = np.arange(feature.shape[0])
+    node = np.zeros((X.shape[0], feature.shape[0]), dtype=np.int32)
+    for _ in range(depth):
+        x = np.take_along_axis(X, feature[trees, node], axis=1)
+        split = threshold[trees, node]
+        go_left = x < split if strict else x <= split
+        go_left = np.where(np.isnan(x), default_left[trees, node], go_left)
+        node = np.where(go_left, left[trees, node], right[trees, node])
+    return value[trees, node]
+
+
+class ScoringModel:
+    """The exported pipeline. `predict_proba` reproduces best_model.predict_proba(...)[:, 1] on the scaled
+    features, `calibrate` applies the isotonic calibrator and `predict` the threshold to the uncalibrated
+    probability, as the threshold was chosen on those (notebook cells 5 and 7)."""
+
+    def __init__(self, header, arrays):
+        if header.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Artifact format {header.get('format_version')} is not supported "
+                             f"(expected {FORMAT_VERSION}); export the model again.")
+        self.header = header
+        self.arrays = arrays
+        self.kind = header['kind']
+        self.threshold = header['threshold']
+
+    @classmethod
+    def load(cls, path=ARTIFACT_FILE):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files if name != 'header'}
+            header = json.loads(str(data['header']))
+        return cls(header, arrays)
+
+    def features(self, X):
+        """Interaction term appended, then standardised; computed in the input's float dtype, like sklearn."""
+        X = np.asarray(X)
+        if not np.issubdtype(X.dtype, np.floating):
+            X = X.astype(np.float64)
+        first, second = self.header['interaction']
+        X = np.c_[X, X[:, first] * X[:, second]]
+        X -= self.arrays['scaler_mean'].astype(X.dtype)
+        X /= self.arrays['scaler_scale'].astype(X.dtype)
+        return X
+
+    def _svm_probability(self, X, fold):
+        spec = self.header['folds'][fold]
+        X = X.astype(np.float64)  # libsvm computes kernels in float64 whatever the input dtype
+        if spec['kernel'] == 'linear':
+            decision = X @ self.arrays[f'fold{fold}_coef'] + spec['intercept']
+        else:
+            vectors = self.arrays[f'fold{fold}_support_vectors']
+            distances = (X ** 2).sum(axis=1)[:, None] - 2 * X @ vectors.T + (vectors ** 2).sum(axis=1)[None, :]
+            decision = np.exp(-spec['gamma'] * distances) @ self.arrays[f'fold{fold}_dual_coef'] + spec['intercept']
+        if spec['calibration'] == 'sigmoid':
+            return 1.0 / (1.0 + np.exp(spec['a'] * decision + spec['b']))
+        return np.interp(decision, self.arrays[f'fold{fold}_iso_x'], self.arrays[f'fold{fold}_iso_y'])
+
+    def _raw_proba(self, X):
+        if self.kind == 'linear':
+            return _sigmoid(X @ self.arrays['coef'] + self.header['intercept'])
+        if self.kind == 'calibrated_svm':
+            return np.mean([self._svm_probability(X, fold) for fold in range(len(self.header['folds']))], axis=0)
+        if self.kind == 'mlp':
+            activation = ACTIVATIONS[self.header['activation']]
+            for layer in range(self.header['layers']):
+                X = X @ self.arrays[f'layer{layer}_weights'] + self.arrays[f'layer{layer}_bias']
+                X = activation(X) if layer < self.header['layers'] - 1 else _sigmoid(X)
+            return X[:, 0]
+        if self.kind == 'trees':
+            # Both libraries compare float32 features against float32 split values
+            leaves = _traverse(
+                X.astype(np.float32), self.arrays['feature'], self.arrays['threshold'], self.arrays['left'],
+                self.arrays['right'], self.arrays['default_left'], self.arrays['value'], self.header['depth'],
+                self.header['comparison'] == '<'
+            )
+            if self.header['aggregate'] == 'mean':
+                return leaves.mean(axis=1)
+            return _sigmoid(leaves.sum(axis=1, dtype=np.float64) + self.header['base_margin'])
+        raise ValueError(f"Unknown model kind {self.kind!r}")
+
+    def predict_proba(self, X):
+        """Uncalibrated probability of the relevant class for raw embeddings (rows of video_embeddings.npy)."""
+        X = np.asarray(X)
+        return np.concatenate([self._raw_proba(self.features(X[start:start + CHUNK_SIZE]))
+                               for start in range(0, len(X), CHUNK_SIZE)]) if len(X) else np.empty(0)
+
+    def calibrate(self, probas):
+        if 'calibrator_x' not in self.arrays:  # Calibrated SVMs are not recalibrated, as in the notebook
+            return probas
+        return np.interp(probas, self.arrays['calibrator_x'], self.arrays['calibrator_y'])
+
+    def predict(self, X):
+        return (self.predict_proba(X) >= self.threshold).astype(int)
+
+    def score(self, X):
+        """(labels, uncalibrated probabilities, calibrated probabilities)."""
+        probas = self.predict_proba(X)
+        return (probas >= self.threshold).astype(int), probas, self.calibrate(probas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score video embeddings with the exported NumPy model.")
+    parser.add_argument('--artifact', default=ARTIFACT_FILE)
+    parser.add_argument('--embeddings', default=EMBEDDINGS_FILE)
+    parser.add_argument('--mapping', default=MAPPING_FILE)
+    parser.add_argument('--output', default=PREDICTIONS_FILE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    model = ScoringModel.load(args.artifact)
+    loaded = time.perf_counter() - start
+    with open(args.mapping, 'r') as f:
+        video_ids = [line.strip() for line in f]
+    embeddings = np.load(args.embeddings, mmap_mode='r')
+
+    start = time.perf_counter()
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['video_id', 'predicted_label', 'confidence', 'calibrated_confidence'])
+        for begin in range(0, len(video_ids), CHUNK_SIZE):
+            labels, probas, calibrated = model.score(embeddings[begin:begin + CHUNK_SIZE])
+            writer.writerows(zip(video_ids[begin:begin + CHUNK_SIZE], labels, probas, calibrated))
+    elapsed = time.perf_counter() - start
+    print(f"Loaded {model.header['model_class']} artifact in {loaded * 1000:.0f} ms; scored {len(video_ids)} videos "
+          f"in {elapsed:.1f}s ({len(video_ids) / max(elapsed, 1e-9):.0f}/s). Predictions saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import os
+import re
+import sqlite3
+import argparse
+import logging
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from langid.langid import LanguageIdentifier, model as langid_model
+except ImportError:  # Optional: the built-in script and stopword classifier is used instead
+    LanguageIdentifier = None
+
+DATABASE_FILE = 'ds_edu_videos.db' # SQLite database file with the videos table
+LOG_FILE = 'language_detection.log'
+BATCH_SIZE = 500 # Videos classified per worker task
+DESCRIPTION_CHARS = 1000 # Leading description characters used; the rest is mostly links and boilerplate
+ROUTING_CONFIDENCE = 0.8 # Minimum confidence before the transcript scrapers act on a detected language
+
+# Non-Latin scripts and the language they are taken for; kana and Han are resolved to Japanese or Chinese together
+SCRIPTS = {
+    'kana': r'[\u3040-\u30ff]',
+    'han': r'[\u4e00-\u9fff]',
+    'hangul': r'[\uac00-\ud7af\u1100-\u11ff]',
+    'cyrillic': r'[\u0400-\u04ff]',
+    'arabic': r'[\u0600-\u06ff]',
+    'hebrew': r'[\u0590-\u05ff]',
+    'devanagari': r'[\u0900-\u097f]',
+    'bengali': r'[\u0980-\u09ff]',
+    'tamil': r'[\u0b80-\u0bff]',
+    'telugu': r'[\u0c00-\u0c7f]',
+    'thai': r'[\u0e00-\u0e7f]',
+    'greek': r'[\u0370-\u03ff]',
+}
+SCRIPT_LANGUAGES = {
+    'hangul': 'ko', 'cyrillic': 'ru', 'arabic': 'ar', 'hebrew': 'he', 'devanagari': 'hi', 'bengali': 'bn',
+    'tamil': 'ta', 'telugu': 'te', 'thai': 'th', 'greek': 'el',
+}
+SCRIPT_PATTERNS = {script: re.compile(pattern) for script, pattern in SCRIPTS.items()}
+UKRAINIAN_LETTERS = re.compile(r'[іїєґІЇЄҐ]')
+SCRIPT_SHARE = 0.3 # Share of the letters a script needs before it decides the language
+
+# Frequent words of Latin-script languages, chosen to overlap as little as possible
+STOPWORDS = {
+    'en': 'the and for with how what is are this that to of in you your from using learn beginners explained',
+    'es': 'el los las del que con una como qué cómo por desde cero datos aprende principiantes también muy',
+    'pt': 'os do da dos das não com uma você são aula dados banco iniciantes também muito isso',
+    'fr': 'le les des du une et est pour avec dans sur cours données vous débutants comment ce',
+    'de': 'der die das und ist mit für ein eine den dem von auf wie datenbank nicht anfänger',
+    'it': 'il gli della delle di è per corso dati che nel questo come sono principianti',
+    'nl': 'het een en van voor met hoe wat niet op je wordt zijn',
+    'id': 'dan yang untuk dengan ini itu cara belajar dari tidak ke pemula',
+    'tr': 've bir bu için ile nasıl ders veri tabanı nedir ne',
+    'pl': 'i w z na jak się jest dla nie baza danych kurs',
+}
+STOPWORD_SETS = {language: set(words.split()) for language, words in STOPWORDS.items()}
+WORD_PATTERN = re.compile(r'\w+')
+
+_identifier = None # langid model, loaded once per worker process
+
+
+def create_tables(cursor):
+    # Detected language per video; method is 'metadata', 'langid' or 'builtin'
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS video_languages (
+        video_id TEXT PRIMARY KEY,
+        language TEXT,
+        confidence REAL,
+        method TEXT,
+        detected_at TEXT
+    );
+    """)
+
+
+def metadata_language(audio_language, textual_language):
+    """Primary language subtag from the API metadata ('en-US' -> 'en'), or None when both are 'N/A'."""
+    for code in (audio_language, textual_language):
+        if code and code not in ('N/A', 'zxx', 'und'):
+            return code.split('-')[0].lower()
+    return None
+
+
+def classify_text(text):
+    """(language, confidence) from the script of the text or, for Latin script, its stopwords. ('und', 0.0)
+    when there is no evidence, e.g. titles made only of technical terms."""
+    letters = sum(1 for char in text if char.isalpha())
+    if not letters:
+        return 'und', 0.0
+    counts = {script: len(pattern.findall(text)) for script, pattern in SCRIPT_PATTERNS.items()}
+    cjk = counts.pop('kana') + counts.pop('han')
+    script = max(counts, key=counts.get)
+    if cjk > counts[script]:
+        language, count = ('ja' if SCRIPT_PATTERNS['kana'].search(text) else 'zh'), cjk
+    elif script == 'cyrillic' and UKRAINIAN_LETTERS.search(text):
+        language, count = 'uk', counts[script]
+    else:
+        language, count = SCRIPT_LANGUAGES[script], counts[script]
+    if count / letters > SCRIPT_SHARE:
+        return language, round(min(1.0, count / letters / (2 * SCRIPT_SHARE)), 3)
+
+    hits = {language: 0 for language in STOPWORD_SETS}
+    for word in WORD_PATTERN.findall(text.lower()):
+        for language, words in STOPWORD_SETS.items():
+            if word in words:
+                hits[language] += 1
+    best = max(hits, key=hits.get)
+    total = sum(hits.values())
+    if not total:
+        return 'und', 0.0
+    # Share of the matches that point to the winner, discounted when there are only a few matches
+    return best, round(hits[best] / total * (1 - 0.5 ** hits[best]), 3)
+
+
+def classify_langid(text):
+    global _identifier
+    if _identifier is None:
+        _identifier = LanguageIdentifier.from_modelstring(langid_model, norm_probs=True)
+    language, probability = _identifier.classify(text)
+    return language, round(float(probability), 3)
+
+
+def detect_batch(rows, use_langid=True):
+    """Language of each (video_id, title, description, audio_language, textual_language) row."""
+    detected_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    results = []
+    for video_id, title, description, audio_language, textual_language in rows:
+        language = metadata_language(audio_language, textual_language)
+        if language:
+            results.append((video_id, language, 1.0, 'metadata', detected_at))
+            continue
+        description = '' if description in (None, 'N/A') else description
+        text = f"{title or ''}\n{title or ''}\n{description[:DESCRIPTION_CHARS]}"  # Title counted twice
+        if use_langid and LanguageIdentifier is not None:
+            language, confidence = classify_langid(text)
+            results.append((video_id, language, confidence, 'langid', detected_at))
+        else:
+            language, confidence = classify_text(text)
+            results.append((video_id, language, confidence, 'builtin', detected_at))
+    return results
+
+
+def load_languages(conn, min_confidence=ROUTING_CONFIDENCE):
+    """{video_id: language} for videos detected with at least `min_confidence`; empty before the first run."""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'video_languages'").fetchone()
+    if not exists:
+        return {}
+    return dict(conn.execute(
+        "SELECT video_id, language FROM video_languages WHERE confidence >= ? AND language != 'und'",
+        (min_confidence,)
+    ))
+
+
+def report_routing(conn, min_confidence=ROUTING_CONFIDENCE):
+    """Print how many videos the detected languages route to supplement_transcripts.py."""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    pending = "1 = 1"
+    if 'transcripts' in tables:
+        pending += " AND vl.video_id NOT IN (SELECT video_id FROM transcripts)"
+    if 'failed_videos' in tables:
+        pending += " AND vl.video_id NOT IN (SELECT video_id FROM failed_videos)"
+    skipped, routed, filled = conn.execute(f"""
+        SELECT
+            SUM(vl.language != 'en' AND {pending}),
+            SUM(vl.language != 'en'),
+            SUM(vl.method != 'metadata')
+        FROM video_languages vl
+        WHERE vl.confidence >= ? AND vl.language != 'und'
+    """, (min_confidence,)).fetchone()
+    print(f"{routed or 0} videos detected as non-English with confidence >= {min_confidence}; "
+          f"{filled or 0} confident detections are for videos whose metadata language was N/A.")
+    print(f"scrape_transcripts.py leaves {skipped or 0} videos without a transcript to supplement_transcripts.py "
+          f"instead of looking up an English track. When a video has no English track, supplement_transcripts.py "
+          f"translates its detected-language track.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect the language of each video from its metadata, title and description.")
+    parser.add_argument('--db', default=DATABASE_FILE)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--redetect', action='store_true', help="Classify videos that already have a language again")
+    parser.add_argument('--no-langid', action='store_true', help="Use the built-in classifier even if langid is installed")
+    parser.add_argument('--min-confidence', type=float, default=ROUTING_CONFIDENCE)
+    args = parser.parse_args()
+
+    logging.basicConfig(filename=LOG_FILE, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    conn = sqlite3.connect(args.db)
+    create_tables(conn.cursor())
+    query = "SELECT v.video_id, v.title, v.description, v.audio_language, v.textual_language FROM videos v"
+    if not args.redetect:
+        query += " LEFT JOIN video_languages vl ON vl.video_id = v.video_id WHERE vl.video_id IS NULL"
+    cursor = conn.cursor().execute(query)
+
+    use_langid = not args.no_langid
+    method = 'langid' if use_langid and LanguageIdentifier is not None else 'the built-in classifier'
+    print(f"Detecting languages with {method}.")
+    detected = 0
+    workers = args.workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE * workers)
+            if not rows:
+                break
+            batches = [rows[start:start + BATCH_SIZE] for start in range(0, len(rows), BATCH_SIZE)]
+            for results in pool.map(detect_batch, batches, [use_langid] * len(batches)):
+                conn.executemany("""
+                    INSERT OR REPLACE INTO video_languages (video_id, language, confidence, method, detected_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, results)
+                detected += len(results)
+            conn.commit()
+            logging.info(f"Detected languages for {detected} videos.")
+    print(f"Detected languages for {detected} videos.")
+
+    report_routing(conn, args.min_confidence)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
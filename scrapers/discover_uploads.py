@@ -0,0 +1,183 @@
+import os
+import json
+import sqlite3
+import logging
+import argparse
+from datetime import datetime
+from googleapiclient.errors import HttpError
+from instrumentation import metrics, setup_metrics
+from scrape_videos import hydrate_videos
+from response_cache import add_cache_arguments, setup_cache
+from youtube_client import API_KEYS_FILE, QuotaExhausted, YouTubeClients, load_api_keys
+
+DATABASE_FILE = 'ds_edu_videos.db' # SQLite database file with videos and channels
+STATE_FILE = 'uploads_discovery_state.json' # File to store the state of the discovery run
+LOG_FILE = 'uploads_discovery.log' # Log file for uploads discovery
+CANDIDATES_TABLE = 'discovered_videos' # New candidate videos, to be classified before merging into videos
+
+# Channels with at least one relevant video, most relevant videos first
+CHANNELS_QUERY = """
+    SELECT c.channel_id, c.uploads_playlist, COUNT(*) AS relevant_videos
+    FROM channels c
+    JOIN videos v ON v.channel_id = c.channel_id
+    WHERE v.predicted_label = 1 AND c.uploads_playlist IS NOT NULL
+    GROUP BY c.channel_id, c.uploads_playlist
+    ORDER BY relevant_videos DESC
+"""
+
+
+def create_candidates_table(cursor):
+    # Same columns as the keyword tables of scrape_videos.py, plus the channel the video was found through
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CANDIDATES_TABLE} (
+            video_id TEXT PRIMARY KEY,
+            title TEXT,
+            channel_title TEXT,
+            published_at TEXT,
+            description TEXT,
+            tags TEXT,
+            audio_language TEXT,
+            textual_language TEXT,
+            duration TEXT,
+            definition TEXT,
+            caption_availability TEXT,
+            view_count INTEGER,
+            like_count INTEGER,
+            comment_count INTEGER,
+            paid_product_placement TEXT,
+            collected_at TEXT,
+            keywords TEXT,
+            channel_id TEXT
+        )
+    """)
+
+
+def load_known_video_ids(cursor):
+    known = {row[0] for row in cursor.execute("SELECT video_id FROM videos")}
+    known.update(row[0] for row in cursor.execute(f"SELECT video_id FROM {CANDIDATES_TABLE}"))
+    return known
+
+
+def list_playlist_video_ids(clients, playlist_id, page_token=None):
+    """Yield (video_ids, next_page_token) for each page of an uploads playlist (1 quota unit per 50 videos)."""
+    while True:
+        try:
+            response = clients.execute(
+                ("playlistItems", "list"),
+                part='contentDetails',
+                playlistId=playlist_id,
+                maxResults=50,
+                pageToken=page_token
+            )
+        except HttpError as e:
+            if e.resp.status == 404:
+                logging.warning(f"Uploads playlist not found: {playlist_id}")
+                return
+            raise
+        page_token = response.get('nextPageToken')
+        yield [item['contentDetails']['videoId'] for item in response.get('items', [])], page_token
+        if not page_token:
+            return
+
+
+def insert_candidates(cursor, rows):
+    if not rows:
+        return
+    columns = ", ".join(rows[0].keys())
+    placeholders = ", ".join(["?"] * len(rows[0]))
+    cursor.executemany(
+        f"INSERT OR IGNORE INTO {CANDIDATES_TABLE} ({columns}) VALUES ({placeholders})",
+        [tuple(row.values()) for row in rows]
+    )
+
+
+def save_state(state_file, state):
+    with open(state_file, 'w') as file:
+        json.dump(state, file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find candidate videos through the uploads playlists of relevant channels.")
+    parser.add_argument('--db', default=DATABASE_FILE)
+    parser.add_argument('--api-keys', default=API_KEYS_FILE)
+    parser.add_argument('--state-file', default=STATE_FILE)
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', handlers=[
+        logging.FileHandler(LOG_FILE),
+        logging.StreamHandler()
+    ])
+    setup_metrics('uploads_discovery')
+    setup_cache(args.cache_file, args.cache)
+    # Replay answers every request from the cache, so no API keys are needed
+    clients = YouTubeClients(load_api_keys(args.api_keys) if args.cache != 'replay' else ['replay'])
+
+    collected_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    conn = sqlite3.connect(args.db)
+    cursor = conn.cursor()
+    create_candidates_table(cursor)
+
+    state = {}
+    if os.path.exists(args.state_file):
+        with open(args.state_file, 'r') as file:
+            state = json.load(file)
+    start_index = state.get('channel_index', 0)
+    page_token = state.get('nextPageToken')
+
+    channels = cursor.execute(CHANNELS_QUERY).fetchall()
+    known_video_ids = load_known_video_ids(cursor)
+    found = 0
+    pending = []  # new IDs waiting to be hydrated in batches of 50
+
+    def flush(force=False):
+        nonlocal found, pending
+        while len(pending) >= 50 or (force and pending):
+            batch, pending = pending[:50], pending[50:]
+            rows = list(hydrate_videos(clients, batch, collected_at, 'uploads playlist').values())
+            for row in rows:
+                row['channel_id'] = channel_id
+            with metrics.timer('sqlite_write', table=CANDIDATES_TABLE):
+                insert_candidates(cursor, rows)
+                conn.commit()
+            metrics.inc('rows_written_total', len(rows), table=CANDIDATES_TABLE)
+            found += len(rows)
+
+    try:
+        for index in range(start_index, len(channels)):
+            channel_id, playlist_id, relevant_videos = channels[index]
+            new_in_channel = 0
+            for video_ids, next_token in list_playlist_video_ids(clients, playlist_id, page_token):
+                new_ids = [v for v in video_ids if v not in known_video_ids]
+                known_video_ids.update(new_ids)
+                pending.extend(new_ids)
+                new_in_channel += len(new_ids)
+                flush()
+                # Only checkpoint once every listed ID is stored; on resume, pages after the checkpoint are
+                # listed again and IDs already in the candidates table are skipped
+                if not pending:
+                    save_state(args.state_file, {'channel_index': index, 'nextPageToken': next_token})
+            page_token = None
+            flush(force=True)
+            logging.info(f"Channel {channel_id} ({index + 1}/{len(channels)}, {relevant_videos} relevant videos): "
+                         f"{new_in_channel} new candidate videos. "
+                         f"Quota used = {metrics.total('youtube_quota_units_total'):g}")
+            save_state(args.state_file, {'channel_index': index + 1, 'nextPageToken': None})
+    except (KeyboardInterrupt, HttpError, QuotaExhausted) as e:
+        logging.info(f"Discovery stopped ({type(e).__name__}). Resume from {args.state_file} on the next run.")
+        conn.close()
+        raise SystemExit(1)
+
+    conn.close()
+    if os.path.exists(args.state_file):
+        os.remove(args.state_file)
+
+    # search.list returns at most 50 results per 100 units
+    quota_used = metrics.total('youtube_quota_units_total')
+    per_unit = found / quota_used if quota_used else 0
+    logging.info(f"Uploads discovery completed: {found} new candidate videos for {quota_used:g} quota units "
+                 f"({per_unit:.2f} videos/unit vs. at most 0.50 videos/unit with search.list).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import atexit
+import bisect
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+
+METRICS_PORT = os.environ.get('METRICS_PORT') # Serve /metrics on this port while a scraper runs (off if unset)
+FLUSH_INTERVAL = 30 # Seconds between rewrites of the metrics file during a run
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300) # Histogram bounds in seconds
+
+# Quota units per YouTube Data API method (https://developers.google.com/youtube/v3/determine_quota_cost)
+QUOTA_COST = {'youtube.search.list': 100}
+DEFAULT_QUOTA_COST = 1
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (the max for the overflow bucket)."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (self.max,), self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Metrics:
+    """Thread-safe counters and latency histograms, keyed by metric name and labels (endpoint, stage, table...)."""
+
+    def __init__(self, job):
+        self.job = job
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)  # (name, labels) -> value
+        self.histograms = defaultdict(Histogram)  # (name, labels) -> Histogram
+
+    def inc(self, name, value=1, **labels):
+        with self.lock:
+            self.counters[(name, _label_key(labels))] += value
+
+    def observe(self, name, value, **labels):
+        with self.lock:
+            self.histograms[(name, _label_key(labels))].observe(value)
+
+    def total(self, name):
+        """Sum of a counter over all label values, e.g. total('youtube_quota_units_total')."""
+        with self.lock:
+            return sum(value for (counter, _), value in self.counters.items() if counter == name)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Record the duration of the block in `<name>_seconds`; exceptions are counted in `<name>_errors_total`."""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self.inc(f'{name}_errors_total', error=type(e).__name__, **labels)
+            raise
+        finally:
+            self.observe(f'{name}_seconds', time.perf_counter() - start, **labels)
+
+    def sleep(self, seconds, reason):
+        """time.sleep that accounts the time to `reason` (throttle, backoff, batch_pause)."""
+        self.inc('sleep_seconds_total', seconds, reason=reason)
+        time.sleep(seconds)
+
+    def prometheus_text(self):
+        lines = []
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"{name}{_format_labels(labels, job=self.job)} {value:g}")
+            for (name, labels), hist in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, hist.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, job=self.job, le=f'{bound:g}')} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, job=self.job, le='+Inf')} {hist.count}")
+                lines.append(f"{name}_sum{_format_labels(labels, job=self.job)} {hist.sum:g}")
+                lines.append(f"{name}_count{_format_labels(labels, job=self.job)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        # Write then rename, so a node_exporter textfile collector never reads a partial file
+        with open(path + '.tmp', 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(path + '.tmp', path)
+
+    def summary(self):
+        elapsed = time.time() - self.started
+        lines = [f"Run summary ({self.job}, {elapsed:.0f}s):"]
+        with self.lock:
+            for (name, labels), hist in sorted(self.histograms.items()):
+                lines.append(f"  {name}{_format_labels(labels)}: n={hist.count} mean={hist.sum / hist.count:.3f}s "
+                             f"p50<={hist.quantile(0.5):.3f}s p95<={hist.quantile(0.95):.3f}s max={hist.max:.3f}s")
+            for (name, labels), value in sorted(self.counters.items()):
+                rate = f" ({value / elapsed:.2f}/s)" if name == 'rows_written_total' and elapsed else ""
+                lines.append(f"  {name}{_format_labels(labels)}: {value:g}{rate}")
+        return "\n".join(lines)
+
+
+def _format_labels(labels, **extra):
+    items = list(labels) + sorted(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+metrics = Metrics('scraper')  # Shared registry; setup_metrics() names it and starts exporting
+
+
+class InstrumentedHttpRequest(HttpRequest):
+    """googleapiclient request class (build(..., requestBuilder=...)) that times every API call by method,
+    counts HTTP errors by status and accounts quota units."""
+
+    def execute(self, *args, **kwargs):
+        endpoint = self.methodId  # e.g. youtube.commentThreads.list
+        try:
+            with metrics.timer('youtube_request', endpoint=endpoint):
+                response = super().execute(*args, **kwargs)
+        except HttpError as e:
+            if e.resp.status != 304:  # Not Modified answers a conditional request (response_cache.py)
+                metrics.inc('youtube_http_errors_total', endpoint=endpoint, status=e.resp.status)
+            if e.resp.status != 403:  # failed requests are charged too, except quota rejections
+                metrics.inc('youtube_quota_units_total', QUOTA_COST.get(endpoint, DEFAULT_QUOTA_COST), endpoint=endpoint)
+            raise
+        metrics.inc('youtube_quota_units_total', QUOTA_COST.get(endpoint, DEFAULT_QUOTA_COST), endpoint=endpoint)
+        return response
+
+
+def serve(port):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = metrics.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', int(port)), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"Serving metrics on http://127.0.0.1:{port}/metrics")
+    return server
+
+
+def setup_metrics(job, metrics_file=None, port=METRICS_PORT):
+    """Start exporting the shared registry for a scraper run. The Prometheus text file `<job>_metrics.prom`
+    is rewritten every FLUSH_INTERVAL seconds and at exit, when a summary is also logged."""
+    metrics.job = job
+    metrics.started = time.time()
+    metrics_file = metrics_file or f'{job}_metrics.prom'
+    stop = threading.Event()
+
+    def flush_periodically():
+        while not stop.wait(FLUSH_INTERVAL):
+            metrics.write(metrics_file)
+
+    def finish():
+        stop.set()
+        metrics.write(metrics_file)
+        logging.info(metrics.summary())
+
+    threading.Thread(target=flush_periodically, daemon=True).start()
+    if port:
+        serve(port)
+    atexit.register(finish)
+    return metrics
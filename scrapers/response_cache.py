@@ -0,0 +1,169 @@
+import argparse
+import json
+import logging
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+from googleapiclient.errors import HttpError
+
+from instrumentation import InstrumentedHttpRequest, metrics
+
+CACHE_FILE = 'api_cache.db' # SQLite file with the raw API responses, kept apart from the dataset
+COMPRESSION_LEVEL = 6
+# Metadata calls whose responses are kept; comment threads are not cached (large and read once)
+CACHED_METHODS = {'youtube.videos.list', 'youtube.channels.list', 'youtube.search.list', 'youtube.playlistItems.list'}
+# off: no cache; revalidate: conditional request (If-None-Match) for cached responses; prefer: cached responses
+# are used without a request; replay: cache only, a request that is not cached raises CacheMiss
+CACHE_MODES = ('off', 'revalidate', 'prefer', 'replay')
+
+cache = None # Shared cache used by CachedHttpRequest; set by setup_cache()
+
+
+class CacheMiss(Exception):
+    """Raised in replay mode for a request whose response is not in the cache."""
+
+
+def request_key(method_id, uri):
+    """Method and sorted query parameters without the API key, e.g. youtube.videos.list?id=abc&part=snippet."""
+    params = sorted((k, v) for k, v in parse_qsl(urlparse(uri).query, keep_blank_values=True) if k != 'key')
+    return f"{method_id}?{urlencode(params)}"
+
+
+class ResponseCache:
+    """Raw API responses (zlib-compressed JSON) with their ETag, keyed by request."""
+
+    def __init__(self, path=CACHE_FILE, mode='revalidate'):
+        self.path = path
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS api_responses (
+            request_key TEXT PRIMARY KEY,
+            method TEXT,
+            etag TEXT,
+            body BLOB,
+            raw_size INTEGER,
+            fetched_at TEXT,
+            validated_at TEXT
+        );
+        """)
+        self.conn.commit()
+
+    def get(self, key):
+        """(etag, response) of a cached request, or None."""
+        with self.lock:
+            row = self.conn.execute("SELECT etag, body FROM api_responses WHERE request_key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(zlib.decompress(row[1]))
+
+    def put(self, key, method, response):
+        raw = json.dumps(response, separators=(',', ':')).encode('utf-8')
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self.lock:
+            self.conn.execute("""
+                INSERT OR REPLACE INTO api_responses (request_key, method, etag, body, raw_size, fetched_at, validated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (key, method, response.get('etag'), zlib.compress(raw, COMPRESSION_LEVEL), len(raw), now, now))
+            self.conn.commit()
+
+    def touch(self, key):
+        """Record that the server confirmed the cached response is still current."""
+        with self.lock:
+            self.conn.execute("UPDATE api_responses SET validated_at = ? WHERE request_key = ?",
+                              (datetime.now().strftime('%Y-%m-%d %H:%M:%S'), key))
+            self.conn.commit()
+
+    def iter_responses(self, method):
+        """Every cached response of `method` (e.g. 'youtube.videos.list'), to extract fields without crawling."""
+        with self.lock:
+            rows = self.conn.execute("SELECT body FROM api_responses WHERE method = ? ORDER BY request_key",
+                                     (method,)).fetchall()
+        for (body,) in rows:
+            yield json.loads(zlib.decompress(body))
+
+    def stats(self):
+        with self.lock:
+            return self.conn.execute("""
+                SELECT method, COUNT(*), SUM(raw_size), SUM(LENGTH(body)), MIN(fetched_at), MAX(validated_at)
+                FROM api_responses GROUP BY method ORDER BY method
+            """).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+class CachedHttpRequest(InstrumentedHttpRequest):
+    """Request class used by youtube_client.py. Without a cache (or for methods not in CACHED_METHODS) it is
+    InstrumentedHttpRequest; otherwise it answers from, validates against or fills the shared cache."""
+
+    def execute(self, *args, **kwargs):
+        if cache is None or cache.mode == 'off':
+            return super().execute(*args, **kwargs)
+        endpoint = self.methodId
+        if endpoint not in CACHED_METHODS:
+            if cache.mode == 'replay':
+                raise CacheMiss(f"{endpoint} is not cached; replay makes no network requests")
+            return super().execute(*args, **kwargs)
+
+        key = request_key(endpoint, self.uri)
+        entry = cache.get(key)
+        if entry is not None and cache.mode in ('prefer', 'replay'):
+            metrics.inc('youtube_cache_total', endpoint=endpoint, result='hit')
+            return entry[1]
+        if cache.mode == 'replay':
+            metrics.inc('youtube_cache_total', endpoint=endpoint, result='miss')
+            raise CacheMiss(f"No cached response for {key} in {cache.path}")
+
+        if entry is not None and entry[0]:
+            self.headers['If-None-Match'] = entry[0]
+        try:
+            response = super().execute(*args, **kwargs)
+        except HttpError as e:
+            if e.resp.status == 304 and entry is not None:
+                cache.touch(key)
+                metrics.inc('youtube_cache_total', endpoint=endpoint, result='not_modified')
+                return entry[1]
+            raise
+        cache.put(key, endpoint, response)
+        metrics.inc('youtube_cache_total', endpoint=endpoint, result='stored')
+        return response
+
+
+def setup_cache(path=CACHE_FILE, mode='revalidate'):
+    """Install the shared response cache for the API clients of this process; mode 'off' removes it."""
+    global cache
+    if cache is not None:
+        cache.close()
+    cache = ResponseCache(path, mode) if mode != 'off' else None
+    if cache is not None:
+        logging.info(f"API response cache {path} in {mode} mode.")
+    return cache
+
+
+def add_cache_arguments(parser):
+    parser.add_argument('--cache', choices=CACHE_MODES, default='revalidate',
+                        help="API response cache: conditional requests (revalidate), cached responses without "
+                             "requests (prefer), rebuild from the cache with no network (replay), or off")
+    parser.add_argument('--cache-file', default=CACHE_FILE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show what the API response cache holds.")
+    parser.add_argument('--cache-file', default=CACHE_FILE)
+    args = parser.parse_args()
+
+    response_cache = ResponseCache(args.cache_file)
+    for method, count, raw_size, stored_size, first, last in response_cache.stats():
+        print(f"{method}: {count} responses, {raw_size / 1e6:.1f} MB of JSON stored in {stored_size / 1e6:.1f} MB "
+              f"({raw_size / max(stored_size, 1):.1f}x), fetched since {first}, last validated {last}")
+    response_cache.close()
+
+
+if __name__ == "__main__":
+    main()
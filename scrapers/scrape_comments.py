@@ -1,111 +1,63 @@
 import sqlite3
 import os
-import time
 import random
 import logging
 import signal
 import json
-from googleapiclient.discovery import build
+import argparse
 from googleapiclient.errors import HttpError
 import socket
+from instrumentation import metrics, setup_metrics
+from video_ids import count_video_ids, iter_video_ids
+from youtube_client import API_KEYS_FILE, QuotaExhausted, YouTubeClients, load_api_keys
 
-# Configure logging
 LOG_FILE = 'comments_scraper.log' # Log file for comments scraping
 STATE_FILE = 'comments_scraper_state.json' # File to store the state of the comments scraper
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', handlers=[
-    logging.FileHandler(LOG_FILE),
-    logging.StreamHandler()
-])
-
-# Load API keys from api_keys.json
-with open('api_keys.json', 'r') as file:
-    api_keys = json.load(file)["keys"]
-current_key_index = 0
-
-# Initialize YouTube API client
-def get_youtube_client():
-    return build('youtube', 'v3', developerKey=api_keys[current_key_index], cache_discovery=False)
-
-def switch_api_key():
-    global current_key_index, youtube
-    current_key_index = (current_key_index + 1) % len(api_keys)
-    if current_key_index == 0:
-        logging.error("All API keys exhausted. Please wait until quotas reset.")
-        exit(1)  # Exit the script when all keys are exhausted
-    youtube = get_youtube_client()
-    logging.info(f"Switched to API key index {current_key_index}.")
-
-youtube = get_youtube_client()
-
-# Connect to the database
 COMMENTS_DATABASE_FILE = 'ds_edu_videos.db'
-conn_comments = sqlite3.connect(COMMENTS_DATABASE_FILE, check_same_thread=False)
-cursor_comments = conn_comments.cursor()
-
-# Create tables for comments and replies
-cursor_comments.execute("""
-CREATE TABLE IF NOT EXISTS comments (
-    thread_id TEXT PRIMARY KEY,
-    video_id TEXT NOT NULL,
-    top_level_text TEXT,
-    top_level_like_count INTEGER,
-    top_level_published_at TEXT,
-    top_level_updated_at TEXT,
-    total_reply_count INTEGER,
-    FOREIGN KEY (video_id) REFERENCES videos(video_id)
-);
-""")
-
-cursor_comments.execute("""
-CREATE TABLE IF NOT EXISTS replies (
-    reply_id TEXT PRIMARY KEY,
-    thread_id TEXT NOT NULL,
-    video_id TEXT NOT NULL,
-    reply_text TEXT,
-    reply_like_count INTEGER,
-    reply_published_at TEXT,
-    reply_updated_at TEXT,
-    FOREIGN KEY (thread_id) REFERENCES comments (thread_id),
-    FOREIGN KEY (video_id) REFERENCES videos(video_id)
-);
-""")
-
-# Load scraper state
-if os.path.exists(STATE_FILE):
-    with open(STATE_FILE, 'r') as file:
-        state = json.load(file)
-        last_processed_index = state.get('last_processed_index', -1)
-else:
-    state = {}
-    last_processed_index = -1
 
-# Fetch all video IDs
-cursor_comments.execute("SELECT video_id FROM videos")
-video_ids = [row[0] for row in cursor_comments.fetchall()]
 
-# Define signal handler for graceful exit
-def handle_exit(signum, frame):
-    logging.info("Process interrupted. Saving current state...")
-    with open(STATE_FILE, 'w') as file:
-        json.dump(state, file)
-    conn_comments.close()
-    logging.info("State saved and connections closed. Exiting.")
-    exit(0)
+def create_tables(cursor_comments):
+    # INSERT OR REPLACE should fire delete triggers, so full-text indexes (database/fts_search.py) stay in sync
+    cursor_comments.execute("PRAGMA recursive_triggers = ON")
+
+    # Create tables for comments and replies
+    cursor_comments.execute("""
+    CREATE TABLE IF NOT EXISTS comments (
+        thread_id TEXT PRIMARY KEY,
+        video_id TEXT NOT NULL,
+        top_level_text TEXT,
+        top_level_like_count INTEGER,
+        top_level_published_at TEXT,
+        top_level_updated_at TEXT,
+        total_reply_count INTEGER,
+        FOREIGN KEY (video_id) REFERENCES videos(video_id)
+    );
+    """)
+
+    cursor_comments.execute("""
+    CREATE TABLE IF NOT EXISTS replies (
+        reply_id TEXT PRIMARY KEY,
+        thread_id TEXT NOT NULL,
+        video_id TEXT NOT NULL,
+        reply_text TEXT,
+        reply_like_count INTEGER,
+        reply_published_at TEXT,
+        reply_updated_at TEXT,
+        FOREIGN KEY (thread_id) REFERENCES comments (thread_id),
+        FOREIGN KEY (video_id) REFERENCES videos(video_id)
+    );
+    """)
 
-# Register signal handlers
-signal.signal(signal.SIGINT, handle_exit)
-signal.signal(signal.SIGTERM, handle_exit)
 
 # Function to fetch comments
-def fetch_comments(video_id):
-    global youtube
+def fetch_comments(clients, conn_comments, video_id):
+    cursor_comments = conn_comments.cursor()
     total_top_level = 0
     total_replies = 0
     retries = 3  # Number of retries for transient errors
     while retries > 0:
         try:
-            request = youtube.commentThreads().list(
+            request = clients.youtube.commentThreads().list(
                 part="snippet,replies",
                 videoId=video_id,
                 maxResults=100,
@@ -125,10 +77,12 @@ def fetch_comments(video_id):
                     total_reply_count = item['snippet'].get('totalReplyCount', 0)
 
                     # Insert top-level comment into comments table
-                    cursor_comments.execute("""
-                        INSERT OR REPLACE INTO comments (thread_id, video_id, top_level_text, top_level_like_count, top_level_published_at, top_level_updated_at, total_reply_count)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """, (thread_id, video_id, top_level_text, top_level_like_count, top_level_published_at, top_level_updated_at, total_reply_count))
+                    with metrics.timer('sqlite_write', table='comments'):
+                        cursor_comments.execute("""
+                            INSERT OR REPLACE INTO comments (thread_id, video_id, top_level_text, top_level_like_count, top_level_published_at, top_level_updated_at, total_reply_count)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)
+                        """, (thread_id, video_id, top_level_text, top_level_like_count, top_level_published_at, top_level_updated_at, total_reply_count))
+                    metrics.inc('rows_written_total', table='comments')
 
                     # Handle replies
                     if 'replies' in item:
@@ -143,16 +97,19 @@ def fetch_comments(video_id):
                             reply_updated_at = reply_snippet.get('updatedAt', '')
 
                             # Insert reply into replies table
-                            cursor_comments.execute("""
-                                INSERT OR REPLACE INTO replies (reply_id, thread_id, video_id, reply_text, reply_like_count, reply_published_at, reply_updated_at)
-                                VALUES (?, ?, ?, ?, ?, ?, ?)
-                            """, (reply_id, thread_id, video_id, reply_text, reply_like_count, reply_published_at, reply_updated_at))
+                            with metrics.timer('sqlite_write', table='replies'):
+                                cursor_comments.execute("""
+                                    INSERT OR REPLACE INTO replies (reply_id, thread_id, video_id, reply_text, reply_like_count, reply_published_at, reply_updated_at)
+                                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                                """, (reply_id, thread_id, video_id, reply_text, reply_like_count, reply_published_at, reply_updated_at))
+                            metrics.inc('rows_written_total', table='replies')
 
-                    conn_comments.commit()
+                    with metrics.timer('sqlite_commit', table='comments'):
+                        conn_comments.commit()
 
                 # Get next page
-                request = youtube.commentThreads().list_next(request, response)
-                time.sleep(random.uniform(1, 2))  # Random delay
+                request = clients.youtube.commentThreads().list_next(request, response)
+                metrics.sleep(random.uniform(1, 2), reason='throttle')  # Random delay
 
             total_comments = total_top_level + total_replies
             logging.info(f"Video ID {video_id}: Top-level comments = {total_top_level}, Replies = {total_replies}, Total = {total_comments}")
@@ -164,8 +121,9 @@ def fetch_comments(video_id):
                 logging.warning(f"Comments are disabled for video_id: {video_id}")
                 break
             elif e.resp.status == 403:
-                logging.error(f"API quota exceeded for key index {current_key_index}. Switching to next key.")
-                switch_api_key()
+                logging.error(f"API quota exceeded for key index {clients.current_key_index}. Switching to next key.")
+                metrics.inc('retries_total', reason='quota')
+                clients.switch_key()
                 retries -= 1
             elif e.resp.status == 404:
                 logging.error(f"Video not found for video_id: {video_id}")
@@ -175,31 +133,81 @@ def fetch_comments(video_id):
                 retries -= 1
         except (socket.error, ConnectionResetError) as e:
             logging.error(f"Network error for video_id {video_id}: {e}. Retrying...")
+            metrics.inc('retries_total', reason='network')
             retries -= 1
-            time.sleep(5)  # Wait before retrying
+            metrics.sleep(5, reason='backoff')  # Wait before retrying
         except Exception as e:
             logging.error(f"Unexpected error for video_id {video_id}: {e}")
             break
 
-# Resume scraping from the last processed video ID
-for current_index in range(last_processed_index + 1, len(video_ids)):
-    video_id = video_ids[current_index]
-    logging.info(f"Fetching comments for video_id: {video_id} ({current_index + 1}/{len(video_ids)})")
-    fetch_comments(video_id)
 
-    # Update scraper state
-    state['last_processed_index'] = current_index
-    with open(STATE_FILE, 'w') as file:
-        json.dump(state, file)
+def main():
+    parser = argparse.ArgumentParser(description="Download top-level comments and their replies for each video.")
+    parser.add_argument('--db', default=COMMENTS_DATABASE_FILE)
+    parser.add_argument('--api-keys', default=API_KEYS_FILE)
+    parser.add_argument('--state-file', default=STATE_FILE)
+    args = parser.parse_args()
+
+    # Configure logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', handlers=[
+        logging.FileHandler(LOG_FILE),
+        logging.StreamHandler()
+    ])
+    setup_metrics('comments_scraper')
+    clients = YouTubeClients(load_api_keys(args.api_keys))
 
-    # Random delay to simulate user behavior
-    time.sleep(random.uniform(1, 3))
+    # Connect to the database
+    conn_comments = sqlite3.connect(args.db, check_same_thread=False)
+    create_tables(conn_comments.cursor())
+
+    # Load scraper state
+    state = {}
+    if os.path.exists(args.state_file):
+        with open(args.state_file, 'r') as file:
+            state = json.load(file)
+    last_processed_index = state.get('last_processed_index', -1)
+
+    # Define signal handler for graceful exit
+    def handle_exit(signum, frame):
+        logging.info("Process interrupted. Saving current state...")
+        with open(args.state_file, 'w') as file:
+            json.dump(state, file)
+        conn_comments.close()
+        logging.info("State saved and connections closed. Exiting.")
+        exit(0)
+
+    # Register signal handlers
+    signal.signal(signal.SIGINT, handle_exit)
+    signal.signal(signal.SIGTERM, handle_exit)
+
+    # Resume scraping from the last processed video ID
+    total = count_video_ids(conn_comments)
+    try:
+        for current_index, video_id in iter_video_ids(conn_comments, last_processed_index + 1):
+            logging.info(f"Fetching comments for video_id: {video_id} ({current_index + 1}/{total})")
+            fetch_comments(clients, conn_comments, video_id)
+
+            # Update scraper state
+            state['last_processed_index'] = current_index
+            with open(args.state_file, 'w') as file:
+                json.dump(state, file)
+
+            # Random delay to simulate user behavior
+            metrics.sleep(random.uniform(1, 3), reason='throttle')
+    except QuotaExhausted as e:
+        logging.error(str(e))
+        conn_comments.close()
+        exit(1)
+
+    # Clean up state file
+    if os.path.exists(args.state_file):
+        os.remove(args.state_file)
+
+    # Close the database connection
+    conn_comments.close()
 
-# Clean up state file
-if os.path.exists(STATE_FILE):
-    os.remove(STATE_FILE)
+    logging.info("Comment fetching completed.")
 
-# Close the database connection
-conn_comments.close()
 
-logging.info("Comment fetching completed.")
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,15 @@
 import sqlite3
 import os
 import json
-import time
 import random
 import logging
 import signal
+import argparse
 from youtube_transcript_api import YouTubeTranscriptApi
 from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound, VideoUnavailable
+from instrumentation import metrics, setup_metrics
+from video_ids import iter_video_ids
+from detect_language import load_languages
 
 # Database file paths
 DATABASE_FILE = 'ds_edu_videos.db' # SQLite database file to store results
@@ -14,72 +17,37 @@ STATE_FILE = 'transcript_scraper_state.json' # File to store the state of the tr
 LOG_FILE = 'transcript_scraper.log' # Log file for transcript scraping
 # Define max retry count
 MAX_RETRIES = 3
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', handlers=[
-    logging.FileHandler(LOG_FILE),
-    logging.StreamHandler()
-])
-
-# Load scraping state
-if os.path.exists(STATE_FILE):
-    with open(STATE_FILE, 'r') as file:
-        state = json.load(file)
-        last_processed_index = state.get('last_processed_index', -1)
-else:
-    state = {}
-    last_processed_index = -1
-
-# Connect to database containing video_id
-conn = sqlite3.connect(DATABASE_FILE)
-cursor = conn.cursor()
-
-# Create table for storing transcripts
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS transcripts (
-    video_id TEXT PRIMARY KEY,
-    transcript TEXT,
-    type TEXT,
-    translatable TEXT
-);
-""")
-
-# Get all video_ids
-cursor.execute("SELECT video_id FROM videos")
-video_ids = [row[0] for row in cursor.fetchall()]
-
 # Batch size for processing
 BATCH_SIZE = 100
 
-# Define exit handler
-def handle_exit(signum, frame):
-    logging.info("Process interrupted. Saving current state...")
-    with open(STATE_FILE, 'w') as file:
-        json.dump(state, file)
-    conn.close()
-    conn.close()
-    logging.info("State saved and connections closed. Exiting.")
-    exit(0)
 
-# Register signal handlers
-signal.signal(signal.SIGINT, handle_exit)
-signal.signal(signal.SIGTERM, handle_exit)
+def create_tables(cursor):
+    # Create table for storing transcripts
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS transcripts (
+        video_id TEXT PRIMARY KEY,
+        transcript TEXT,
+        type TEXT,
+        translatable TEXT
+    );
+    """)
+
 
-# Continue from last processed index
-for index in range(last_processed_index + 1, len(video_ids)):
-    video_id = video_ids[index]
+def fetch_transcript(conn, video_id, index):
     retries = 0
     success = False
 
-    while retries < 3 and not success:
+    while retries < MAX_RETRIES and not success:
         try:
             # ScraperAPI dynamic proxy request
             logging.info(f"Fetching transcript for video_id: {video_id} (index {index})")
 
             # Use proxy to call YouTubeTranscriptApi
-            transcript_list = YouTubeTranscriptApi.list_transcripts(video_id, proxies={"http": "http://your_proxy_here", "https": "http://your_proxy_here"})
+            with metrics.timer('transcript_api', call='list_transcripts'):
+                transcript_list = YouTubeTranscriptApi.list_transcripts(video_id, proxies={"http": "http://your_proxy_here", "https": "http://your_proxy_here"})
             transcript = transcript_list.find_transcript(['en'])
-            transcript_data = transcript.fetch()
+            with metrics.timer('transcript_api', call='fetch'):
+                transcript_data = transcript.fetch()
 
             # Join transcript into a single string
             transcript_text = " ".join([item['text'] for item in transcript_data])
@@ -90,11 +58,14 @@ for index in range(last_processed_index + 1, len(video_ids)):
             transcript_translatable = "true" if transcript.is_translatable else "false"
 
             # Insert transcript into database
-            cursor.execute("""
-                INSERT OR IGNORE INTO transcripts (video_id, transcript, type, translatable)
-                VALUES (?, ?, ?, ?)
-            """, (video_id, transcript_text, transcript_type, transcript_translatable))
-            conn.commit()
+            with metrics.timer('sqlite_write', table='transcripts'):
+                conn.execute("""
+                    INSERT OR IGNORE INTO transcripts (video_id, transcript, type, translatable)
+                    VALUES (?, ?, ?, ?)
+                """, (video_id, transcript_text, transcript_type, transcript_translatable))
+                conn.commit()
+            metrics.inc('rows_written_total', table='transcripts')
+            metrics.inc('transcripts_total', outcome='fetched')
 
             # logging.info(f"Transcript fetched for video_id: {video_id} (index {index})")
             success = True
@@ -106,34 +77,100 @@ for index in range(last_processed_index + 1, len(video_ids)):
                 logging.info(f"No transcript found for video_id: {video_id}")
             elif isinstance(specific_error, VideoUnavailable):
                 logging.info(f"Video unavailable for video_id: {video_id}")
+            metrics.inc('transcripts_total', outcome=type(specific_error).__name__)
             success = True  # No need to retry for these specific errors
         except Exception as e:
             logging.error(f"Error fetching transcript for video_id {video_id} (attempt {retries + 1}): {e}")
             retries += 1
+            metrics.inc('retries_total', reason='transcript_error')
             if retries < MAX_RETRIES:
-                time.sleep(60)  # Wait 1 minute before retrying
+                metrics.sleep(60, reason='backoff')  # Wait 1 minute before retrying
             else:
                 logging.error(f"Max retries reached for video_id {video_id}. Skipping.")
                 break
 
-    # Update scraping state
-    state['last_processed_index'] = index
-    with open(STATE_FILE, 'w') as file:
-        json.dump(state, file)
 
-    # Random delay to simulate user behavior
-    time.sleep(random.uniform(1, 5))
+def routed_language(languages, video_id):
+    """Language a video is treated as: its confident detection from `load_languages`, otherwise English."""
+    return languages.get(video_id, 'en')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch available English transcripts for each video.")
+    parser.add_argument('--db', default=DATABASE_FILE)
+    parser.add_argument('--state-file', default=STATE_FILE)
+    parser.add_argument('--no-language-routing', action='store_true',
+                        help="Also look up English transcripts of videos detected as non-English")
+    args = parser.parse_args()
+
+    # Configure logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', handlers=[
+        logging.FileHandler(LOG_FILE),
+        logging.StreamHandler()
+    ])
+    setup_metrics('transcript_scraper')
+
+    # Load scraping state
+    state = {}
+    if os.path.exists(args.state_file):
+        with open(args.state_file, 'r') as file:
+            state = json.load(file)
+    last_processed_index = state.get('last_processed_index', -1)
+
+    # Connect to database containing video_id
+    conn = sqlite3.connect(args.db)
+    create_tables(conn.cursor())
+    # Languages from detect_language.py; videos without a confident detection are treated as English
+    languages = {} if args.no_language_routing else load_languages(conn)
+
+    # Define exit handler
+    def handle_exit(signum, frame):
+        logging.info("Process interrupted. Saving current state...")
+        with open(args.state_file, 'w') as file:
+            json.dump(state, file)
+        conn.close()
+        logging.info("State saved and connections closed. Exiting.")
+        exit(0)
+
+    # Register signal handlers
+    signal.signal(signal.SIGINT, handle_exit)
+    signal.signal(signal.SIGTERM, handle_exit)
+
+    # Continue from last processed index
+    for index, video_id in iter_video_ids(conn, last_processed_index + 1):
+        language = routed_language(languages, video_id)
+        if language == 'en':
+            fetch_transcript(conn, video_id, index)
+        else:
+            # No English track to find; supplement_transcripts.py translates the detected language's track
+            logging.info(f"Skipping video_id {video_id} detected as '{language}' (index {index})")
+            metrics.inc('transcripts_total', outcome='deferred_non_english')
+
+        # Update scraping state
+        state['last_processed_index'] = index
+        with open(args.state_file, 'w') as file:
+            json.dump(state, file)
+
+        if language != 'en':
+            continue  # No request was made, so neither delay is needed
+
+        # Random delay to simulate user behavior
+        metrics.sleep(random.uniform(1, 5), reason='throttle')
+
+        # Pause after each batch
+        if (index + 1) % BATCH_SIZE == 0:
+            logging.info(f"Batch {index // BATCH_SIZE + 1} completed. Pausing for 5 minutes...")
+            metrics.sleep(300, reason='batch_pause')  # Pause for 5 minutes
+
+    # Close database connections
+    conn.close()
 
-    # Pause after each batch
-    if (index + 1) % BATCH_SIZE == 0:
-        logging.info(f"Batch {index // BATCH_SIZE + 1} completed. Pausing for 5 minutes...")
-        time.sleep(300)  # Pause for 5 minutes
+    # Clean up state file
+    if os.path.exists(args.state_file):
+        os.remove(args.state_file)
 
-# Close database connections
-conn.close()
+    logging.info("Transcript fetching completed.")
 
-# Clean up state file
-if os.path.exists(STATE_FILE):
-    os.remove(STATE_FILE)
 
-logging.info("Transcript fetching completed.")
+if __name__ == "__main__":
+    main()
@@ -1,73 +1,37 @@
 import os
 import json
 import sqlite3
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-import pandas as pd
+import argparse
 from datetime import datetime
 from isodate import parse_duration
+from instrumentation import metrics, setup_metrics
+from response_cache import add_cache_arguments, setup_cache
+from youtube_client import API_KEYS_FILE, QuotaExhausted, YouTubeClients, load_api_keys
 
 STATE_FILE = 'scraper_state.json' # File to store the state of the scraper
 KEYWORDS_FILE = 'search_keywords.json' # File containing search keywords
 DATABASE_FILE = 'ds_edu_videos.db' # SQLite database file to store results
-API_KEYS_FILE = 'api_keys.json' # File containing YouTube API keys
+NOVELTY_THRESHOLD = 0.1 # Stop paging a keyword once less than this share of a page's videos is new
 
-# Load API keys
-with open(API_KEYS_FILE, 'r') as file:
-    api_keys = json.load(file)["keys"]
 
-current_key_index = 0
+def load_keywords(path=KEYWORDS_FILE, specific_first=True):
+    with open(path, 'r') as file:
+        search_keywords = json.load(file)["keywords"]
+    if not specific_first:
+        return search_keywords
 
-with open(KEYWORDS_FILE, 'r') as file:
-    search_keywords = json.load(file)["keywords"]
+    # Specific keywords first ("SQL window functions" before "SQL"): their results are mostly new, and the broad
+    # keywords then reach their novelty threshold after fewer pages
+    return sorted(search_keywords, key=lambda k: (-len(k.split()), -len(k)))
 
-# Get the current date and time
-collected_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-# build the YouTube API client
-try:
-    youtube = build('youtube', 'v3', developerKey=api_keys[current_key_index])
-except Exception as e:
-    print(f"Error initializing YouTube API client: {e}")
-    exit()
+def table_name_for(keyword):
+    return keyword.replace(" ", "_").replace("-", "_")
 
-# Load state from file if it exists
-if os.path.exists(STATE_FILE):
-    with open(STATE_FILE, 'r') as file:
-        state = json.load(file)
-        current_page_token = state.get('nextPageToken', None)
-        start_keyword = state.get('keyword', None)
-else:
-    current_page_token = None
-    start_keyword = None
-
-# Function to handle API key rotation and retry requests
-def execute_request(api_operation, *args, **kwargs):
-    global current_key_index
-    global youtube
-    while True:
-        try:
-            # Dynamically build the request using the latest YouTube client
-            api_resource = getattr(youtube, api_operation[0])()
-            request = getattr(api_resource, api_operation[1])(*args, **kwargs)
-            return request.execute()
-        except HttpError as e:
-            if e.resp.status == 403 and 'quota' in str(e.content):
-                print(f"Quota exceeded for API key {current_key_index + 1}. Switching to the next key.")
-                current_key_index = (current_key_index + 1) % len(api_keys)
-                if current_key_index == 0:
-                    print("All API keys exhausted. Wait until quota resets.")
-                    exit()
-                # Update the YouTube client with the new API key
-                youtube = build('youtube', 'v3', developerKey=api_keys[current_key_index])
-                continue
-            else:
-                print(f"HTTP Error: {e.resp.status} - {e.content}")
-                raise e
 
 # Setup SQLite database
-def setup_database():
-    conn = sqlite3.connect(DATABASE_FILE)
+def setup_database(db_path=DATABASE_FILE):
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     return conn, cursor
 
@@ -96,6 +60,16 @@ def create_table(cursor, keyword):
         )
     """)
 
+# Video IDs already collected by any keyword, so each page's novelty can be measured
+def load_known_video_ids(cursor, search_keywords):
+    existing = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    tables = [table_name_for(k) for k in search_keywords] + ['videos']
+    known = set()
+    for table_name in tables:
+        if table_name in existing:
+            known.update(row[0] for row in cursor.execute(f"SELECT video_id FROM {table_name}"))
+    return known
+
 # Insert results into the keyword's table
 def insert_results(cursor, table_name, results):
     placeholders = ", ".join(["?"] * len(results[0]))
@@ -103,124 +77,215 @@ def insert_results(cursor, table_name, results):
     query = f"INSERT OR IGNORE INTO {table_name} ({columns}) VALUES ({placeholders})"
     cursor.executemany(query, [tuple(row.values()) for row in results])
 
-try:
-    conn, cursor = setup_database()
 
-    # Start from the interrupted keyword if state exists
-    if start_keyword:
-        keywords_to_process = search_keywords[search_keywords.index(start_keyword):]
+def hydrate_videos(clients, video_ids, collected_at, keyword):
+    """Fetch metadata for up to 50 video IDs with one videos.list call; returns {video_id: row}.
+
+    Rows have the columns of the keyword tables. Also used by discover_uploads.py.
+    """
+    stats_response = clients.execute(
+        ("videos", "list"),
+        part='statistics,snippet,contentDetails,paidProductPlacementDetails',
+        id=','.join(video_ids)
+    )
+    videos = {}
+    for item in stats_response.get('items', []):
+        videos[item['id']] = {
+            'video_id': item['id'],
+            'title': item['snippet'].get('title', 'N/A'),
+            'channel_title': item['snippet'].get('channelTitle', 'N/A'),
+            'published_at': item['snippet'].get('publishedAt', 'N/A'),
+            'description': item['snippet'].get('description', 'N/A'),
+            'tags': ', '.join(item['snippet'].get('tags', [])) if 'tags' in item['snippet'] else 'N/A',
+            'audio_language': item['snippet'].get('defaultAudioLanguage', 'N/A'),
+            'textual_language': item['snippet'].get('defaultLanguage', 'N/A'),
+            'duration': str(parse_duration(item['contentDetails'].get('duration', 'PT0S'))),
+            'definition': item['contentDetails'].get('definition', 'N/A'),
+            'caption_availability': item['contentDetails'].get('caption', 'N/A'),
+            'view_count': item['statistics'].get('viewCount', 'N/A'),
+            'like_count': item['statistics'].get('likeCount', 'N/A'),
+            'comment_count': item['statistics'].get('commentCount', 'N/A'),
+            'paid_product_placement': item.get('paidProductPlacementDetails', {}).get('hasPaidProductPlacement', 'N/A'),
+            'collected_at': collected_at,
+            "keywords": keyword
+        }
+    return videos
+
+
+def search_page(clients, keyword, page_token):
+    """One search.list page for `keyword`: (search results, video IDs, next page token)."""
+    search_response = clients.execute(
+        ("search", "list"),
+        part='snippet',
+        q=keyword,
+        type='video',
+        maxResults=50,
+        pageToken=page_token,
+        order='viewCount',
+        videoDuration='any'
+    )
+
+    session_results = []
+    video_ids = []
+
+    # Collect video IDs and metadata from the search response
+    for item in search_response.get('items', []):
+        video_id = item['id']['videoId']
+        video_data = {
+            'video_id': video_id,
+            'title': item['snippet']['title'],
+            'channel_title': item['snippet']['channelTitle'],
+            'published_at': item['snippet']['publishedAt'],
+        }
+        session_results.append(video_data)
+        video_ids.append(video_id)
+    # Get next page token
+    return session_results, video_ids, search_response.get('nextPageToken', None)
+
+
+def page_novelty(video_ids, known_video_ids):
+    """(IDs of the page not seen under any keyword yet, their share of the page); adds them to known_video_ids."""
+    page_new = [video_id for video_id in dict.fromkeys(video_ids) if video_id not in known_video_ids]
+    known_video_ids.update(page_new)
+    return page_new, len(page_new) / len(video_ids) if video_ids else 0.0
+
+
+def save_state(state_file, keyword, page_token, completed):
+    with open(state_file, 'w') as file:
+        json.dump({
+            'nextPageToken': page_token,
+            'keyword': keyword,
+            'completed': sorted(completed)
+        }, file)
+
+
+def pending_keywords(search_keywords, state, file_order):
+    """Keywords still to scrape, the interrupted one first as its page token belongs to it.
+
+    Keywords are tracked by name, so editing or reordering search_keywords.json does not skip any. State files
+    without 'completed' were written when keywords ran in file order: the ones before 'keyword' are done.
+    """
+    start_keyword = state.get('keyword')
+    if 'completed' in state:
+        completed = set(state['completed'])
+    elif start_keyword in file_order:
+        completed = set(file_order[:file_order.index(start_keyword)])
     else:
-        keywords_to_process = search_keywords
+        completed = set()
+    pending = [k for k in search_keywords if k not in completed]
+    if start_keyword in pending:
+        pending.remove(start_keyword)
+        pending.insert(0, start_keyword)
+    return pending, completed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect video-level metadata for the search keywords.")
+    parser.add_argument('--db', default=DATABASE_FILE)
+    parser.add_argument('--keywords', default=KEYWORDS_FILE)
+    parser.add_argument('--api-keys', default=API_KEYS_FILE)
+    parser.add_argument('--state-file', default=STATE_FILE)
+    parser.add_argument('--novelty-threshold', type=float, default=NOVELTY_THRESHOLD)
+    add_cache_arguments(parser)
+    args = parser.parse_args()
 
-    for keyword in keywords_to_process:
-        table_name = keyword.replace(" ", "_").replace("-", "_")
-        create_table(cursor, table_name)
+    setup_metrics('video_scraper')
+    setup_cache(args.cache_file, args.cache)
+    # Replay answers every request from the cache, so no API keys are needed
+    clients = YouTubeClients(load_api_keys(args.api_keys) if args.cache != 'replay' else ['replay'])
+    search_keywords = load_keywords(args.keywords)
 
-        print(f"Processing keyword: {keyword}")
-        while True:
-            try:
+    # Get the current date and time
+    collected_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    # Load state from file if it exists
+    state = {}
+    if os.path.exists(args.state_file):
+        with open(args.state_file, 'r') as file:
+            state = json.load(file)
+
+    # Start from the interrupted keyword if state exists
+    keywords_to_process, completed = pending_keywords(
+        search_keywords, state, load_keywords(args.keywords, specific_first=False)
+    )
+    # The page token belongs to the interrupted keyword; it is dropped if that keyword left the file
+    current_page_token = None
+    if keywords_to_process and keywords_to_process[0] == state.get('keyword'):
+        current_page_token = state.get('nextPageToken', None)
+
+    conn, cursor = setup_database(args.db)
+    known_video_ids = load_known_video_ids(cursor, search_keywords)
+    # Quota is read from the counter of requests that reached the API, so pages answered by the response cache
+    # (--cache prefer or replay) are not charged
+    quota_start = metrics.total('youtube_quota_units_total')
+    new_videos = 0
+
+    try:
+        for keyword in keywords_to_process:
+            table_name = table_name_for(keyword)
+            create_table(cursor, table_name)
+
+            print(f"Processing keyword: {keyword}")
+            keyword_start = metrics.total('youtube_quota_units_total')
+            keyword_new = 0
+            while True:
                 # Search for videos
-                search_response = execute_request(
-                    ("search", "list"),
-                    part='snippet',
-                    q=keyword,
-                    type='video',
-                    maxResults=50,
-                    pageToken=current_page_token,
-                    order='viewCount',
-                    videoDuration='any'
-                )
-            except Exception as e:
-                print(f"Error executing search request: {e}")
-                exit()
-
-            session_results = []
-            video_ids = []
-
-            # Collect video IDs and metadata from the search response
-            try:
-                for item in search_response.get('items', []):
-                    video_id = item['id']['videoId']
-                    video_data = {
-                        'video_id': video_id,
-                        'title': item['snippet']['title'],
-                        'channel_title': item['snippet']['channelTitle'],
-                        'published_at': item['snippet']['publishedAt'],
-                    }
-                    session_results.append(video_data)
-                    video_ids.append(video_id)
-                # Get next page token
-                current_page_token = search_response.get('nextPageToken', None)
-            except KeyError as e:
-                print(f"Key error in search response: {e}")
-                exit()
-            except Exception as e:
-                print(f"Unexpected error while processing search response: {e}")
-                exit()
-
-            # Fetch additional statistics for the videos using the video IDs
-            if video_ids:
-                try:
-                    stats_response = execute_request(
-                        ("videos", "list"),
-                        part='statistics,snippet,contentDetails,paidProductPlacementDetails',
-                        id=','.join(video_ids)
-                    )
-
-                    # Add statistics to the corresponding video data
-                    for item in stats_response.get('items', []):
-                        for video in session_results:
-                            if video['video_id'] == item['id']:
-                                video.update({
-                                    'description': item['snippet'].get('description', 'N/A'),
-                                    'tags': ', '.join(item['snippet'].get('tags', [])) if 'tags' in item['snippet'] else 'N/A',
-                                    'audio_language': item['snippet'].get('defaultAudioLanguage', 'N/A'),
-                                    'textual_language': item['snippet'].get('defaultLanguage', 'N/A'),
-                                    'duration': str(parse_duration(item['contentDetails'].get('duration', 'PT0S'))),
-                                    'definition': item['contentDetails'].get('definition', 'N/A'),
-                                    'caption_availability': item['contentDetails'].get('caption', 'N/A'),
-                                    'view_count': item['statistics'].get('viewCount', 'N/A'),
-                                    'like_count': item['statistics'].get('likeCount', 'N/A'),
-                                    'comment_count': item['statistics'].get('commentCount', 'N/A'),
-                                    'paid_product_placement': item.get('paidProductPlacementDetails', {}).get('hasPaidProductPlacement', 'N/A'),
-                                    'collected_at': collected_at,
-                                    "keywords": keyword
-                                })
-                except Exception as e:
-                    print(f"Error fetching video statistics: {e}")
-                    exit()
-
-            # Save session results to the database
-            if session_results:
-                insert_results(cursor, table_name, session_results)
-                conn.commit()
-
-            # Save current state to file
-            with open(STATE_FILE, 'w') as file:
-                json.dump({
-                    'nextPageToken': current_page_token,
-                    'keyword': keyword
-                }, file)
-
-            # Exit loop if no more pages
-            if not current_page_token:
-                next_index = search_keywords.index(keyword) + 1
-                next_keyword = search_keywords[next_index] if next_index < len(search_keywords) else None
-
-                with open(STATE_FILE, 'w') as file:
-                    json.dump({
-                        'nextPageToken': None,
-                        'keyword': next_keyword
-                    }, file)
-                print(f"Scraping complete for keyword \"{keyword}\".")
-                break
-
-except KeyboardInterrupt:
-    print("\nScraping interrupted by user.")
-    conn.commit()
-    conn.close()
-
-# Clean up state file if scraping is complete
-if not current_page_token:
-    os.remove(STATE_FILE)
-    print(f"Scraping complete. State file removed.")
\ No newline at end of file
+                session_results, video_ids, current_page_token = search_page(clients, keyword, current_page_token)
+
+                # Fetch additional statistics for the videos using the video IDs
+                if video_ids:
+                    details = hydrate_videos(clients, video_ids, collected_at, keyword)
+                    for video in session_results:
+                        video.update(details.get(video['video_id'], {}))
+
+                # Share of this page's videos not seen under any keyword yet
+                page_new, novelty = page_novelty(video_ids, known_video_ids)
+                keyword_new += len(page_new)
+                new_videos += len(page_new)
+                if current_page_token and novelty < args.novelty_threshold:
+                    print(f"Keyword \"{keyword}\" saturated: {novelty:.0%} new videos on the last page.")
+                    current_page_token = None
+
+                # Save session results to the database
+                if session_results:
+                    with metrics.timer('sqlite_write', table='keyword'):
+                        insert_results(cursor, table_name, session_results)
+                        conn.commit()
+                    metrics.inc('rows_written_total', len(session_results), table='keyword')
+
+                # Save current state to file
+                save_state(args.state_file, keyword, current_page_token, completed)
+
+                # Exit loop if no more pages (or the keyword is saturated)
+                if not current_page_token:
+                    keyword_quota = metrics.total('youtube_quota_units_total') - keyword_start
+                    per_video = f"{keyword_quota / keyword_new:.1f}" if keyword_new else "n/a"
+                    print(f"Keyword \"{keyword}\": {keyword_new} new videos for {keyword_quota} quota units "
+                          f"({per_video} units per new video).")
+                    completed.add(keyword)
+                    next_keyword = next((k for k in search_keywords if k not in completed), None)
+                    save_state(args.state_file, next_keyword, None, completed)
+                    print(f"Scraping complete for keyword \"{keyword}\".")
+                    break
+
+        # Clean up state file if scraping is complete
+        if os.path.exists(args.state_file):
+            os.remove(args.state_file)
+        print(f"Scraping complete. State file removed.")
+
+    except KeyboardInterrupt:
+        print("\nScraping interrupted by user.")
+    except QuotaExhausted as e:
+        print(e)
+        exit()
+    finally:
+        conn.commit()
+        conn.close()
+        # Also reported for interrupted runs, which is when the quota per new video matters most
+        quota_used = metrics.total('youtube_quota_units_total') - quota_start
+        per_video = f"{quota_used / new_videos:.1f}" if new_videos else "n/a"
+        print(f"Quota spent: {quota_used} units for {new_videos} new videos ({per_video} units per new video).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,112 +1,171 @@
 import sqlite3
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound, CouldNotRetrieveTranscript, YouTubeRequestFailed
 import logging
-import time
 import random
+import argparse
+from instrumentation import metrics, setup_metrics
+from video_ids import count_video_ids
+from detect_language import load_languages
 
 # Connect to database
-db_path = "ds_edu_videos.db" 
-# Configure logging
-logging.basicConfig(filename="transcript_update.log", level=logging.INFO) 
+db_path = "ds_edu_videos.db"
+LOG_FILE = "transcript_update.log"
 
-while True:
+# Video_ids that still need transcripts
+MISSING_VIDEOS_QUERY = """
+    SELECT mv.video_id
+    FROM videos mv
+    LEFT JOIN video_transcripts vt ON mv.video_id = vt.video_id
+    LEFT JOIN failed_videos fv ON mv.video_id = fv.video_id
+    WHERE vt.video_id IS NULL AND fv.video_id IS NULL
+"""
+
+
+def create_tables(cursor):
+    # Create table to store failed video IDs
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS failed_videos (
+            video_id TEXT PRIMARY KEY
+        );
+    """)
+
+
+def migrate_transcript_types(conn):
+    """Relabel rows written before English tracks were detected by language code.
+
+    Those runs compared the display name with "en", so English tracks were translated into English and labelled
+    "... (Translated from English)". They are stored untranslated now, labelled "manual-created" or
+    "auto-generated" (the translated labels already had the right prefix). Returns the number of rows relabelled.
+    """
+    cursor = conn.execute("""
+        UPDATE transcripts
+        SET type = substr(type, 1, instr(type, ' (Translated from English') - 1)
+        WHERE type LIKE 'manual-created (Translated from English%' OR type LIKE 'auto-generated (Translated from English%'
+    """)
+    conn.commit()
+    return cursor.rowcount
+
+
+def select_transcript(transcript_list, language=None):
+    """User-uploaded tracks before auto-generated ones; within each, English first, then the language detected
+    by detect_language.py, then whichever track comes first."""
+    for is_generated in (False, True):
+        tracks = [transcript for transcript in transcript_list if transcript.is_generated == is_generated]
+        for code in ('en', language):
+            for transcript in tracks:
+                if code and transcript.language_code == code:
+                    return transcript
+        if tracks:
+            return tracks[0]
+    return None
+
+
+def supplement_transcript(conn, video_id, language=None):
+    """Store an English (or translated) transcript for one video; returns the inserted row or None.
+
+    The track comes from one list_transcripts call and `select_transcript`, which prefers an English track.
+
+    `language` is the detected language of the video, whose track is translated when there is no English one.
+    """
+    cursor = conn.cursor()
     try:
-        conn = sqlite3.connect(db_path, check_same_thread=False)
-        cursor = conn.cursor()
-        # Create table to store failed video IDs
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS failed_videos (
-                video_id TEXT PRIMARY KEY
-            );
-        """)
-        conn.commit()
+        # Get transcript list
+        metrics.sleep(random.uniform(1,4), reason='throttle')  # Avoid frequent requests
+        with metrics.timer('transcript_api', call='list_transcripts'):
+            transcript_list = YouTubeTranscriptApi.list_transcripts(video_id, proxies={"https": ""})
+
+        # Select transcript to translate
+        selected_transcript = select_transcript(transcript_list, language)
+        user_transcript = selected_transcript is not None and not selected_transcript.is_generated
+        if selected_transcript:
+            if language and selected_transcript.language_code == language:
+                metrics.inc('transcripts_total', outcome='detected_language_track')
+            original_language = selected_transcript.language
+            if selected_transcript.language_code == "en":
+                transcript_type = "manual-created" if user_transcript else "auto-generated"
+                with metrics.timer('transcript_api', call='fetch'):
+                    transcript_text = " ".join([entry["text"] for entry in selected_transcript.fetch()])
+            else:
+                with metrics.timer('transcript_api', call='translate'):
+                    translated_transcript = selected_transcript.translate('en').fetch()
+                transcript_text = " ".join([entry["text"] for entry in translated_transcript])
+
+                # Determine transcript type
+                transcript_type = (
+                    f"manual-created (Translated from {original_language})"
+                    if user_transcript else
+                    f"auto-generated (Translated from {original_language})"
+                )
+
+            # Insert into database
+            with metrics.timer('sqlite_write', table='transcripts'):
+                cursor.execute("""
+                    INSERT INTO transcripts (video_id, transcript, type)
+                    VALUES (?, ?, ?)
+                """, (video_id, transcript_text, transcript_type))
 
-        # Get all video_ids that need transcripts
-        cursor.execute("""
-            SELECT mv.video_id 
-            FROM videos mv
-            LEFT JOIN video_transcripts vt ON mv.video_id = vt.video_id
-            LEFT JOIN failed_videos fv ON mv.video_id = fv.video_id
-            WHERE vt.video_id IS NULL AND fv.video_id IS NULL;
-        """)
-        missing_videos = [row[0] for row in cursor.fetchall()]
-        print(f"Found {len(missing_videos)} videos with missing transcripts.")
-
-        # Store transcript data
-        transcript_data = []
-
-        for video_id in missing_videos:
-            try:
-                # Get transcript list
-                time.sleep(random.uniform(1,4))  # Avoid frequent requests
-                transcript_list = YouTubeTranscriptApi.list_transcripts(video_id, proxies={"https": ""})
-                user_transcript = None
-                auto_transcript = None
-
-                # First, look for user-uploaded transcripts
-                for transcript in transcript_list:
-                    if not transcript.is_generated:  # User-uploaded transcript
-                        user_transcript = transcript
-                        break  # Prefer user-uploaded transcript
-                
-                # If no user-uploaded transcript, look for auto-generated transcript
-                if not user_transcript:
-                    for transcript in transcript_list:
-                        # Select auto-generated transcript
-                        if transcript.is_generated:
-                            auto_transcript = transcript
-                            break 
-
-                # Select transcript to translate
-                selected_transcript = user_transcript if user_transcript else auto_transcript
-                if selected_transcript:
-                    original_language = selected_transcript.language
-                    if original_language == "en":
-                        transcript_type = "auto-generated" if user_transcript else "manual-created"
-                        transcript_text = " ".join([entry["text"] for entry in selected_transcript.fetch()])
-                    else:
-                        translated_transcript = selected_transcript.translate('en').fetch()
-                        transcript_text = " ".join([entry["text"] for entry in translated_transcript])
-                        
-                        # Determine transcript type
-                        transcript_type = (
-                            f"manual-created (Translated from {original_language})"
-                            if user_transcript else 
-                            f"auto-generated (Translated from {original_language})"
-                        )
-                    
-                    # Insert into database
-                    cursor.execute("""
-                        INSERT INTO transcripts (video_id, transcript, type)
-                        VALUES (?, ?, ?)
-                    """, (video_id, transcript_text, transcript_type))
-
-                    conn.commit() 
-
-                    logging.info(f"Updated transcript for video {video_id}")
-                    print(f"Updated transcript for video {video_id}")
-                    
-                    transcript_data.append((video_id, transcript_text, transcript_type))
-                else:
-                    cursor.execute("INSERT INTO failed_videos (video_id) VALUES (?)", (video_id,))
-                    conn.commit()
-                    logging.warning(f"No translatable transcript found for video {video_id}")
-                    print("No translatable transcript found for video {video_id}")
-                
-            except (TranscriptsDisabled, NoTranscriptFound):
-                
-                cursor.execute("INSERT INTO failed_videos (video_id) VALUES (?)", (video_id,))
                 conn.commit()
-                logging.warning(f'No translatable transcript in English found for video {video_id}')
-                print(f'No translatable transcript in English found for video {video_id}')
+            metrics.inc('rows_written_total', table='transcripts')
+
+            logging.info(f"Updated transcript for video {video_id}")
+            print(f"Updated transcript for video {video_id}")
+
+            return (video_id, transcript_text, transcript_type)
+        else:
+            cursor.execute("INSERT INTO failed_videos (video_id) VALUES (?)", (video_id,))
+            conn.commit()
+            logging.warning(f"No translatable transcript found for video {video_id}")
+            print("No translatable transcript found for video {video_id}")
+
+    except (TranscriptsDisabled, NoTranscriptFound):
+
+        cursor.execute("INSERT INTO failed_videos (video_id) VALUES (?)", (video_id,))
+        conn.commit()
+        logging.warning(f'No translatable transcript in English found for video {video_id}')
+        print(f'No translatable transcript in English found for video {video_id}')
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieve translated English transcripts for videos without one.")
+    parser.add_argument('--db', default=db_path)
+    args = parser.parse_args()
+
+    # Configure logging
+    logging.basicConfig(filename=LOG_FILE, level=logging.INFO)
+    setup_metrics('transcript_update')
+
+    while True:
+        try:
+            conn = sqlite3.connect(args.db, check_same_thread=False)
+            create_tables(conn.cursor())
+            conn.commit()
+            relabelled = migrate_transcript_types(conn)
+            if relabelled:
+                print(f"Relabelled {relabelled} English transcripts stored as translations.")
+            languages = load_languages(conn)
+
+            # Stream the video_ids that need transcripts; only rows of already-read videos are written during the scan
+            print(f"Found {count_video_ids(conn, MISSING_VIDEOS_QUERY)} videos with missing transcripts.")
+            missing_videos = conn.cursor().execute(MISSING_VIDEOS_QUERY)
+
+            updated = 0
+            for (video_id,) in missing_videos:
+                if supplement_transcript(conn, video_id, languages.get(video_id)):
+                    updated += 1
+
+            # Commit changes and close database
+            conn.close()
+
+            print(f"Updated {updated} new translated transcripts.")
+            break # Exit loop after successful completion
 
-        # Commit changes and close database
-        conn.close()
+        except Exception as e:
+            print(f"An error occurred: {e}. Retrying in 60 seconds...")
+            logging.error(f"Main loop error: {e}")
+            metrics.inc('retries_total', reason='main_loop_error')
+            metrics.sleep(60, reason='backoff')  # Wait 60 seconds before retrying on error
 
-        print(f"Updated {len(transcript_data)} new translated transcripts.")
-        break # Exit loop after successful completion
 
-    except Exception as e:
-        print(f"An error occurred: {e}. Retrying in 60 seconds...")
-        logging.error(f"Main loop error: {e}")
-        time.sleep(60)  # Wait 60 seconds before retrying on error
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+# The order the unordered SELECT had (a scan of the primary key index), so saved last_processed_index values
+# from earlier runs still point at the same video
+VIDEO_IDS_QUERY = "SELECT video_id FROM videos ORDER BY video_id"
+
+
+def count_video_ids(conn, query=VIDEO_IDS_QUERY):
+    return conn.execute(f"SELECT COUNT(*) FROM ({query})").fetchone()[0]
+
+
+def iter_video_ids(conn, start=0, query=VIDEO_IDS_QUERY):
+    """Yield (index, video_id) from `start` on, streamed from a cursor instead of loaded into a list."""
+    cursor = conn.execute(f"{query} LIMIT -1 OFFSET ?", (start,))
+    for index, (video_id,) in enumerate(cursor, start):
+        yield index, video_id
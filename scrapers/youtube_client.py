@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+import time
+import urllib.request
+
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+
+import response_cache
+from response_cache import CachedHttpRequest
+
+API_KEYS_FILE = 'api_keys.json' # File containing YouTube API keys
+DISCOVERY_FILE = 'youtube_v3_discovery.json' # On-disk copy of the YouTube Data API discovery document
+DISCOVERY_URL = 'https://www.googleapis.com/discovery/v1/apis/youtube/v3/rest'
+DISCOVERY_MAX_AGE = 30 * 24 * 3600 # Seconds before the cached discovery document is refreshed
+
+
+class QuotaExhausted(Exception):
+    """Raised when every API key has hit its daily quota."""
+
+
+def load_api_keys(path=API_KEYS_FILE):
+    with open(path, 'r') as file:
+        return json.load(file)["keys"]
+
+
+def load_discovery_document(path=DISCOVERY_FILE, max_age=DISCOVERY_MAX_AGE, offline=False):
+    """Parsed discovery document: the on-disk copy while it is younger than `max_age` seconds, otherwise a
+    fresh download saved to `path`. Offline, a stale copy or the document bundled with googleapiclient is used;
+    `offline` (cache replay) skips the download whatever the copy's age.
+    """
+    if os.path.exists(path) and (offline or time.time() - os.path.getmtime(path) < max_age):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    if offline:
+        document = get_static_doc('youtube', 'v3')
+        if document is None:
+            raise FileNotFoundError(f"No discovery document at {path} or bundled with googleapiclient")
+        return json.loads(document)
+    try:
+        with urllib.request.urlopen(DISCOVERY_URL, timeout=10) as response:
+            document = response.read().decode('utf-8')
+    except OSError:
+        if os.path.exists(path):
+            logging.warning(f"Could not refresh {path}; using the cached discovery document.")
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        document = get_static_doc('youtube', 'v3')
+        if document is None:
+            raise
+        return json.loads(document)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(document)
+    os.replace(path + '.tmp', path)
+    return json.loads(document)
+
+
+class YouTubeClients:
+    """One YouTube Data API client per key, built on first use from the discovery document (parsed once).
+
+    `youtube` is the client for the current key; `switch_key` moves to the next key and reuses its
+    client if it was built before, so key rotation does not touch the network. Requests go through the
+    response cache when setup_cache() installed one.
+    """
+
+    def __init__(self, api_keys=None, discovery_file=DISCOVERY_FILE):
+        self.api_keys = api_keys if api_keys is not None else load_api_keys()
+        self.discovery_file = discovery_file
+        self.current_key_index = 0
+        self._document = None
+        self._clients = {}
+
+    @property
+    def youtube(self):
+        if self.current_key_index not in self._clients:
+            if self._document is None:
+                # Replay makes no network requests, the discovery download included
+                offline = response_cache.cache is not None and response_cache.cache.mode == 'replay'
+                self._document = load_discovery_document(self.discovery_file, offline=offline)
+            self._clients[self.current_key_index] = build_from_document(
+                self._document,
+                developerKey=self.api_keys[self.current_key_index],
+                requestBuilder=CachedHttpRequest
+            )
+        return self._clients[self.current_key_index]
+
+    def switch_key(self):
+        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
+        if self.current_key_index == 0:
+            raise QuotaExhausted("All API keys exhausted. Wait until quota resets.")
+        logging.info(f"Switched to API key index {self.current_key_index}.")
+
+    def execute(self, api_operation, **kwargs):
+        """Run e.g. ("search", "list") with the current key, switching keys when the quota is exceeded."""
+        while True:
+            try:
+                api_resource = getattr(self.youtube, api_operation[0])()
+                return getattr(api_resource, api_operation[1])(**kwargs).execute()
+            except HttpError as e:
+                if e.resp.status == 403 and 'quota' in str(e.content):
+                    logging.info(f"Quota exceeded for API key index {self.current_key_index}.")
+                    self.switch_key()
+                    continue
+                raise
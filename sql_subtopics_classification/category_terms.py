@@ -0,0 +1,91 @@
+import re
+from collections import defaultdict
+
+# Textbook-derived SQL subtopics and their index terms (same list as notebooks/sql_subtopic_coverage.ipynb)
+CATEGORY_TEXT = '''
+    Active Databases: 'Active databases'
+    Aggregate Functions: 'Aggregation', 'AVG', 'COUNT', 'MAX', 'MIN', 'SUM'
+    Aliases & Correlation: 'aliases', 'table alias', 'correlation name', 'correlation variables', 'tuple variables', 'lateral clause', 'AS'
+    Arity: 'arity'
+    Atomicity & Domains: 'atomic domains', 'atomicity'
+    Authorization & Privileges: 'authorization', 'authorization graph', 'privileges', 'grant command', 'revoke privileges', 'select privilege', 'references privilege', 'roles', 'create role', 'set role', 'row-level authorization', 'sql security invoker', 'passwords', 'security', 'sys.context function', 'superusers', 'VPD (Virtual Private Database)', 'granted by current role', 'execute privilege'
+    Backup & Recovery: 'backup'
+    Business Logic: 'business logic'
+    Common Language Runtime (CLR): 'Common Language Runtime (CLR)'
+    Cartesian & Product: 'Cartesian products', 'Product'
+    Catalogs & Metadata: 'catalogs'
+    Change Tracking & Delta: 'delta relation', 'change relation'
+    Cursor Operations: 'fetching', 'updatable result sets', 'next method'
+    Data Definition Language (DDL): 'Data definition language (DDL)'
+    Data Manipulation Language (DML): 'Data Manipulation Language (DML)', 'Insertion', 'deletion', 'Update', 'change relation', 'tuples'
+    Data Types - Large Objects: 'large-object types', 'blobs', 'clobs'
+    Data Types - Scalar: 'char', 'varchar', 'nvarchar', 'numeric', 'float', 'real', 'double precision', 'Bit string', 'datetime data type', 'timestamp', 'interval data type'
+    Database Systems: 'IBM DB2', 'Microsoft SQL Server', 'MySQL', 'Oracle', 'PostgreSQL', 'Informix UDS', 'System R', 'database-management systems (DBMSs)', 'database instance', 'databases', 'databases administrator (DBA)'
+    Difference & EXCEPT: 'minus', 'except all', 'except clause', 'except construct', 'Difference operation', 'set-difference operation'
+    Dirty Data: 'Dirty data'
+    Domain & Check Constraints: 'domain constraints', 'check constraints', 'check clause', 'default values', 'set default', 'not null', 'Assertions in SQL', 'create assertion', 'add constraint', 'CREATE DOMAIN', 'domain of attributes'
+    Duplicate Handling: 'Duplicate elimination', 'Duplicates in SQL'
+    Embedded & Dynamic SQL: 'embedded SQL', 'embedded databases', 'dynamic SQL', 'EXEC SQL', 'host language'
+    Example Databases: 'banking', 'university database', 'sandbox'
+    Exceptions & Debugging: 'exceptions', 'exception conditions', 'sqlstate', 'debugging', 'bugs'
+    Expressions & Syntax: 'Expressions in SQL', 'syntax', 'WHERE', 'FROM', 'IN', 'in construct', 'not in construct', 'not exists construct', 'some construct', 'some function', 'EXISTS', 'ANY', 'ALL', 'case construct', 'decode', 'empty relations test'
+    Fetch/Result APIs: 'application program interfaces (APIs)', 'Call Level Interface (CLI) standards', 'Open Database Connectivity (ODBC)', 'Generic interface', 'DriverManager class', 'getConnection method', 'Statement object', 'ResultSet object', 'getFloat method', 'getString method', 'ADO.NET', 'try-with-resources construct', 'jdbc (java database connectivity)', 'getcolumncount method'
+    Group BY & Having: 'GROUP BY', 'group by clause', 'Grouping in SQL', 'grouping sets construct', 'rollup clause', 'rollup construct', 'HAVING', 'cube construct'
+    Hierarchies: 'hierarchies', 'start with/connect by prior syntax'
+    Identity Columns: 'identity specification'
+    Index: 'create index', 'create unique index', 'drop index'
+    Integrity Constraints: 'integrity constraints', 'deferred integrity constraints', 'initially deferred integrity constraints', 'set null'
+    Join Operations: 'Join', 'Natural join', 'CROSS JOIN', 'Left outerjoin', 'Right outerjoin', 'inner joins', 'Outer join', 'anti-join operation', 'semijoin operation', 'on condition', 'join using operation', 'full outer join'
+    Key Constraints: 'keys', 'candidate keys', 'primary keys', 'superkeys', 'unique construct', 'unique key values', 'not unique construct'
+    Language Integrated Query (LINQ): 'Language Integrated Query (LINQ)'
+    Logical Connectives: 'and connective', 'or connective', 'not connective', 'not operation', 'Negation', 'Boolean operations', 'or operation'
+    Null & Unknown Handling: 'Null value', 'UNKNOWN', 'unknown values', 'is null', 'is not null', 'is unknown', 'is not unknown', 'Three-valued logic', 'Truth value', 'true predicate', 'true values', 'false values'
+    Operating Systems: 'Unix'
+    Ordering & Limits: 'ORDER BY', 'asc expression', 'desc expression', 'limit clause', 'Lexicographic order'
+    Partitioning: 'partitions'
+    Pointers: 'pointers'
+    Prepared Statements: 'prepared statements', 'parameter style general', 'call statement', 'parameterized views'
+    Procedures & PSM: 'procedures', 'create procedure', 'functions', 'create function', 'handlers', 'procedural languages', 'Persistent Storage Module (PSM)', 'PL/SQL', 'begin atomic...end', 'repeat loop', 'repeat statements', 'while loop', 'while statements', 'if clauses', 'if-then-else statements', 'then clause', 'when clause', 'when statement', 'nondeclarative actions', 'Packages in SQL: 1999', 'declare statement', 'iteration', 'external language routines'
+    Programming Languages: 'C', 'C++', 'Java', 'Perl', 'Python', 'Tcl', 'Visual Basic', 'TransactSQL', 'programming languages'
+    Projection & Project Operation: 'project operation', 'Projection', 'Attribute'
+    Queries & Paradigms: 'queries', 'query languages', 'declarative queries', 'functional query language', 'imperative query language'
+    Recursive Queries: 'recursive queries', 'with recursive clause', 'fixed point of recursive view definition', 'transitive closure'
+    Referential Integrity: 'referential integrity', 'references', 'referenced relation', 'referencing relation', 'referencing new row as clause', 'referencing new table as clause', 'referencing old row as clause', 'referencing old table as clause', 'on delete cascade', 'on update cascade', 'cascades', 'foreign keys'
+    Relational Model & Algebra: 'relation', 'relational model', 'relational schema', 'relational instance', 'relational algebra', 'relational-algebra expressions', 'functional dependencies', 'multiset relational algebra', 'Multisets', 'multiset except', 'Set comparisons in SQL', 'compatible relations', 'equivalence', 'equivalent queries', 'Conceptual evaluation strategy', 'monotonic queries', 'binary operations', 'unary operations', 'rename operation'
+    Row-Level Security: 'Row-level triggers'
+    SQL Standards & History: 'Structured Query Language (SQL)', 'Sequel', 'American National Standards Institute (ANSI)', 'International Organization for Standardization (ISO)', 'standards', 'SQL environment', 'conformance levels'
+    Scalar Functions: 'cast', 'coalesce function', 'every function'
+    Schema: 'create schema', 'drop schema', 'schemas', 'schema diagrams'
+    Security: 'SQL injection'
+    Select Variants: 'SELECT', 'select clause', 'select distinct', 'select all', 'select operation', 'select privilege', 'select authorization, privileges and', 'select-from-where', 'Selection', 'base query', 'restriction'
+    Sequence: 'create sequence construct'
+    Set & Assignment: 'set clause', 'Set', 'assignment operation', 'set null', 'set statement'
+    Set Operations: 'Union', 'union all', 'union of sets', 'intersect all', 'Intersection', 'outer union operation', 'set operations', 'Set operators'
+    Statistics: 'histograms'
+    String Functions: 'Strings in SQL', 'string operations', 'trim', 'LIKE', 'escape', 'Escape character', 'Case sensitivity', 'Collations in SQL'
+    Subqueries: 'Subquery', 'Nested queries', 'nested subqueries', 'correlated subqueries', 'scalar subqueries'
+    Table: 'create table...as', 'create table...like', 'create temporary table', 'alter table', 'drop table', 'tables'
+    Table Functions: 'table functions'
+    Temporal Concepts: 'as of period for', 'versions period for', 'period declaration', 'valid time', 'temporal validity', 'current date', 'localtimestamp', 'Dates and times in SQL', 'timezone', 'timestamp'
+    Transactions & Isolation: 'Transaction', 'Commit', 'rollback', 'rollback work', 'automatic commit', 'set autocommit off', 'transaction control', 'Read commited', 'Read uncommited', 'Repeatable read', 'Serializability', 'Isolation level', 'Read-only transaction'
+    Triggers: 'triggers', 'after triggers', 'before triggers', 'Row-level triggers', 'Statement-level triggers', 'Events activating triggers', 'CREATE TRIGGER', 'alter trigger', 'disable trigger', 'drop trigger', 'for each row clause', 'for each statement clause', 'instead of feature', 'transition tables', 'transition variables'
+    Type: 'distinct type', 'create distinct type', 'CREATE TYPE', 'alter type', 'drop type', 'types', 'user-defined types', 'structured types'
+    View: 'views', 'create view', 'parameterized views', 'create recursive view', 'view definition', 'materialized views', 'view maintenance'
+    WITH Clauses: 'with clause', 'with data clause', 'with check option', 'with grant option', 'with timezone specification'
+    Windowing & Pivoting: 'windows and windowing', 'pivot clause', 'pivot attribute', 'pivot-table', 'pivoting', 'ranking'
+'''
+
+
+def parse_category_terms(text=CATEGORY_TEXT):
+    """Parse 'Category: 'term', 'term'' lines into an ordered {category: [terms]} dict."""
+    category_terms = defaultdict(list)
+    for line in text.strip().splitlines():
+        match = re.match(r"\s*(.*?):\s*(.*)", line)
+        if match:
+            category = match.group(1).strip()
+            terms = re.findall(r"'(.*?)'", match.group(2))
+            category_terms[category].extend([term.strip() for term in terms])
+    return dict(category_terms)
+
+
+category_terms = parse_category_terms()
@@ -0,0 +1,181 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from subtopic_backends import LlamaCppBackend, MockBackend, build_video_block
+from subtopic_prefilter import (
+    VIDEO_EMBEDDINGS_FILE,
+    VIDEO_ID_MAPPING_FILE,
+    SubtopicPrefilter,
+    load_video_embeddings,
+    report_savings,
+)
+
+DATABASE_FILE = 'ds_edu_videos.db' # SQLite database with videos and transcripts
+OUTPUT_FILE = 'sql_subtopics_classification_results_qwen3.jsonl' # Streamed classification results
+LOG_FILE = 'subtopic_classification.log' # Log file for the classification run
+BATCH_SIZE = 4 # Requests in flight; match llama-server --parallel
+
+# Relevant SQL videos to classify (predicted_label comes from the relevance classifier)
+VIDEO_QUERY = """
+    SELECT v.video_id, v.title, v.description, t.transcript
+    FROM videos v
+    LEFT JOIN transcripts t ON v.video_id = t.video_id
+    WHERE v.predicted_label = 1 AND v.keywords LIKE '%SQL%'
+"""
+
+
+def load_done_video_ids(output_file):
+    """Collect video_ids already in the output file so a re-run only pays for new videos."""
+    done = set()
+    if not os.path.exists(output_file):
+        return done
+    with open(output_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)['video_id'])
+            except (json.JSONDecodeError, KeyError):
+                continue  # partially written last line from an interrupted run
+    return done
+
+
+def iter_videos(db_path, done_video_ids):
+    """Stream (video_id, title, description, transcript) rows that still need a classification."""
+    conn = sqlite3.connect(db_path)
+    try:
+        for row in conn.execute(VIDEO_QUERY):
+            if row[0] not in done_video_ids:
+                yield row
+    finally:
+        conn.close()
+
+
+def classify_video(backend, row, shortlist=None):
+    video_id, title, description, transcript = row
+    start = time.perf_counter()
+    result = backend.classify(build_video_block(title, description, transcript), categories=shortlist)
+    result['latency'] = time.perf_counter() - start
+    return video_id, title, result
+
+
+def run(backend, videos, output_file, batch_size=BATCH_SIZE, decisions=None):
+    """Classify videos with up to batch_size requests in flight and append each result as soon as it finishes.
+
+    `decisions` comes from SubtopicPrefilter.decide or lazy_decisions: videos mapped to None are recorded as
+    having no matching category without an LLM call, and videos mapped to a shortlist get a reduced prompt.
+    Each video is looked up once, when its row arrives.
+    """
+    decisions = decisions or {}
+    backend.warm_prefix(n_slots=batch_size)
+    stats = {'videos': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0, 'failed': 0,
+             'skipped': 0, 'shortlisted': 0}
+    start = time.perf_counter()
+
+    with open(output_file, 'a+', encoding='utf-8') as out, ThreadPoolExecutor(max_workers=batch_size) as pool:
+        # End a partially written last line from an interrupted run, so the first new result stays readable
+        if out.tell():
+            out.seek(out.tell() - 1)
+            if out.read(1) != '\n':
+                out.write('\n')
+        pending = set()
+        videos = iter(videos)
+        exhausted = False
+        while pending or not exhausted:
+            # Keep the server's slots busy without queueing the whole table in memory
+            while not exhausted and len(pending) < batch_size * 2:
+                row = next(videos, None)
+                if row is None:
+                    exhausted = True
+                    break
+                gated = row[0] in decisions
+                shortlist = decisions[row[0]] if gated else None
+                if gated and shortlist is None:
+                    out.write(json.dumps({
+                        'video_id': row[0],
+                        'en_title': row[1],
+                        'matching_categories': [],
+                        'raw_model_output': None,
+                        'prefilter': 'skipped',
+                    }, ensure_ascii=False) + '\n')
+                    stats['skipped'] += 1
+                    continue
+                stats['shortlisted'] += gated
+                pending.add(pool.submit(classify_video, backend, row, shortlist))
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                try:
+                    video_id, title, result = future.result()
+                except Exception as e:
+                    logging.error(f"Classification request failed: {e}")
+                    stats['failed'] += 1
+                    continue
+                out.write(json.dumps({
+                    'video_id': video_id,
+                    'en_title': title,
+                    'matching_categories': result['matching_categories'],
+                    'raw_model_output': result['raw_model_output'],
+                }, ensure_ascii=False) + '\n')
+                out.flush()
+                stats['videos'] += 1
+                for key in ('prompt_tokens', 'cached_tokens', 'completion_tokens'):
+                    stats[key] += result.get(key, 0)
+                logging.info(f"Video ID {video_id}: {result['matching_categories']} ({result['latency']:.2f}s)")
+
+    stats['elapsed'] = time.perf_counter() - start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify SQL videos into textbook subtopics with a local LLM.")
+    parser.add_argument('--backend', choices=['llama.cpp', 'mock'], default='llama.cpp')
+    parser.add_argument('--server-url', default='http://127.0.0.1:8080', help="llama.cpp server address")
+    parser.add_argument('--db', default=DATABASE_FILE)
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--constrained', action='store_true',
+                        help="Grammar-constrained decoding: only category names from category_terms can be emitted")
+    parser.add_argument('--prefilter', action='store_true',
+                        help="Skip or shortlist videos with the calibrated embedding pre-filter (see subtopic_prefilter.py)")
+    parser.add_argument('--video-embeddings', default=VIDEO_EMBEDDINGS_FILE)
+    parser.add_argument('--video-id-mapping', default=VIDEO_ID_MAPPING_FILE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', handlers=[
+        logging.FileHandler(LOG_FILE),
+        logging.StreamHandler()
+    ])
+
+    if args.backend == 'mock':
+        backend = MockBackend()
+    else:
+        backend = LlamaCppBackend(server_url=args.server_url, constrained=args.constrained)
+
+    done_video_ids = load_done_video_ids(args.output)
+    logging.info(f"Resuming with {len(done_video_ids)} videos already classified in {args.output}.")
+
+    videos = iter_videos(args.db, done_video_ids)
+    decisions = None
+    if args.prefilter:
+        # Rows (with their transcripts) stay streamed; each video is scored when its row arrives
+        embeddings, index = load_video_embeddings(args.video_embeddings, args.video_id_mapping)
+        decisions = SubtopicPrefilter.load().lazy_decisions(embeddings, index)
+
+    stats = run(backend, videos, args.output, batch_size=args.batch_size, decisions=decisions)
+    if args.prefilter:
+        report_savings(stats['skipped'], stats['skipped'] + stats['shortlisted'], stats['shortlisted'])
+    logging.info(
+        f"Classified {stats['videos']} new videos ({stats['failed']} failed, "
+        f"{stats['skipped']} skipped by the pre-filter) in {stats['elapsed']:.1f}s. "
+        f"Prompt tokens = {stats['prompt_tokens']} (served from prefix cache = {stats['cached_tokens']}), "
+        f"Completion tokens = {stats['completion_tokens']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
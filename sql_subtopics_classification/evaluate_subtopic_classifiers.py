@@ -0,0 +1,194 @@
+import argparse
+import json
+import statistics
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from category_terms import category_terms
+from subtopic_backends import (
+    EmbeddingKNNBackend,
+    LlamaCppBackend,
+    LlamaCppEmbedder,
+    TermMatchBackend,
+    build_video_block,
+)
+
+EVAL_FILE = 'eval_data.json' # Textbook passages with ground-truth subtopics
+WORKERS = 4 # Items classified in parallel per backend
+
+
+class RecordedBackend:
+    """Replays predictions stored in eval_data.json (e.g. qwen3_prediction) so past runs sit in the same table."""
+
+    def __init__(self, field):
+        self.name = field
+        self.field = field
+
+    def warm_prefix(self, n_slots=1):
+        pass
+
+    def classify(self, item):
+        return {
+            "matching_categories": item.get(self.field, []),
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "completion_tokens": 0,
+        }
+
+
+def load_eval_data(path=EVAL_FILE):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def passage_block(item):
+    # Passages take the place of the transcript; there is no title or description
+    return build_video_block("", "", item['passage'], transcript_words=2000)
+
+
+def classify_item(backend, item):
+    start = time.perf_counter()
+    if isinstance(backend, RecordedBackend):
+        result = backend.classify(item)
+    else:
+        result = backend.classify(passage_block(item))
+    result['latency'] = time.perf_counter() - start
+    return result
+
+
+def run_backend(backend, items, workers=WORKERS):
+    """Classify all items with `workers` requests in flight. Returns per-item results and wall time."""
+    backend.warm_prefix(n_slots=workers)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda item: classify_item(backend, item), items))
+    return results, time.perf_counter() - start
+
+
+def per_category_scores(items, results):
+    """Multi-label precision/recall/F1 per category, plus micro and macro averages."""
+    counts = defaultdict(lambda: {'tp': 0, 'fp': 0, 'fn': 0})
+    for item, result in zip(items, results):
+        truth = set(item['ground_truth'])
+        predicted = set(result['matching_categories'])
+        for category in truth & predicted:
+            counts[category]['tp'] += 1
+        for category in predicted - truth:
+            counts[category]['fp'] += 1
+        for category in truth - predicted:
+            counts[category]['fn'] += 1
+
+    def prf(tp, fp, fn):
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        return {'precision': precision, 'recall': recall, 'f1': f1, 'support': tp + fn}
+
+    scores = {category: prf(**c) for category, c in sorted(counts.items())}
+    total = {key: sum(c[key] for c in counts.values()) for key in ('tp', 'fp', 'fn')}
+    # Macro average over every category that appears in the ground truth or the predictions
+    summary = {
+        'micro': prf(**total),
+        'macro': {key: statistics.mean(s[key] for s in scores.values()) if scores else 0.0
+                  for key in ('precision', 'recall', 'f1')},
+        'invalid_labels': sum(1 for r in results for c in r['matching_categories'] if c not in category_terms),
+    }
+    return scores, summary
+
+
+def cost_summary(results, elapsed):
+    latencies = sorted(r['latency'] for r in results)
+    n = len(results)
+    return {
+        'latency_p50': latencies[n // 2],
+        'latency_p95': latencies[min(n - 1, int(n * 0.95))],
+        'throughput': n / elapsed if elapsed else float('inf'),
+        'prompt_tokens_per_item': sum(r.get('prompt_tokens', 0) for r in results) / n,
+        'uncached_prompt_tokens_per_item': sum(r.get('prompt_tokens', 0) - r.get('cached_tokens', 0) for r in results) / n,
+        'completion_tokens_per_item': sum(r.get('completion_tokens', 0) for r in results) / n,
+    }
+
+
+def evaluate(backends, items, workers=WORKERS):
+    """Run every backend over the eval set; returns {backend name: report}."""
+    reports = {}
+    for backend in backends:
+        results, elapsed = run_backend(backend, items, workers)
+        scores, summary = per_category_scores(items, results)
+        reports[backend.name] = {
+            'per_category': scores,
+            'summary': summary,
+            'cost': cost_summary(results, elapsed),
+            'predictions': {item['id']: r['matching_categories'] for item, r in zip(items, results)},
+        }
+    return reports
+
+
+def print_per_category(name, scores):
+    print(f"\n** Per-category scores ({name}) **")
+    print(f"{'Category':<36} {'P':>6} {'R':>6} {'F1':>6} {'Support':>8}")
+    for category, s in scores.items():
+        print(f"{category:<36} {s['precision']:6.3f} {s['recall']:6.3f} {s['f1']:6.3f} {s['support']:8d}")
+
+
+def print_comparison(reports):
+    """One row per backend: accuracy next to cost, for choosing between a fast and a slow backend."""
+    header = (f"{'Backend':<20} {'Micro-F1':>8} {'Macro-F1':>8} {'Invalid':>7} {'p50 (s)':>8} {'p95 (s)':>8} "
+              f"{'Items/s':>8} {'Prompt tok':>10} {'Uncached':>9} {'Compl tok':>9}")
+    print("\n=== Subtopic Classifier Comparison ===")
+    print(header)
+    print("-" * len(header))
+    for name, report in reports.items():
+        summary, cost = report['summary'], report['cost']
+        print(f"{name:<20} {summary['micro']['f1']:8.3f} {summary['macro']['f1']:8.3f} {summary['invalid_labels']:7d} "
+              f"{cost['latency_p50']:8.3f} {cost['latency_p95']:8.3f} {cost['throughput']:8.1f} "
+              f"{cost['prompt_tokens_per_item']:10.0f} {cost['uncached_prompt_tokens_per_item']:9.0f} "
+              f"{cost['completion_tokens_per_item']:9.0f}")
+
+
+def build_backends(names, args):
+    backends = []
+    for name in names:
+        if name == 'term-match':
+            backends.append(TermMatchBackend())
+        elif name in ('qwen3_prediction', 'llama3_prediction'):
+            backends.append(RecordedBackend(name))
+        elif name == 'llama.cpp':
+            backends.append(LlamaCppBackend(server_url=args.server_url, constrained=args.constrained))
+        elif name == 'embedding-knn':
+            backends.append(EmbeddingKNNBackend(LlamaCppEmbedder(args.embedding_url)))
+        else:
+            raise ValueError(f"Unknown backend: {name}")
+    return backends
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score subtopic classifiers against eval_data.json.")
+    parser.add_argument('--backends', nargs='+', default=['term-match', 'qwen3_prediction', 'llama3_prediction'],
+                        help="term-match, qwen3_prediction, llama3_prediction, llama.cpp, embedding-knn")
+    parser.add_argument('--eval-file', default=EVAL_FILE)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--server-url', default='http://127.0.0.1:8080', help="llama.cpp completion server")
+    parser.add_argument('--embedding-url', default='http://127.0.0.1:8081', help="llama.cpp embedding server")
+    parser.add_argument('--constrained', action='store_true')
+    parser.add_argument('--per-category', action='store_true', help="Print per-category scores for every backend")
+    parser.add_argument('--output', help="Optional JSON file for the full report")
+    args = parser.parse_args()
+
+    items = load_eval_data(args.eval_file)
+    reports = evaluate(build_backends(args.backends, args), items, workers=args.workers)
+
+    if args.per_category:
+        for name, report in reports.items():
+            print_per_category(name, report['per_category'])
+    print_comparison(reports)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2)
+        print(f"\nReport saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+import json
+import re
+import time
+import urllib.request
+from contextlib import closing
+
+import numpy as np
+
+from category_terms import category_terms as default_category_terms
+
+# Shared instruction + category list. It is identical for every video, so it is sent first
+# and the backend keeps its KV/prefix cache instead of re-reading ~3k tokens per video.
+PROMPT_PREFIX_TEMPLATE = """You are an expert in database education. Below is a list of SQL subtopic CATEGORIES, each followed by its textbook index terms.
+Given the YouTube video INFORMATION that follows, return every category whose subtopic is explicitly taught in the video.
+Only use category names exactly as written in the list. If no category applies, return an empty list.
+Reply with a JSON object of the form {{"matching_categories": ["<category>", ...]}} and nothing else.
+---- CATEGORIES START -----
+{categories}
+---- CATEGORIES END -----
+"""
+
+# Qwen3 ChatML wrapping for the raw /completion endpoint; "/no_think" skips the reasoning block
+CHAT_PREFIX = "<|im_start|>user\n"
+CHAT_SUFFIX = "/no_think<|im_end|>\n<|im_start|>assistant\n"
+
+# Pre-filter shortlist, sent between the shared prefix and the video so the cached prefix is still reused
+SHORTLIST_TEMPLATE = """Candidate categories for this video (choose only among these): {categories}
+"""
+
+VIDEO_TEMPLATE = """---- INFORMATION START -----
+Title: {title}
+Description: {description}
+Video Transcript: {transcript}
+---- INFORMATION END -----
+"""
+
+
+def truncate_text(text, word_limit):
+    """Truncate text to a specified word limit."""
+    if not text:
+        return ""
+    words = text.split()
+    return " ".join(words[:word_limit])
+
+
+def build_prompt_prefix(category_terms):
+    """Render the shared category-list prefix."""
+    lines = [f"{category}: {', '.join(terms)}" for category, terms in category_terms.items()]
+    return PROMPT_PREFIX_TEMPLATE.format(categories="\n".join(lines))
+
+
+def build_shortlist_block(categories):
+    """Render the shortlist line that follows the shared prefix; empty without a shortlist."""
+    if categories is None:
+        return ""
+    return SHORTLIST_TEMPLATE.format(categories=", ".join(categories))
+
+
+def build_video_block(title, description, transcript, description_words=150, transcript_words=500):
+    """Render the per-video suffix that follows the shared prefix."""
+    return VIDEO_TEMPLATE.format(
+        title=title or "",
+        description=truncate_text(description, description_words),
+        transcript=truncate_text(transcript, transcript_words),
+    )
+
+
+def parse_model_output(raw_output):
+    """Extract matching_categories from a model reply (tolerates Qwen3 <think> blocks and code fences)."""
+    text = re.sub(r"<think>.*?</think>", "", raw_output or "", flags=re.DOTALL)
+    match = re.search(r"\{.*\}", text, flags=re.DOTALL)
+    if not match:
+        return []
+    try:
+        categories = json.loads(match.group(0)).get("matching_categories", [])
+    except (json.JSONDecodeError, AttributeError):
+        return []
+    return [c for c in categories if isinstance(c, str)]
+
+
+def build_output_grammar(category_terms):
+    """GBNF grammar for {"matching_categories": [...]} whose items can only be category names from category_terms.
+
+    Whitespace is bounded so decoding cannot stall on padding.
+    """
+    def literal(name):
+        return '"\\"' + name.replace("\\", "\\\\").replace('"', '\\"') + '\\""'
+
+    categories = "\n    | ".join(literal(name) for name in category_terms)
+    return (
+        'root ::= "{" ws "\\"matching_categories\\"" ws ":" ws "[" ws (category (ws "," ws category)*)? ws "]" ws "}"\n'
+        f"category ::= {categories}\n"
+        'ws ::= [ \\t\\n]{0,8}\n'
+    )
+
+
+class StreamingCategoryParser:
+    """Incremental parser for {"matching_categories": [...]} that emits each category as soon as its string closes.
+
+    Text before the array (e.g. the object key) is skipped, and anything after the closing bracket is ignored.
+    Names outside allowed_categories are dropped.
+    """
+
+    def __init__(self, allowed_categories):
+        self.allowed = set(allowed_categories)
+        self.categories = []
+        self.in_array = False
+        self.in_string = False
+        self.escaped = False
+        self.done = False
+        self.buffer = []
+
+    def feed(self, chunk):
+        """Consume a piece of model output and return the categories completed by it."""
+        completed = []
+        for char in chunk:
+            if self.done:
+                break
+            if self.in_string:
+                if self.escaped:
+                    self.buffer.append(char)
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.in_array:
+                        name = "".join(self.buffer)
+                        if name in self.allowed and name not in self.categories:
+                            self.categories.append(name)
+                            completed.append(name)
+                    self.buffer = []
+                else:
+                    self.buffer.append(char)
+            elif char == '"':
+                self.in_string = True
+            elif char == "[":
+                self.in_array = True
+            elif char == "]" and self.in_array:
+                self.done = True
+        return completed
+
+
+def compile_term_patterns(category_terms):
+    """One regex per category. Short all-caps keywords ('AS', 'IN', 'ALL') only match in upper case."""
+    patterns = {}
+    for category, terms in category_terms.items():
+        keywords = [t for t in terms if t.isupper() and len(t) <= 4]
+        phrases = [t for t in terms if t not in keywords]
+        alternatives = [re.escape(t) for t in keywords] + ["(?i:" + re.escape(t) + ")" for t in phrases]
+        patterns[category] = re.compile(r"(?<!\w)(?:" + "|".join(alternatives) + r")(?!\w)")
+    return patterns
+
+
+class LlamaCppBackend:
+    """Client for a local llama.cpp server (`llama-server -m Qwen3-8B.gguf --parallel N`).
+
+    Every request carries `cache_prompt` so the server reuses the KV cache of the shared prefix;
+    `warm_prefix` evaluates the prefix once per slot before the batch starts.
+    """
+
+    name = "llama.cpp"
+
+    def __init__(self, server_url="http://127.0.0.1:8080", category_terms=None, n_predict=256,
+                 temperature=0.0, timeout=600, constrained=False):
+        self.server_url = server_url.rstrip("/")
+        self.category_terms = category_terms or default_category_terms
+        self.prompt_prefix = CHAT_PREFIX + build_prompt_prefix(self.category_terms)
+        self.n_predict = n_predict
+        self.temperature = temperature
+        self.timeout = timeout
+        # Constrained mode: the grammar only admits valid category names and the reply is parsed while it streams
+        self.constrained = constrained
+        self.grammar = build_output_grammar(self.category_terms) if constrained else None
+
+    def _request(self, path, payload):
+        return urllib.request.Request(
+            self.server_url + path,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+
+    def _post(self, path, payload):
+        with urllib.request.urlopen(self._request(path, payload), timeout=self.timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+
+    def _stream(self, path, payload):
+        """Yield the server-sent event payloads of a streaming completion."""
+        with urllib.request.urlopen(self._request(path, dict(payload, stream=True)), timeout=self.timeout) as response:
+            for line in response:
+                line = line.decode("utf-8").strip()
+                if line.startswith("data: "):
+                    yield json.loads(line[len("data: "):])
+
+    def warm_prefix(self, n_slots=1):
+        """Evaluate the shared prefix once in every server slot so later requests only pay for the suffix."""
+        for slot in range(n_slots):
+            self._post("/completion", {
+                "prompt": self.prompt_prefix,
+                "n_predict": 0,
+                "cache_prompt": True,
+                "id_slot": slot,
+            })
+
+    def classify(self, video_block, categories=None):
+        """Classify one rendered video block. Returns categories, raw output and token counts.
+
+        If `categories` is given (a pre-filter shortlist), it is named after the shared prefix, which stays cached,
+        and only those categories are accepted in the reply.
+        """
+        category_terms = self.category_terms
+        grammar = self.grammar
+        if categories is not None:
+            category_terms = {c: self.category_terms[c] for c in categories}
+            grammar = build_output_grammar(category_terms) if self.constrained else None
+
+        payload = {
+            "prompt": self.prompt_prefix + build_shortlist_block(categories) + video_block + CHAT_SUFFIX,
+            "n_predict": self.n_predict,
+            "temperature": self.temperature,
+            "cache_prompt": True,
+        }
+        if self.constrained:
+            return self._classify_constrained(dict(payload, grammar=grammar), category_terms)
+
+        response = self._post("/completion", payload)
+        raw_output = response.get("content", "")
+        matching = parse_model_output(raw_output)
+        if categories is not None:
+            matching = [c for c in matching if c in category_terms]
+        return self._result(matching, raw_output, response)
+
+    def _classify_constrained(self, payload, category_terms):
+        parser = StreamingCategoryParser(category_terms)
+        pieces = []
+        final = {}
+        # Read up to the stop event, which carries the token counts; the grammar ends generation after "]" ws "}".
+        # Closing the generator closes the HTTP response if the loop is left by an exception.
+        with closing(self._stream("/completion", payload)) as events:
+            for event in events:
+                pieces.append(event.get("content", ""))
+                parser.feed(event.get("content", ""))
+                if event.get("stop"):
+                    final = event
+                    break
+        return self._result(parser.categories, "".join(pieces), final)
+
+    @staticmethod
+    def _result(categories, raw_output, response):
+        timings = response.get("timings", {})
+        prompt_tokens = response.get("tokens_evaluated", 0)
+        return {
+            "matching_categories": categories,
+            "raw_model_output": raw_output,
+            "prompt_tokens": prompt_tokens,
+            # prompt_n only counts tokens that were not served from the prefix cache
+            "cached_tokens": max(prompt_tokens - timings.get("prompt_n", prompt_tokens), 0),
+            "completion_tokens": response.get("tokens_predicted", 0),
+        }
+
+
+class TermMatchBackend:
+    """Rule-based classifier that assigns every category whose index terms occur in the text. No model, no tokens."""
+
+    name = "term-match"
+
+    def __init__(self, category_terms=None):
+        self.category_terms = category_terms or default_category_terms
+        self.prompt_prefix = build_prompt_prefix(self.category_terms)
+        self.patterns = compile_term_patterns(self.category_terms)
+
+    def warm_prefix(self, n_slots=1):
+        pass
+
+    def match(self, text, categories=None):
+        return [c for c, pattern in self.patterns.items()
+                if (categories is None or c in categories) and pattern.search(text)]
+
+    def classify(self, video_block, categories=None):
+        categories = self.match(video_block, categories)
+        return {
+            "matching_categories": categories,
+            "raw_model_output": json.dumps({"matching_categories": categories}, indent=2),
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "completion_tokens": 0,
+        }
+
+
+class MockBackend(TermMatchBackend):
+    """Offline stand-in for the LLM: term matching plus simulated latency and token accounting.
+
+    Useful for dry runs of the pipeline.
+    """
+
+    name = "mock"
+
+    def __init__(self, category_terms=None, latency=0.0):
+        super().__init__(category_terms)
+        self.latency = latency
+        self.prefix_cached = False
+
+    def warm_prefix(self, n_slots=1):
+        self.prefix_cached = True
+
+    def classify(self, video_block, categories=None):
+        if self.latency:
+            time.sleep(self.latency)
+        result = super().classify(video_block, categories)
+        prefix_tokens = len(self.prompt_prefix.split())
+        result.update({
+            "prompt_tokens": prefix_tokens + len((build_shortlist_block(categories) + video_block).split()),
+            "cached_tokens": prefix_tokens if self.prefix_cached else 0,
+            "completion_tokens": len(result["raw_model_output"].split()),
+        })
+        return result
+
+
+class LlamaCppEmbedder:
+    """Embeds text through a llama.cpp server started with --embedding (e.g. a gte-Qwen2 GGUF)."""
+
+    def __init__(self, server_url="http://127.0.0.1:8081", timeout=120):
+        self.server_url = server_url.rstrip("/")
+        self.timeout = timeout
+
+    def __call__(self, texts):
+        request = urllib.request.Request(
+            self.server_url + "/embedding",
+            data=json.dumps({"content": list(texts)}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            results = json.loads(response.read().decode("utf-8"))
+        vectors = [item["embedding"] for item in results]
+        # Servers with pooling=none return one vector per token; keep the last (EOS) one as gte-Qwen2 does
+        vectors = [v[-1] if v and isinstance(v[0], list) else v for v in vectors]
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def category_descriptions(category_terms):
+    """Short natural-language description of each category, used as its embedding anchor."""
+    return [f"SQL topic: {category}. Related terms: {', '.join(terms)}" for category, terms in category_terms.items()]
+
+
+class EmbeddingKNNBackend:
+    """Nearest-category classifier: cosine similarity between the text embedding and each category description.
+
+    Returns the top_k categories whose similarity is at least min_similarity.
+    """
+
+    name = "embedding-knn"
+
+    def __init__(self, embed, category_terms=None, top_k=3, min_similarity=0.5):
+        self.embed = embed
+        self.category_terms = category_terms or default_category_terms
+        self.category_names = list(self.category_terms)
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+        matrix = embed(category_descriptions(self.category_terms))
+        self.category_matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+    def warm_prefix(self, n_slots=1):
+        pass
+
+    def classify(self, video_block, categories=None):
+        vector = self.embed([video_block])[0]
+        similarity = self.category_matrix @ (vector / np.linalg.norm(vector))
+        if categories is not None:
+            similarity = np.where(np.isin(self.category_names, categories), similarity, -np.inf)
+        ranked = np.argsort(-similarity)[:self.top_k]
+        categories = [self.category_names[i] for i in ranked if similarity[i] >= self.min_similarity]
+        return {
+            "matching_categories": categories,
+            "raw_model_output": json.dumps({"matching_categories": categories}),
+            "prompt_tokens": len(video_block.split()),
+            "cached_tokens": 0,
+            "completion_tokens": 0,
+        }
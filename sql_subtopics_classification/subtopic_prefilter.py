@@ -0,0 +1,188 @@
+import argparse
+import json
+
+import numpy as np
+
+from category_terms import category_terms
+from evaluate_subtopic_classifiers import load_eval_data, passage_block
+from subtopic_backends import LlamaCppEmbedder, category_descriptions
+
+CALIBRATION_FILE = 'prefilter_calibration.json' # Threshold, shortlist size and eval recall of the gate
+CATEGORY_EMBEDDINGS_FILE = 'category_embeddings.npy' # Category description embeddings, computed once
+VIDEO_EMBEDDINGS_FILE = '../filtering/embeddings_gte-Qwen2-7B-instruct/video_embeddings.npy'
+VIDEO_ID_MAPPING_FILE = '../filtering/embeddings_gte-Qwen2-7B-instruct/video_id_mapping.txt'
+TARGET_RECALL = 0.95 # Share of eval passages that must pass the gate / keep their true categories
+
+
+def normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+class SubtopicPrefilter:
+    """Cheap gate in front of the LLM classifier.
+
+    Videos whose best category similarity is below `threshold` skip the LLM call. The others are sent
+    with a reduced prompt that only lists their `shortlist_size` most similar categories.
+    """
+
+    def __init__(self, category_matrix, category_names, threshold, shortlist_size):
+        self.category_matrix = normalize(category_matrix)
+        self.category_names = list(category_names)
+        self.threshold = threshold
+        self.shortlist_size = shortlist_size
+
+    def similarities(self, embeddings):
+        """Cosine similarity of every embedding to every category: one (n x d) @ (d x k) product."""
+        return normalize(embeddings) @ self.category_matrix.T
+
+    def shortlists(self, similarities):
+        """None for rows that skip the LLM, otherwise the candidate categories ordered by similarity."""
+        top = np.argsort(-similarities, axis=1)[:, :self.shortlist_size]
+        passed = similarities.max(axis=1) >= self.threshold
+        return [
+            [self.category_names[j] for j in top[i]] if passed[i] else None
+            for i in range(len(similarities))
+        ]
+
+    def decide(self, video_ids, embeddings, chunk_size=10000):
+        """Map each video_id to its shortlist (or None to skip)."""
+        decisions = {}
+        for start in range(0, len(video_ids), chunk_size):
+            chunk = np.asarray(embeddings[start:start + chunk_size])
+            decisions.update(zip(video_ids[start:start + chunk_size], self.shortlists(self.similarities(chunk))))
+        return decisions
+
+    def lazy_decisions(self, embeddings, index):
+        """Mapping with the same lookups as `decide`, scoring a video's embedding only when it is looked up,
+        so rows can be streamed through the gate."""
+        return LazyDecisions(self, embeddings, index)
+
+    @classmethod
+    def load(cls, calibration_file=CALIBRATION_FILE, category_embeddings_file=CATEGORY_EMBEDDINGS_FILE):
+        with open(calibration_file, 'r', encoding='utf-8') as f:
+            calibration = json.load(f)
+        return cls(np.load(category_embeddings_file), calibration['category_names'],
+                   calibration['threshold'], calibration['shortlist_size'])
+
+
+class LazyDecisions:
+    """video_id -> shortlist (or None to skip) for the videos in `index` (video_id -> embedding row)."""
+
+    def __init__(self, prefilter, embeddings, index):
+        self.prefilter = prefilter
+        self.embeddings = embeddings
+        self.index = index
+
+    def __contains__(self, video_id):
+        return video_id in self.index
+
+    def __getitem__(self, video_id):
+        embedding = np.asarray(self.embeddings[self.index[video_id]])[None, :]
+        return self.prefilter.shortlists(self.prefilter.similarities(embedding))[0]
+
+
+def calibrate(eval_similarities, eval_items, category_names, target_recall=TARGET_RECALL):
+    """Pick the highest gate threshold and the smallest shortlist that keep `target_recall` on the eval set.
+
+    Without ground-truth categories among the passages that pass the gate, the shortlist keeps every category.
+    """
+    if len(eval_items) == 0:
+        raise ValueError("Cannot calibrate the pre-filter on an empty evaluation set")
+    best = eval_similarities.max(axis=1)
+    allowed_misses = int(np.floor((1 - target_recall) * len(best) + 1e-9))  # 1e-9: (1 - 0.8) * 10 is 1.999...
+    threshold = float(np.sort(best)[allowed_misses])
+    passed = best >= threshold
+
+    # Rank of every ground-truth category among the passage's similarities (0 = most similar)
+    order = np.argsort(-eval_similarities, axis=1)
+    ranks = []
+    for i, item in enumerate(eval_items):
+        if not passed[i]:
+            continue
+        position = {category_names[j]: r for r, j in enumerate(order[i])}
+        ranks.extend(position[c] for c in item['ground_truth'] if c in position)
+    ranks = np.sort(np.array(ranks, dtype=int))
+    if len(ranks):
+        shortlist_size = int(ranks[min(len(ranks) - 1, int(np.ceil(target_recall * len(ranks) - 1e-9)) - 1)]) + 1
+    else:
+        shortlist_size = len(category_names)
+
+    total_categories = sum(len(item['ground_truth']) for item in eval_items)
+    kept_categories = int(np.sum(ranks < shortlist_size))
+    category_recall = kept_categories / total_categories if total_categories else 1.0
+    return {
+        'threshold': threshold,
+        'shortlist_size': shortlist_size,
+        'target_recall': target_recall,
+        'category_names': list(category_names),
+        'eval': {
+            'items': len(eval_items),
+            'items_skipped': int((~passed).sum()),
+            'gate_recall': float(passed.mean()),
+            'category_recall': category_recall,
+            'recall_lost': 1 - category_recall,
+        },
+    }
+
+
+def load_video_embeddings(embeddings_file=VIDEO_EMBEDDINGS_FILE, mapping_file=VIDEO_ID_MAPPING_FILE):
+    """Memory-map the precomputed gte-Qwen2 video embeddings and index them by video_id."""
+    embeddings = np.load(embeddings_file, mmap_mode='r')
+    with open(mapping_file, 'r') as f:
+        index = {line.strip(): idx for idx, line in enumerate(f)}
+    return embeddings, index
+
+
+def report_savings(skipped, gated, shortlisted):
+    print(f"Pre-filter: {skipped}/{gated} LLM calls saved, {shortlisted} videos sent with a reduced prompt.")
+    return skipped
+
+
+def decision_counts(decisions):
+    """(skipped, gated, shortlisted) of a `decide` result, the arguments of report_savings."""
+    skipped = sum(1 for shortlist in decisions.values() if shortlist is None)
+    return skipped, len(decisions), len(decisions) - skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the embedding pre-filter for subtopic classification.")
+    parser.add_argument('--embedding-url', default='http://127.0.0.1:8081',
+                        help="llama.cpp server with the same embedding model as the video embeddings")
+    parser.add_argument('--target-recall', type=float, default=TARGET_RECALL)
+    parser.add_argument('--eval-file', default='eval_data.json')
+    parser.add_argument('--video-embeddings', default=VIDEO_EMBEDDINGS_FILE,
+                        help="Also report how many LLM calls the calibrated gate saves on these embeddings")
+    parser.add_argument('--video-id-mapping', default=VIDEO_ID_MAPPING_FILE)
+    args = parser.parse_args()
+
+    embed = LlamaCppEmbedder(args.embedding_url)
+    category_names = list(category_terms)
+
+    # Embed the category descriptions once; the runner reuses the saved matrix without an embedding server
+    category_matrix = embed(category_descriptions(category_terms))
+    np.save(CATEGORY_EMBEDDINGS_FILE, category_matrix)
+
+    eval_items = load_eval_data(args.eval_file)
+    eval_embeddings = embed([passage_block(item) for item in eval_items])
+    eval_similarities = normalize(eval_embeddings) @ normalize(category_matrix).T
+    calibration = calibrate(eval_similarities, eval_items, category_names, args.target_recall)
+    with open(CALIBRATION_FILE, 'w', encoding='utf-8') as f:
+        json.dump(calibration, f, indent=2)
+
+    stats = calibration['eval']
+    print(f"Threshold: {calibration['threshold']:.4f}, shortlist size: {calibration['shortlist_size']}")
+    print(f"Eval: {stats['items_skipped']}/{stats['items']} passages skipped, "
+          f"category recall {stats['category_recall']:.3f} (recall lost {stats['recall_lost']:.3f})")
+
+    try:
+        embeddings, index = load_video_embeddings(args.video_embeddings, args.video_id_mapping)
+    except FileNotFoundError:
+        return
+    prefilter = SubtopicPrefilter(category_matrix, category_names,
+                                  calibration['threshold'], calibration['shortlist_size'])
+    report_savings(*decision_counts(prefilter.decide(list(index), embeddings[:len(index)])))
+
+
+if __name__ == "__main__":
+    main()
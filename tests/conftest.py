@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The scripts import their siblings directly, as when run from their own folder
+for folder in ('database', 'scrapers', 'filtering', 'sql_subtopics_classification', 'notebooks'):
+    sys.path.insert(0, os.path.join(ROOT, folder))
@@ -0,0 +1,33 @@
+import json
+import os
+import subprocess
+import sys
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'run_benchmarks.py')
+TINY = ['--videos', '300', '--embedding-dim', '16', '--latency', '0', '--sample-videos', '20', '--search-keywords', '1',
+        '--search-pages', '1', '--row-commit-rows', '50', '--training-sample', '100']
+
+
+def run_benchmarks(tmp_path, name, *extra):
+    results = tmp_path / f'{name}.json'
+    completed = subprocess.run([sys.executable, SCRIPT, *TINY, '--corpus', str(tmp_path / 'corpus'),
+                                '--results', str(results), *extra], cwd=tmp_path, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(results.read_text()), completed.stdout
+
+
+def test_tiny_run_and_compare(tmp_path):
+    results, _ = run_benchmarks(tmp_path, 'first')
+    scenarios = results['scenarios']
+    assert all(result['status'] in ('ok', 'skipped') for result in scenarios.values()), scenarios
+    assert results['corpus']['counts']['videos'] == 300
+    assert scenarios['coverage_statistics']['results_match']
+    for model in scenarios['classifier_inference']['models'].values():
+        assert model['max_probability_difference'] < 1e-5
+    # Only the given results file is written, nothing in the tree
+    assert sorted(os.listdir(tmp_path)) == ['corpus', 'first.json']
+
+    results, stdout = run_benchmarks(tmp_path, 'second', '--scenarios', 'generate', 'db_writes',
+                                     '--compare', str(tmp_path / 'first.json'))
+    assert results['scenarios']['generate']['status'] == 'skipped'  # Same parameters: the corpus is reused
+    assert 'db_writes' in stdout.split('Compared with', 1)[1]
@@ -0,0 +1,96 @@
+import json
+import sqlite3
+import threading
+
+from classify_subtopics import iter_videos, load_done_video_ids, run
+from subtopic_backends import MockBackend
+
+TERMS = {'Joins': ['INNER JOIN', 'join'], 'Indexes': ['B-tree', 'index']}
+
+
+class CountingBackend(MockBackend):
+    """MockBackend that fails for titles starting with 'fail' and counts finished requests."""
+
+    def __init__(self):
+        super().__init__(TERMS, latency=0.001)
+        self.lock = threading.Lock()
+        self.finished = 0
+
+    def classify(self, video_block, categories=None):
+        try:
+            if 'Title: fail' in video_block:
+                raise ConnectionError("server went away")
+            return super().classify(video_block, categories)
+        finally:
+            with self.lock:
+                self.finished += 1
+
+
+def read_results(path):
+    return {row['video_id']: row for row in map(json.loads, path.read_text(encoding='utf-8').splitlines())}
+
+
+def test_run_bounds_requests_in_flight(tmp_path):
+    backend = CountingBackend()
+    batch_size = 3
+    pulled = []
+
+    def videos():
+        for i in range(40):
+            # Rows are read only as fast as results come back
+            assert len(pulled) - backend.finished <= 2 * batch_size
+            pulled.append(i)
+            yield f'v{i}', 'fail' if i == 7 else f'Video {i}', 'How an INNER JOIN works' if i % 2 else 'B-tree', None
+
+    output = tmp_path / 'results.jsonl'
+    stats = run(backend, videos(), output, batch_size=batch_size)
+    assert (stats['videos'], stats['failed']) == (39, 1)
+    assert backend.prefix_cached
+    results = read_results(output)
+    assert 'v7' not in results
+    assert results['v1']['matching_categories'] == ['Joins']
+    assert results['v2']['matching_categories'] == ['Indexes']
+    assert stats['cached_tokens'] == 39 * len(backend.prompt_prefix.split())
+
+
+def test_prefilter_decisions(tmp_path):
+    output = tmp_path / 'results.jsonl'
+    rows = [('v1', 'a', 'INNER JOIN on an index', None), ('v2', 'b', 'join', None), ('v3', 'c', 'index', None)]
+    stats = run(MockBackend(TERMS), rows, output, decisions={'v1': ['Indexes'], 'v2': None})
+    assert (stats['videos'], stats['skipped'], stats['shortlisted']) == (2, 1, 1)
+    results = read_results(output)
+    assert results['v1']['matching_categories'] == ['Indexes']
+    assert results['v2']['prefilter'] == 'skipped' and results['v2']['matching_categories'] == []
+    assert results['v3']['matching_categories'] == ['Indexes']
+
+
+def test_resume_skips_classified_videos(tmp_path):
+    db_path = tmp_path / 'videos.db'
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+    CREATE TABLE videos (video_id TEXT PRIMARY KEY, title TEXT, description TEXT, predicted_label INTEGER,
+        keywords TEXT);
+    CREATE TABLE transcripts (video_id TEXT PRIMARY KEY, transcript TEXT, type TEXT, translatable TEXT);
+    INSERT INTO videos VALUES ('v1', 'SQL joins', '', 1, 'SQL tutorial');
+    INSERT INTO videos VALUES ('v2', 'SQL indexes', '', 1, 'SQL');
+    INSERT INTO videos VALUES ('v3', 'Cooking', '', 0, 'SQL');
+    INSERT INTO videos VALUES ('v4', 'Python', '', 1, 'Python');
+    INSERT INTO transcripts VALUES ('v2', 'a B-tree index', 'manual', 'true');
+    """)
+    conn.commit()
+    conn.close()
+
+    output = tmp_path / 'results.jsonl'
+    # An interrupted run left a partial last line
+    output.write_text(json.dumps({'video_id': 'v1', 'matching_categories': ['Joins']}) + '\n{"video_id": "v',
+                      encoding='utf-8')
+    done = load_done_video_ids(output)
+    assert done == {'v1'}
+    assert [row[0] for row in iter_videos(db_path, done)] == ['v2']
+    assert load_done_video_ids(tmp_path / 'missing.jsonl') == set()
+
+    run(MockBackend(TERMS), iter_videos(db_path, done), output)
+    assert load_done_video_ids(output) == {'v1', 'v2'}
+    lines = output.read_text(encoding='utf-8').splitlines()
+    assert lines[1] == '{"video_id": "v'
+    assert json.loads(lines[2])['matching_categories'] == ['Indexes']
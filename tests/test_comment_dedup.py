@@ -0,0 +1,137 @@
+import random
+import sqlite3
+
+import numpy as np
+import pytest
+
+from comment_dedup import (NUM_PERM, SHINGLE_POWERS, SHINGLE_SIZE, deduplicate, minhash_signatures, normalise,
+                           shingle_hashes, similarity)
+
+_rng = random.Random(0)
+VOCABULARY = [''.join(_rng.choices('abcdefghijklmnopqrstuvwxyz', k=_rng.randint(3, 9))) for _ in range(2000)]
+
+
+def sentence(rng, words=25):
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def naive_shingles(text):
+    """Hash of every k-byte window of one text, computed on its own."""
+    data = normalise(text).encode('utf-8')
+    data = data.ljust(SHINGLE_SIZE) if data else data
+    windows = [int(np.frombuffer(data[i:i + SHINGLE_SIZE], dtype=np.uint8).astype(np.uint64) @ SHINGLE_POWERS)
+               for i in range(len(data) - SHINGLE_SIZE + 1)]
+    return [(w * 0x9E3779B97F4A7C15 % 2 ** 64) >> 32 for w in windows]
+
+
+def test_normalise():
+    assert normalise("Thanks!!  Check https://example.com/x?a=1 NOW") == 'thanks check url now'
+    assert normalise(None) == ''
+
+
+def test_shingle_hashes_match_per_text_shingling():
+    texts = ['great video, thanks', 'ok', '', None, 'héllo wörld 👍', 'the same the same the same']
+    hashes, owner = shingle_hashes(texts)
+    for index, text in enumerate(texts):
+        assert hashes[owner == index].tolist() == naive_shingles(text)
+
+
+def test_signature_similarity_estimates_jaccard():
+    rng = random.Random(0)
+    texts = []
+    for _ in range(20):
+        base = sentence(rng)
+        texts += [base, base + ' ' + sentence(rng, 4), sentence(rng)]
+    hashes, owner = shingle_hashes(texts)
+    signatures, has_shingles = minhash_signatures(hashes, owner, len(texts))
+    assert has_shingles.all() and signatures.shape == (len(texts), NUM_PERM)
+    for i in range(0, len(texts), 3):
+        for j in (i + 1, i + 2):
+            left, right = set(naive_shingles(texts[i])), set(naive_shingles(texts[j]))
+            jaccard = len(left & right) / len(left | right)
+            # Standard error of a 128-permutation estimate is at most 0.044
+            assert abs(similarity(signatures[i][None], signatures[j][None])[0] - jaccard) < 0.15
+
+
+@pytest.fixture
+def corpus():
+    """comments and replies tables with groups of near-duplicates (as (source, record_id) lists) and the ids
+    of unrelated comments."""
+    rng = random.Random(1)
+    conn = sqlite3.connect(':memory:')
+    conn.executescript("""
+    CREATE TABLE comments (thread_id TEXT PRIMARY KEY, video_id TEXT NOT NULL, top_level_text TEXT,
+        top_level_like_count INTEGER, top_level_published_at TEXT, top_level_updated_at TEXT,
+        total_reply_count INTEGER);
+    CREATE TABLE replies (reply_id TEXT PRIMARY KEY, thread_id TEXT NOT NULL, video_id TEXT NOT NULL,
+        reply_text TEXT, reply_like_count INTEGER, reply_published_at TEXT, reply_updated_at TEXT);
+    """)
+    groups = []
+    comments = []
+    replies = []
+    for group in range(10):
+        base = sentence(rng)
+        variants = [base, base.upper() + '!!!', base.replace(' ', ', ', 3) + ' https://spam.example/' + str(group),
+                    base + ' ' + rng.choice(VOCABULARY)]
+        ids = []
+        for index, text in enumerate(variants):
+            if index % 2:
+                replies.append((f'r{group}_{index}', f't{group}_0', f'v{index}', text))
+                ids.append(('replies', f'r{group}_{index}'))
+            else:
+                comments.append((f't{group}_{index}', f'v{index}', text))
+                ids.append(('comments', f't{group}_{index}'))
+        groups.append(ids)
+    unrelated = [f't_unique{i}' for i in range(30)]
+    comments += [(thread_id, 'v9', sentence(rng)) for thread_id in unrelated]
+    comments += [('t_empty', 'v9', ''), ('t_null', 'v9', None)]
+    rng.shuffle(comments)
+    conn.executemany("INSERT INTO comments VALUES (?, ?, ?, 0, '', '', 0)", comments)
+    conn.executemany("INSERT INTO replies VALUES (?, ?, ?, ?, 0, '', '')", replies)
+    conn.commit()
+    yield conn, groups, unrelated + ['t_empty', 't_null']
+    conn.close()
+
+
+def labels(conn):
+    rows = conn.execute("SELECT 'comments', thread_id, duplicate_cluster FROM comments UNION ALL "
+                        "SELECT 'replies', reply_id, duplicate_cluster FROM replies")
+    return {(source, record_id): cluster for source, record_id, cluster in rows}
+
+
+def check_clusters(conn, groups, unrelated):
+    """Each group is one cluster of its own, in the source tables and in comment_minhash; the rest are unlabelled."""
+    assigned = labels(conn)
+    clusters = [{assigned[member] for member in group} for group in groups]
+    assert all(len(cluster) == 1 and None not in cluster for cluster in clusters)
+    assert len(set.union(*clusters)) == len(groups)
+    assert all(assigned['comments', thread_id] is None for thread_id in unrelated)
+    stored = {(source, record_id): cluster_id for source, record_id, cluster_id in
+              conn.execute("SELECT source, record_id, cluster_id FROM comment_minhash")}
+    for group in groups:
+        assert {stored[member] for member in group} == {assigned[group[0]]}
+
+
+@pytest.mark.parametrize('chunk_size', [1000, 7])
+def test_deduplicate_clusters_near_duplicates(corpus, chunk_size):
+    conn, groups, unrelated = corpus
+    assert deduplicate(conn, chunk_size=chunk_size) == 4 * len(groups) + len(unrelated)
+    check_clusters(conn, groups, unrelated)
+
+
+def test_deduplicate_is_incremental(corpus):
+    conn, groups, unrelated = corpus
+    conn.execute("DELETE FROM replies")
+    deduplicate(conn)
+    assert deduplicate(conn) == 0
+    # Replies added later join the clusters stored by the first run
+    rng = random.Random(1)
+    replies = []
+    for group in groups:
+        text = conn.execute("SELECT top_level_text FROM comments WHERE thread_id = ?", (group[0][1],)).fetchone()[0]
+        for source, record_id in group:
+            if source == 'replies':
+                replies.append((record_id, group[0][1], 'v1', text + ' ' + rng.choice(VOCABULARY)))
+    conn.executemany("INSERT INTO replies (reply_id, thread_id, video_id, reply_text) VALUES (?, ?, ?, ?)", replies)
+    assert deduplicate(conn) == len(replies)
+    check_clusters(conn, groups, unrelated)
@@ -0,0 +1,156 @@
+import random
+import sqlite3
+
+import pytest
+
+zstandard = pytest.importorskip('zstandard')
+
+from compressed_text import CompressedTextStore, clean_transcript, compress_source, import_punctuated
+
+WORDS = ['data', 'science', 'model', 'regression', 'python', 'pandas', 'gradient', 'descent', 'neural', 'network',
+         'feature', 'matrix', 'vector', 'probability', 'bayes', 'cluster', 'tree', 'forest', 'loss', 'train']
+
+
+def text(rng, words=60):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """Database with the scrapers' transcripts, comments and replies tables and varied text."""
+    rng = random.Random(0)
+    conn = sqlite3.connect(tmp_path / 'videos.db')
+    conn.executescript("""
+    CREATE TABLE transcripts (video_id TEXT PRIMARY KEY, transcript TEXT, type TEXT, translatable TEXT);
+    CREATE TABLE comments (thread_id TEXT PRIMARY KEY, video_id TEXT NOT NULL, top_level_text TEXT,
+        top_level_like_count INTEGER, top_level_published_at TEXT, top_level_updated_at TEXT,
+        total_reply_count INTEGER);
+    CREATE TABLE replies (reply_id TEXT PRIMARY KEY, thread_id TEXT NOT NULL, video_id TEXT NOT NULL,
+        reply_text TEXT, reply_like_count INTEGER, reply_published_at TEXT, reply_updated_at TEXT);
+    """)
+    conn.executemany("INSERT INTO transcripts VALUES (?, ?, 'manual', 'true')",
+                     [(f'v{i}', f'[Music] {text(rng, 200)} ünïcødé ✓') for i in range(300)])
+    conn.execute("INSERT INTO transcripts VALUES ('v_empty', NULL, 'manual', 'false')")
+    conn.executemany("INSERT INTO comments VALUES (?, ?, ?, 1, '2024-01-01', '2024-01-01', 1)",
+                     [(f't{i}', f'v{i % 300}', text(rng, 30)) for i in range(500)])
+    conn.executemany("INSERT INTO replies VALUES (?, ?, ?, ?, 0, '2024-01-02', '2024-01-02')",
+                     [(f'r{i}', f't{i}', f'v{i % 300}', text(rng, 20)) for i in range(200)])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_put_get_round_trip(conn):
+    store = CompressedTextStore(conn)
+    store.train('transcripts', [row[0] for row in conn.execute("SELECT transcript FROM transcripts")], 4096)
+    original = conn.execute("SELECT transcript FROM transcripts WHERE video_id = 'v1'").fetchone()[0]
+    store.put('transcripts', 'v1', original)
+    store.put('transcripts', 'v1', clean_transcript(original), variant='cleaned')
+    assert store.get('transcripts', 'v1') == original
+    assert store.get('transcripts', 'v1', variant='cleaned') == clean_transcript(original)
+    assert store.get('transcripts', 'v1', variant='punctuated') is None
+    assert store.get('transcripts', 'missing') is None
+
+
+def test_untrainable_source_falls_back_to_plain_zstd(conn):
+    store = CompressedTextStore(conn)
+    store.train('replies', ['too few samples'])
+    assert store.dictionaries[store.latest['replies']] is None
+    store.put('replies', 'r1', 'short reply')
+    assert store.get('replies', 'r1') == 'short reply'
+
+
+def test_compress_source_drop_plain_keeps_views_identical(conn):
+    expected = {source: conn.execute(query).fetchall() for source, query in {
+        'transcripts': "SELECT video_id, transcript, type, translatable FROM transcripts ORDER BY video_id",
+        'comments': "SELECT * FROM comments ORDER BY thread_id",
+        'replies': "SELECT * FROM replies ORDER BY reply_id",
+    }.items()}
+    store = CompressedTextStore(conn)
+    assert compress_source(store, 'transcripts', drop_plain=True) == 300
+    assert compress_source(store, 'comments', drop_plain=True) == 500
+    assert compress_source(store, 'replies') == 200
+    assert conn.execute("SELECT COUNT(*) FROM transcripts WHERE transcript IS NOT NULL").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM replies WHERE reply_text IS NOT NULL").fetchone()[0] == 200
+
+    # A fresh connection reloads the dictionaries from the database
+    reopened = CompressedTextStore(sqlite3.connect(conn.execute("PRAGMA database_list").fetchone()[2]))
+    reopened.create_views()
+    views = {
+        'transcripts': "SELECT video_id, transcript, type, translatable FROM transcripts_text ORDER BY video_id",
+        'comments': "SELECT * FROM comments_text ORDER BY thread_id",
+        'replies': "SELECT * FROM replies_text ORDER BY reply_id",
+    }
+    for source, query in views.items():
+        assert reopened.conn.execute(query).fetchall() == expected[source]
+    assert dict(reopened.iter_variant('replies')) == {row[0]: row[3] for row in expected['replies']}
+    reopened.conn.close()
+
+
+def test_compress_source_is_incremental(conn):
+    store = CompressedTextStore(conn)
+    assert compress_source(store, 'comments') == 500
+    conn.execute("INSERT INTO comments VALUES ('t_new', 'v1', 'a new comment', 0, '2024-02-01', '2024-02-01', 0)")
+    assert compress_source(store, 'comments') == 1
+    assert compress_source(store, 'comments') == 0
+    assert conn.execute("SELECT COUNT(*) FROM zstd_dictionaries WHERE source = 'comments'").fetchone()[0] == 1
+    assert store.get('comments', 't_new') == 'a new comment'
+
+
+def test_import_punctuated_variants(conn, tmp_path):
+    punctuated = sqlite3.connect(tmp_path / 'punctuated.db')
+    punctuated.execute("CREATE TABLE transcripts (video_id TEXT PRIMARY KEY, punctuated_transcript TEXT)")
+    punctuated.executemany("INSERT INTO transcripts VALUES (?, ?)",
+                           [('v1', '[Music] Hello,  world.'), ('v2', None)])
+    punctuated.commit()
+    punctuated.close()
+
+    store = CompressedTextStore(conn)
+    compress_source(store, 'transcripts')
+    assert import_punctuated(store, tmp_path / 'punctuated.db') == 1
+    store.create_views()
+    rows = {video_id: (punctuated_text, clean) for video_id, punctuated_text, clean in conn.execute(
+        "SELECT video_id, punctuated_transcript, clean_transcript FROM transcripts_text")}
+    assert rows['v1'] == ('[Music] Hello,  world.', 'Hello, world.')
+    assert rows['v2'] == (None, None)
+
+
+def test_identical_texts_share_one_blob(conn):
+    store = CompressedTextStore(conn)
+    conn.executemany("INSERT INTO comments VALUES (?, 'v1', 'First!', 0, '', '', 0)", [(f'dup{i}',) for i in range(5)])
+    compress_source(store, 'comments')
+    assert conn.execute("SELECT COUNT(*) FROM text_records WHERE source = 'comments'").fetchone()[0] == 505
+    assert conn.execute("SELECT COUNT(DISTINCT blob_id) FROM text_records WHERE record_id LIKE 'dup%'").fetchone()[0] == 1
+
+    # Replacing one copy keeps the shared blob for the others; the old text of a replaced record is pruned
+    store.put('comments', 'dup0', 'Second!')
+    store.put('comments', 't1', 'edited comment')
+    assert store.get('comments', 'dup1') == 'First!' and store.get('comments', 'dup0') == 'Second!'
+    assert store.prune() == 1
+    assert store.get('comments', 't1') == 'edited comment'
+
+
+def test_store_without_shared_blobs_is_migrated(conn):
+    """Stores written with one blob per record in text_variants move to text_blobs on open, duplicates merged."""
+    compressor = zstandard.ZstdCompressor()
+    conn.executescript("""
+    CREATE TABLE zstd_dictionaries (dict_id INTEGER PRIMARY KEY, source TEXT NOT NULL, dictionary BLOB NOT NULL,
+        created_at TEXT);
+    INSERT INTO zstd_dictionaries VALUES (1, 'replies', x'', '');
+    CREATE TABLE text_variants (source TEXT NOT NULL, record_id TEXT NOT NULL, variant TEXT NOT NULL,
+        dict_id INTEGER REFERENCES zstd_dictionaries(dict_id), data BLOB, PRIMARY KEY (source, record_id, variant))
+        WITHOUT ROWID;
+    CREATE VIEW reply_search AS SELECT record_id, data FROM text_variants WHERE source = 'replies';
+    """)
+    conn.executemany("INSERT INTO text_variants VALUES ('replies', ?, 'raw', 1, ?)",
+                     [(f'r{i}', compressor.compress(('same reply' if i < 3 else f'reply {i}').encode('utf-8')))
+                      for i in range(5)])
+    conn.commit()
+
+    store = CompressedTextStore(conn)
+    assert conn.execute("SELECT type FROM sqlite_master WHERE name = 'text_variants'").fetchone()[0] == 'view'
+    assert conn.execute("SELECT COUNT(*) FROM text_blobs").fetchone()[0] == 3
+    assert dict(store.iter_variant('replies')) == {f'r{i}': 'same reply' if i < 3 else f'reply {i}' for i in range(5)}
+    # Views over the old table read the new layout
+    assert conn.execute("SELECT COUNT(*) FROM reply_search").fetchone()[0] == 5
+    assert compress_source(store, 'replies') == 195
@@ -0,0 +1,109 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from detect_language import ROUTING_CONFIDENCE, classify_text, create_tables, detect_batch, load_languages, \
+    metadata_language
+
+pytest.importorskip('youtube_transcript_api')
+
+from scrape_transcripts import routed_language
+from supplement_transcripts import migrate_transcript_types, select_transcript
+
+
+@pytest.mark.parametrize('text, language', [
+    ('Привет мир база данных', 'ru'),
+    ('Привіт їжак', 'uk'),
+    ('SQL チュートリアル', 'ja'),
+    ('数据库教程', 'zh'),
+    ('데이터베이스 강의', 'ko'),
+    ('SQL στα ελληνικά', 'el'),
+])
+def test_classify_text_by_script(text, language):
+    assert classify_text(text) == (language, 1.0)
+
+
+def test_classify_text_by_stopwords():
+    assert classify_text('Curso de SQL desde cero para principiantes') == ('es', 0.875)
+    assert classify_text('SQL tutorial for beginners') == ('en', 0.75)
+    # Few matches are discounted, and a tie between languages halves the share
+    assert classify_text('the der') == ('en', 0.25)
+
+
+@pytest.mark.parametrize('text', ['PostgreSQL 16 JOIN', '1234 !!', ''])
+def test_classify_text_without_evidence(text):
+    assert classify_text(text) == ('und', 0.0)
+
+
+def test_metadata_language():
+    assert metadata_language('en-US', 'de') == 'en'
+    assert metadata_language('N/A', 'pt-BR') == 'pt'
+    assert metadata_language('zxx', 'und') is None
+    assert metadata_language('N/A', None) is None
+
+
+def test_detect_batch_prefers_metadata():
+    rows = [
+        ('v1', 'Привет мир база данных', 'N/A', 'de-DE', 'N/A'),
+        ('v2', 'Привет мир база данных', 'N/A', 'N/A', 'N/A'),
+        ('v3', 'SQL', None, 'N/A', 'N/A'),
+    ]
+    results = {video_id: rest for video_id, *rest in detect_batch(rows, use_langid=False)}
+    assert results['v1'][:3] == ['de', 1.0, 'metadata']
+    assert results['v2'][:3] == ['ru', 1.0, 'builtin']
+    assert results['v3'][:3] == ['und', 0.0, 'builtin']
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    yield conn
+    conn.close()
+
+
+def test_routing_uses_confident_detections_only(conn):
+    assert load_languages(conn) == {}
+    create_tables(conn.cursor())
+    conn.executemany("INSERT INTO video_languages VALUES (?, ?, ?, ?, '')", [
+        ('v_ru', 'ru', 1.0, 'metadata'),
+        ('v_es', 'es', ROUTING_CONFIDENCE, 'builtin'),
+        ('v_unsure', 'fr', ROUTING_CONFIDENCE - 0.01, 'builtin'),
+        ('v_und', 'und', 1.0, 'builtin'),
+        ('v_en', 'en', 0.9, 'builtin'),
+    ])
+    languages = load_languages(conn)
+    assert languages == {'v_ru': 'ru', 'v_es': 'es', 'v_en': 'en'}
+    assert load_languages(conn, min_confidence=0.9) == {'v_ru': 'ru', 'v_en': 'en'}
+    # scrape_transcripts.py looks up an English track for everything but confident non-English detections
+    assert [routed_language(languages, video_id) for video_id in ('v_ru', 'v_es', 'v_unsure', 'v_und', 'v_en',
+                                                                  'v_missing')] == ['ru', 'es', 'en', 'en', 'en', 'en']
+
+
+def track(language_code, is_generated):
+    return SimpleNamespace(language_code=language_code, is_generated=is_generated)
+
+
+def test_select_transcript_order():
+    auto_en, auto_de, manual_de, manual_fr = track('en', True), track('de', True), track('de', False), track('fr', False)
+    assert select_transcript([auto_en, manual_fr, manual_de], 'de') is manual_de
+    assert select_transcript([manual_fr, manual_de, track('en', False)], 'de').language_code == 'en'
+    assert select_transcript([manual_fr, manual_de], None) is manual_fr
+    assert select_transcript([auto_de, auto_en], 'de') is auto_en
+    assert select_transcript([track('es', True), auto_de], 'de') is auto_de
+    assert select_transcript([], 'de') is None
+
+
+def test_migrate_transcript_types(conn):
+    conn.execute("CREATE TABLE transcripts (video_id TEXT PRIMARY KEY, transcript TEXT, type TEXT, translatable TEXT)")
+    conn.executemany("INSERT INTO transcripts VALUES (?, '', ?, 'true')", [
+        ('v1', 'manual-created (Translated from English)'),
+        ('v2', 'auto-generated (Translated from English (auto-generated))'),
+        ('v3', 'manual-created (Translated from German)'),
+        ('v4', 'creator-uploaded'),
+    ])
+    assert migrate_transcript_types(conn) == 2
+    assert migrate_transcript_types(conn) == 0
+    assert dict(conn.execute("SELECT video_id, type FROM transcripts")) == {
+        'v1': 'manual-created', 'v2': 'auto-generated', 'v3': 'manual-created (Translated from German)',
+        'v4': 'creator-uploaded'}
@@ -0,0 +1,67 @@
+import sqlite3
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from discover_uploads import (CHANNELS_QUERY, create_candidates_table, insert_candidates, list_playlist_video_ids,
+                              load_known_video_ids)
+
+
+class FakeClients:
+    """YouTubeClients stand-in serving playlistItems.list pages keyed by page token."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def execute(self, api_operation, **kwargs):
+        self.calls.append((api_operation, kwargs['playlistId'], kwargs['pageToken']))
+        page = self.pages[kwargs['pageToken']]
+        if isinstance(page, Exception):
+            raise page
+        return page
+
+
+def page(video_ids, next_token=None):
+    response = {'items': [{'contentDetails': {'videoId': video_id}} for video_id in video_ids]}
+    if next_token:
+        response['nextPageToken'] = next_token
+    return response
+
+
+def test_playlist_pages_and_resume():
+    clients = FakeClients({None: page(['a', 'b'], 'P2'), 'P2': page(['c'], 'P3'), 'P3': page([])})
+    assert list(list_playlist_video_ids(clients, 'UU1')) == [(['a', 'b'], 'P2'), (['c'], 'P3'), ([], None)]
+    assert [call[2] for call in clients.calls] == [None, 'P2', 'P3']
+    # A saved page token resumes in the middle of the playlist
+    assert list(list_playlist_video_ids(clients, 'UU1', 'P3')) == [([], None)]
+
+
+def test_missing_playlist_is_skipped():
+    not_found = HttpError(httplib2.Response({'status': 404}), b'{"error": {"code": 404}}')
+    assert list(list_playlist_video_ids(FakeClients({None: not_found}), 'UU_deleted')) == []
+    server_error = HttpError(httplib2.Response({'status': 500}), b'{"error": {"code": 500}}')
+    with pytest.raises(HttpError):
+        list(list_playlist_video_ids(FakeClients({None: page(['a'], 'P2'), 'P2': server_error}), 'UU1'))
+
+
+def test_channels_and_candidates():
+    conn = sqlite3.connect(':memory:')
+    cursor = conn.cursor()
+    cursor.executescript("""
+    CREATE TABLE videos (video_id TEXT PRIMARY KEY, channel_id TEXT, predicted_label INTEGER);
+    CREATE TABLE channels (channel_id TEXT PRIMARY KEY, uploads_playlist TEXT);
+    INSERT INTO channels VALUES ('c1', 'UU1'), ('c2', 'UU2'), ('c3', NULL), ('c4', 'UU4');
+    INSERT INTO videos VALUES ('v1', 'c1', 1), ('v2', 'c2', 1), ('v3', 'c2', 1), ('v4', 'c3', 1), ('v5', 'c4', 0);
+    """)
+    # Channels without relevant videos or without an uploads playlist are not listed
+    assert cursor.execute(CHANNELS_QUERY).fetchall() == [('c2', 'UU2', 2), ('c1', 'UU1', 1)]
+
+    create_candidates_table(cursor)
+    insert_candidates(cursor, [])
+    insert_candidates(cursor, [{'video_id': 'n1', 'title': 'New', 'channel_id': 'c2'},
+                               {'video_id': 'n1', 'title': 'Duplicate', 'channel_id': 'c2'}])
+    assert cursor.execute("SELECT video_id, title FROM discovered_videos").fetchall() == [('n1', 'New')]
+    assert load_known_video_ids(cursor) == {'v1', 'v2', 'v3', 'v4', 'v5', 'n1'}
+    conn.close()
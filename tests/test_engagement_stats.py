@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from engagement_stats import _SortedColumn, _build_groups, _group_correlations, spearman_table
+
+FEATURES = ['duration', 'tags', 'constant', 'sparse']
+TARGETS = ['views', 'likes']
+
+
+@pytest.fixture(scope='module')
+def df():
+    """Skewed columns with ties (rounded values), different missing rows per column and a constant column."""
+    rng = np.random.default_rng(0)
+    n = 400
+    duration = rng.lognormal(2, 1, n)
+    df = pd.DataFrame({
+        'duration': duration,
+        'tags': rng.integers(0, 8, n).astype(float),
+        'constant': np.ones(n),
+        'sparse': np.where(rng.random(n) < 0.7, np.nan, rng.normal(size=n)),
+        'views': np.round(duration * rng.lognormal(0, 0.5, n)),
+        'likes': rng.lognormal(0, 1, n),
+    })
+    df.loc[rng.choice(n, 40, replace=False), 'views'] = np.nan
+    df.loc[rng.choice(n, 25, replace=False), 'duration'] = np.nan
+    return df
+
+
+def test_matches_scipy_spearmanr(df):
+    table = spearman_table(df, FEATURES, TARGETS, n_bootstrap=50, n_permutations=50, workers=1)
+    assert list(zip(table['target'], table['feature'])) == [(t, f) for t in TARGETS for f in FEATURES]
+    for row in table.itertuples():
+        pair = df[[row.feature, row.target]].dropna()
+        assert row.n == len(pair)
+        if row.feature == 'constant':
+            assert np.isnan(row.correlation) and np.isnan(row.ci_low)
+            continue
+        expected = stats.spearmanr(pair[row.feature], pair[row.target])
+        assert row.correlation == pytest.approx(expected.statistic, abs=1e-10)
+        assert row.p_value == pytest.approx(expected.pvalue, rel=1e-8, abs=1e-300)
+        assert row.ci_low <= row.correlation <= row.ci_high
+        assert 0 < row.perm_p_value <= 1
+
+
+def test_weighted_ranks_match_repeated_rows(df):
+    """A bootstrap resample is a vector of row weights; ranks must equal those of the rows actually repeated."""
+    values = df['tags'].to_numpy()
+    valid = np.ones(len(values), dtype=bool)
+    column = _SortedColumn(values, np.argsort(values, kind='stable'), valid)
+    weights = np.random.default_rng(1).multinomial(len(values), np.full(len(values), 1 / len(values)), size=3)
+    ranks = column.ranks(weights)
+    for resample, w in zip(ranks, weights):
+        repeated = stats.rankdata(np.repeat(values, w))
+        first_copy = np.cumsum(w) - w
+        drawn = w > 0
+        assert np.array_equal(resample[drawn], repeated[first_copy[drawn]])
+
+
+def test_bootstrap_resample_matches_spearmanr_on_drawn_rows(df):
+    groups = _build_groups(df, ['tags', 'duration'], ['views'])
+    group = next(g for g in groups.values() if [f for _, _, f, _ in g['pairs']] == ['tags'])
+    pair = df[['tags', 'views']].dropna().to_numpy()
+    weights = np.random.default_rng(2).multinomial(group['n'], np.full(group['n'], 1 / group['n']), size=2)
+    correlations = _group_correlations(group, weights)
+    for resample, w in zip(correlations, weights):
+        drawn = np.repeat(pair, w, axis=0)
+        assert resample[0, 0] == pytest.approx(stats.spearmanr(drawn[:, 0], drawn[:, 1]).statistic, abs=1e-6)
+
+
+def test_results_do_not_depend_on_workers(df):
+    serial = spearman_table(df, FEATURES[:2], TARGETS, n_bootstrap=60, n_permutations=60, workers=1, chunk_size=7)
+    parallel = spearman_table(df, FEATURES[:2], TARGETS, n_bootstrap=60, n_permutations=60, workers=2, chunk_size=7)
+    pd.testing.assert_frame_equal(serial, parallel)
@@ -0,0 +1,37 @@
+import pytest
+
+from evaluate_subtopic_classifiers import RecordedBackend, cost_summary, evaluate, per_category_scores
+
+ITEMS = [
+    {'id': 1, 'passage': 'The degree of a relation.', 'ground_truth': ['Arity'], 'recorded': ['Arity']},
+    {'id': 2, 'passage': 'COUNT(*) per degree.', 'ground_truth': ['Aggregate Functions', 'Arity'],
+     'recorded': ['Aggregate Functions', 'Not A Category']},
+    {'id': 3, 'passage': 'Backing up a database.', 'ground_truth': [], 'recorded': ['Arity']},
+]
+
+
+def test_per_category_scores():
+    scores, summary = per_category_scores(ITEMS, [{'matching_categories': item['recorded']} for item in ITEMS])
+    assert scores['Arity'] == {'precision': 0.5, 'recall': 0.5, 'f1': 0.5, 'support': 2}
+    assert scores['Aggregate Functions'] == {'precision': 1.0, 'recall': 1.0, 'f1': 1.0, 'support': 1}
+    assert scores['Not A Category'] == {'precision': 0.0, 'recall': 0.0, 'f1': 0.0, 'support': 0}
+    # tp 2, fp 2, fn 1
+    assert summary['micro']['precision'] == 0.5 and summary['micro']['recall'] == pytest.approx(2 / 3)
+    assert summary['macro']['f1'] == pytest.approx(0.5)
+    assert summary['invalid_labels'] == 1
+
+
+def test_cost_summary():
+    results = [{'latency': latency, 'prompt_tokens': 100, 'cached_tokens': 80, 'completion_tokens': 5}
+               for latency in (0.1, 0.2, 0.3, 0.4)]
+    cost = cost_summary(results, elapsed=2.0)
+    assert (cost['latency_p50'], cost['latency_p95'], cost['throughput']) == (0.3, 0.4, 2.0)
+    assert (cost['prompt_tokens_per_item'], cost['uncached_prompt_tokens_per_item'],
+            cost['completion_tokens_per_item']) == (100, 20, 5)
+
+
+def test_evaluate_recorded_predictions():
+    report = evaluate([RecordedBackend('recorded')], ITEMS, workers=2)['recorded']
+    assert report['predictions'] == {item['id']: item['recorded'] for item in ITEMS}
+    assert report['summary']['micro']['f1'] == pytest.approx(4 / 7)
+    assert report['cost']['prompt_tokens_per_item'] == 0
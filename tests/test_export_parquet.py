@@ -0,0 +1,126 @@
+import os
+import sqlite3
+
+import pyarrow.dataset as ds
+import pytest
+
+from export_parquet import (MANIFEST_FILE, NULL_PARTITION, export_table, load_manifest, read_table,
+                            register_functions, video_bucket)
+
+BUCKETS = 4
+
+
+@pytest.fixture
+def conn():
+    """videos and comments as the scrapers store them: counts as TEXT with 'N/A' for hidden ones."""
+    conn = sqlite3.connect(':memory:')
+    conn.executescript("""
+    CREATE TABLE videos (video_id TEXT PRIMARY KEY, title TEXT, published_at TEXT, view_count TEXT,
+        like_count TEXT, predicted_label INTEGER);
+    CREATE TABLE comments (thread_id TEXT PRIMARY KEY, video_id TEXT NOT NULL, top_level_text TEXT,
+        top_level_like_count INTEGER, top_level_published_at TEXT, top_level_updated_at TEXT,
+        total_reply_count INTEGER);
+    """)
+    conn.executemany("INSERT INTO videos VALUES (?, ?, ?, ?, ?, ?)", [
+        (f'v{i}', f'Video {i}', f'{2018 + i % 3}-0{1 + i % 9}-15T10:00:00Z', str(i * 100),
+         'N/A' if i % 5 == 0 else str(i), i % 2) for i in range(60)
+    ] + [('v_undated', 'No date', 'N/A', 'N/A', 'N/A', None)])
+    conn.executemany("INSERT INTO comments VALUES (?, ?, ?, ?, '2024-01-01T00:00:00Z', '2024-01-01T00:00:00Z', 0)",
+                     [(f't{i}', f'v{i % 60}', f'comment {i}', i) for i in range(300)])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def export(conn, out_dir, table, buckets=BUCKETS, full=False):
+    """export_parquet.py's main() for one table: ((written, unchanged, rows), partitions in the manifest)."""
+    register_functions(conn, buckets)
+    manifest = load_manifest(out_dir)
+    result = export_table(conn, out_dir, table, manifest, full, buckets)
+    return result, manifest['tables'][table]['partitions']
+
+
+def mtimes(out_dir, partitions):
+    return {key: os.stat(os.path.join(out_dir, entry['path'])).st_mtime_ns for key, entry in partitions.items()}
+
+
+def test_rerun_without_changes_writes_nothing(conn, tmp_path):
+    (written, unchanged, rows), partitions = export(conn, tmp_path, 'videos')
+    assert (written, unchanged, rows) == (4, 0, 61)
+    assert set(partitions) == {'2018', '2019', '2020', NULL_PARTITION}
+    assert (tmp_path / MANIFEST_FILE).exists()
+    before = mtimes(tmp_path, partitions)
+
+    (written, unchanged, rows), partitions = export(conn, tmp_path, 'videos')
+    assert (written, unchanged, rows) == (0, 4, 0)
+    assert mtimes(tmp_path, partitions) == before
+
+
+def test_changed_row_rewrites_only_its_partition(conn, tmp_path):
+    _, partitions = export(conn, tmp_path, 'comments')
+    assert set(partitions) == {str(bucket) for bucket in range(BUCKETS)}
+    before = mtimes(tmp_path, partitions)
+
+    conn.execute("UPDATE comments SET top_level_like_count = 999 WHERE thread_id = 't7'")
+    (written, unchanged, rows), partitions = export(conn, tmp_path, 'comments')
+    bucket = str(video_bucket('v7', BUCKETS))
+    assert (written, unchanged) == (1, BUCKETS - 1)
+    assert rows == partitions[bucket]['rows']
+    after = mtimes(tmp_path, partitions)
+    assert [key for key in after if after[key] != before[key]] == [bucket]
+    assert read_table('comments', ['top_level_like_count'], ds.field('thread_id') == 't7',
+                      export_dir=tmp_path)['top_level_like_count'].tolist() == [999]
+
+
+def test_emptied_partition_is_removed(conn, tmp_path):
+    export(conn, tmp_path, 'videos')
+    conn.execute("DELETE FROM videos WHERE published_at LIKE '2019%'")
+    (written, unchanged, rows), partitions = export(conn, tmp_path, 'videos')
+    assert (written, unchanged, rows) == (0, 3, 0)
+    assert '2019' not in partitions
+    assert not (tmp_path / 'videos' / 'published_year=2019').exists()
+    assert len(read_table('videos', export_dir=tmp_path)) == 41
+
+
+def test_schema_or_bucket_change_rewrites_table(conn, tmp_path):
+    export(conn, tmp_path, 'comments')
+    assert export(conn, tmp_path, 'comments', buckets=8)[0][0] == 8
+    conn.execute("ALTER TABLE comments ADD COLUMN language TEXT")
+    (written, unchanged, rows), _ = export(conn, tmp_path, 'comments', buckets=8)
+    assert (written, unchanged, rows) == (8, 0, 300)
+    assert export(conn, tmp_path, 'comments', buckets=8, full=True)[0] == (8, 0, 300)
+    # Partitions of the old bucket count are gone, so no row is read twice
+    assert len(read_table('comments', ['thread_id'], export_dir=tmp_path)) == 300
+
+
+def test_read_table_types_and_filters(conn, tmp_path):
+    export(conn, tmp_path, 'videos')
+    df = read_table('videos', ['video_id', 'like_count', 'published_at', 'published_year'],
+                    ds.field('published_year') == 2019, export_dir=tmp_path)
+    assert sorted(df['video_id']) == sorted(f'v{i}' for i in range(60) if i % 3 == 1)
+    assert df.set_index('video_id')['like_count'].isna().to_dict() == {
+        f'v{i}': i % 5 == 0 for i in range(60) if i % 3 == 1}
+    assert (df['published_at'].dt.year == 2019).all()
+
+    undated = read_table('videos', filter=ds.field('published_year').is_null(), export_dir=tmp_path)
+    assert undated['video_id'].tolist() == ['v_undated']
+    assert undated[['published_at', 'view_count', 'like_count', 'predicted_label']].isna().all(axis=None)
+
+    # Each partition file is sorted by published_at
+    for path in (tmp_path / 'videos').glob('*/part-0.parquet'):
+        published = ds.dataset(path).to_table(columns=['published_at']).column(0).to_pylist()
+        assert published == sorted(published)
+
+
+def test_local_run_times_export_without_time_zone(conn, tmp_path):
+    conn.executescript("""
+    CREATE TABLE video_languages (video_id TEXT PRIMARY KEY, language TEXT, confidence REAL, method TEXT,
+        detected_at TEXT);
+    INSERT INTO video_languages VALUES ('v1', 'en', 1.0, 'metadata', '2024-03-31 02:30:00');
+    """)
+    export(conn, tmp_path, 'video_languages')
+    export(conn, tmp_path, 'videos')
+    detected_at = read_table('video_languages', export_dir=tmp_path)['detected_at']
+    assert detected_at.dt.tz is None and str(detected_at[0]) == '2024-03-31 02:30:00'
+    published_at = read_table('videos', ['published_at'], export_dir=tmp_path)['published_at']
+    assert str(published_at.dt.tz) == 'UTC'
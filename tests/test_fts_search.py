@@ -0,0 +1,95 @@
+import sqlite3
+
+import pytest
+
+from fts_search import build_indexes, open_index, search, stored_content
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Database with the scrapers' videos, transcripts and comments tables."""
+    path = tmp_path / 'videos.db'
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+    CREATE TABLE videos (video_id TEXT PRIMARY KEY, title TEXT, description TEXT, channel_id TEXT,
+        channel_title TEXT, predicted_label INTEGER);
+    CREATE TABLE transcripts (video_id TEXT PRIMARY KEY, transcript TEXT, type TEXT, translatable TEXT);
+    CREATE TABLE comments (thread_id TEXT PRIMARY KEY, video_id TEXT NOT NULL, top_level_text TEXT,
+        top_level_like_count INTEGER, top_level_published_at TEXT, top_level_updated_at TEXT,
+        total_reply_count INTEGER);
+    INSERT INTO videos VALUES ('v1', 'SQL joins explained', 'Inner and outer joins', 'c1', 'Data Channel', 1);
+    INSERT INTO videos VALUES ('v2', 'Cooking pasta', 'A quick dinner', 'c2', 'Food Channel', 0);
+    INSERT INTO transcripts VALUES ('v1', 'today we write correlated subqueries in postgres', 'manual', 'true');
+    INSERT INTO transcripts VALUES ('v2', 'boil the water and add salt', 'manual', 'true');
+    INSERT INTO comments VALUES ('t1', 'v1', 'great explanation of window functions', 3, '', '', 0);
+    """)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def ids(conn, query, source):
+    return sorted(hit['id'] for hit in search(conn, query, sources=[source]))
+
+
+def test_search_ranks_and_filters(db_path):
+    conn = open_index(db_path)
+    build_indexes(conn)
+    hits = search(conn, 'subquery')  # porter stemming matches "subqueries"
+    assert [(hit['source'], hit['video_id']) for hit in hits] == [('transcripts', 'v1')]
+    assert '[subqueries]' in hits[0]['snippet']
+    assert ids(conn, 'join', 'videos_fts') == ['v1']
+    assert search(conn, 'join', predicted_label=0) == []
+    assert search(conn, 'pasta', channel_title='Food Channel')[0]['video_id'] == 'v2'
+    conn.close()
+
+
+def test_triggers_keep_index_in_sync(db_path):
+    conn = open_index(db_path)
+    build_indexes(conn)
+    conn.execute("INSERT INTO comments VALUES ('t2', 'v2', 'too much salt', 0, '', '', 0)")
+    assert ids(conn, 'salt', 'comments_fts') == ['t2']
+
+    conn.execute("UPDATE comments SET top_level_text = 'perfectly seasoned' WHERE thread_id = 't2'")
+    assert ids(conn, 'salt', 'comments_fts') == []
+    assert ids(conn, 'seasoned', 'comments_fts') == ['t2']
+
+    # REPLACE deletes the old row first; with recursive_triggers its index entry goes too
+    conn.execute("INSERT OR REPLACE INTO comments VALUES ('t1', 'v1', 'thanks for the lesson', 3, '', '', 0)")
+    assert ids(conn, 'window', 'comments_fts') == []
+    assert ids(conn, 'lesson', 'comments_fts') == ['t1']
+
+    conn.execute("DELETE FROM transcripts WHERE video_id = 'v2'")
+    assert ids(conn, 'boil', 'transcripts_fts') == []
+    for fts_table in ('videos_fts', 'transcripts_fts', 'comments_fts'):
+        conn.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('integrity-check')")
+    conn.close()
+
+
+def test_index_built_before_compression(db_path):
+    pytest.importorskip('zstandard')
+    from compressed_text import CompressedTextStore, compress_source
+
+    conn = open_index(db_path)
+    build_indexes(conn)
+    assert stored_content(conn, 'transcripts_fts') == 'transcripts'
+    store = CompressedTextStore(conn)
+    compress_source(store, 'transcripts', drop_plain=True)
+    compress_source(store, 'comments', drop_plain=True)
+    conn.close()
+
+    conn = open_index(db_path)
+    build_indexes(conn)
+    assert stored_content(conn, 'transcripts_fts') == 'transcripts_fts_content'
+    assert stored_content(conn, 'comments_fts') == 'comments_fts_content'
+    for rebuild in (False, True):
+        build_indexes(conn, rebuild=rebuild)
+        hits = search(conn, 'subquery')
+        assert [hit['id'] for hit in hits] == ['v1']
+        assert '[subqueries]' in hits[0]['snippet']
+        assert '[window]' in search(conn, 'window')[0]['snippet']
+
+    # Rows written after compression are indexed by the triggers as before
+    conn.execute("INSERT INTO comments VALUES ('t2', 'v2', 'too much salt', 0, '', '', 0)")
+    assert ids(conn, 'salt', 'comments_fts') == ['t2']
+    conn.close()
@@ -0,0 +1,69 @@
+import json
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+from googleapiclient.model import JsonModel
+
+import instrumentation
+from instrumentation import Histogram, InstrumentedHttpRequest, Metrics
+
+
+def test_histogram_quantiles():
+    hist = Histogram()
+    for value in [0.003] * 90 + [0.2] * 9 + [42.0]:
+        hist.observe(value)
+    assert (hist.count, hist.max) == (100, 42.0)
+    assert hist.sum == pytest.approx(0.27 + 1.8 + 42.0)
+    assert hist.quantile(0.5) == 0.005
+    assert hist.quantile(0.95) == 0.25
+    # The top bucket reports the largest value seen, not its bound
+    assert hist.quantile(1.0) == 42.0
+
+
+def test_counters_timer_and_prometheus_text(tmp_path):
+    registry = Metrics('unit')
+    registry.inc('youtube_quota_units_total', 100, endpoint='youtube.search.list')
+    registry.inc('youtube_quota_units_total', endpoint='youtube.videos.list')
+    assert registry.total('youtube_quota_units_total') == 101
+    with registry.timer('sqlite_write', table='videos'):
+        pass
+    with pytest.raises(KeyError), registry.timer('sqlite_write', table='videos'):
+        raise KeyError('video_id')
+
+    lines = registry.prometheus_text().splitlines()
+    assert 'youtube_quota_units_total{endpoint="youtube.search.list",job="unit"} 100' in lines
+    assert 'sqlite_write_errors_total{error="KeyError",table="videos",job="unit"} 1' in lines
+    assert 'sqlite_write_seconds_bucket{table="videos",job="unit",le="+Inf"} 2' in lines
+    assert 'sqlite_write_seconds_count{table="videos",job="unit"} 2' in lines
+    buckets = [int(line.rsplit(' ', 1)[1]) for line in lines if line.startswith('sqlite_write_seconds_bucket')]
+    assert buckets == sorted(buckets)  # Cumulative, as Prometheus expects
+
+    path = str(tmp_path / 'unit_metrics.prom')
+    registry.write(path)
+    assert open(path).read() == registry.prometheus_text()
+
+
+class FakeHttp:
+    def __init__(self, status, content):
+        self.status, self.content = status, content
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        return httplib2.Response({'status': self.status}), json.dumps(self.content).encode('utf-8')
+
+
+@pytest.mark.parametrize('status, quota, errors', [('200', 100, 0), ('400', 100, 1), ('403', 0, 1), ('304', 100, 0)])
+def test_quota_charged_per_request(monkeypatch, status, quota, errors):
+    registry = Metrics('unit')
+    monkeypatch.setattr(instrumentation, 'metrics', registry)
+    http = FakeHttp(status, {'items': []} if status == '200' else {'error': {'code': int(status), 'message': ''}})
+    request = InstrumentedHttpRequest(http, JsonModel().response, 'https://youtube.googleapis.com/youtube/v3/search',
+                                      methodId='youtube.search.list')
+    if status == '200':
+        request.execute()
+    else:
+        with pytest.raises(HttpError):
+            request.execute()
+    assert registry.total('youtube_quota_units_total') == quota
+    assert registry.total('youtube_http_errors_total') == errors
+    assert registry.histograms[('youtube_request_seconds', (('endpoint', 'youtube.search.list'),))].count == 1
@@ -0,0 +1,68 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+
+from export_scoring_model import TOLERANCE, create_interaction_features, export
+from numpy_scorer import ScoringModel
+
+
+def xgboost_model():
+    xgboost = pytest.importorskip('xgboost')
+    return xgboost.XGBClassifier(n_estimators=50, max_depth=4, tree_method='hist')
+
+
+MODELS = {
+    'logistic_regression': lambda: LogisticRegression(max_iter=1000),
+    'xgboost': xgboost_model,
+    'random_forest': lambda: RandomForestClassifier(n_estimators=20, max_depth=6, random_state=0),
+    'svm_rbf_sigmoid': lambda: CalibratedClassifierCV(SVC(kernel='rbf'), method='sigmoid', cv=3),
+    'svm_linear_isotonic': lambda: CalibratedClassifierCV(SVC(kernel='linear'), method='isotonic', cv=3),
+}
+# libsvm and the artifact both evaluate SVMs in float64, so only summation order may differ; a kernel
+# computed in float32 is off by ~1e-8 here and up to 1e-6 on the real 3584-wide embeddings
+SVM_TOLERANCE = 1e-10
+
+
+@pytest.fixture(scope='module')
+def embeddings():
+    """float32 unit-norm embeddings, like video_embeddings.npy, with overlapping classes."""
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 2, size=1500)
+    X = rng.normal(size=(1500, 32)).astype(np.float32)
+    X[:, :4] += np.where(y, 0.6, -0.6)[:, None].astype(np.float32)
+    X /= np.linalg.norm(X, axis=1, keepdims=True)
+    return X[:1000], y[:1000], X[1000:], y[1000:]
+
+
+@pytest.mark.parametrize('name', list(MODELS))
+def test_artifact_matches_pickled_pipeline(tmp_path, embeddings, name):
+    X_train, y_train, X_val, y_val = embeddings
+    scaler = StandardScaler().fit(create_interaction_features(X_train))
+    model = MODELS[name]().fit(scaler.transform(create_interaction_features(X_train)), y_train)
+    joblib.dump(model, tmp_path / 'best_model.pkl')
+    joblib.dump(scaler, tmp_path / 'scaler.pkl')
+    np.save(tmp_path / 'X_val.npy', X_val)
+    np.save(tmp_path / 'y_val.npy', y_val)
+    artifact = tmp_path / 'scoring_model.npz'
+    export(tmp_path / 'best_model.pkl', tmp_path / 'scaler.pkl', str(tmp_path), artifact)
+
+    scoring_model = ScoringModel.load(artifact)
+    expected = model.predict_proba(scaler.transform(create_interaction_features(X_val)))[:, 1]
+    probas = scoring_model.predict_proba(X_val)
+    assert np.max(np.abs(probas - expected)) <= (SVM_TOLERANCE if name.startswith('svm') else TOLERANCE)
+    assert np.array_equal(scoring_model.predict(X_val), (expected >= scoring_model.threshold).astype(int))
+
+
+def test_features_keep_input_dtype(embeddings):
+    X_train = embeddings[0]
+    scaler = StandardScaler().fit(create_interaction_features(X_train))
+    header = {'format_version': 1, 'kind': 'linear', 'threshold': 0.5, 'interaction': [0, 1], 'intercept': 0.0}
+    scoring_model = ScoringModel(header, {'scaler_mean': scaler.mean_, 'scaler_scale': scaler.scale_})
+    features = scoring_model.features(X_train)
+    assert features.dtype == np.float32
+    assert np.array_equal(features, scaler.transform(create_interaction_features(X_train)))
@@ -0,0 +1,92 @@
+import json
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+from googleapiclient.model import JsonModel
+
+import response_cache
+from instrumentation import metrics
+from response_cache import CacheMiss, CachedHttpRequest, request_key, setup_cache
+
+URI = 'https://youtube.googleapis.com/youtube/v3/videos?part=snippet&id=abc&key=SECRET&alt=json'
+
+
+class FakeHttp:
+    """httplib2.Http stand-in that answers with queued (status, body) pairs and records the request headers."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent_headers = []
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        self.sent_headers.append(dict(headers or {}))
+        status, content = self.responses.pop(0)
+        return httplib2.Response({'status': status}), json.dumps(content).encode('utf-8') if content else b''
+
+
+def request(http, method_id='youtube.videos.list', uri=URI):
+    return CachedHttpRequest(http, JsonModel().response, uri, methodId=method_id, headers={})
+
+
+@pytest.fixture
+def cache(tmp_path):
+    yield setup_cache(str(tmp_path / 'api_cache.db'), 'revalidate')
+    setup_cache(mode='off')
+
+
+def test_request_key_drops_api_key():
+    assert request_key('youtube.videos.list', URI) == 'youtube.videos.list?alt=json&id=abc&part=snippet'
+
+
+def test_revalidate_sends_etag_and_serves_304_from_cache(cache):
+    body = {'etag': 'E1', 'items': [{'id': 'abc'}]}
+    http = FakeHttp(('200', body), ('304', None))
+    quota = metrics.total('youtube_quota_units_total')
+
+    assert request(http).execute() == body
+    assert 'If-None-Match' not in http.sent_headers[0]
+    assert request(http).execute() == body
+    assert http.sent_headers[1]['If-None-Match'] == 'E1'
+    # The conditional request reached the API, so both calls are charged
+    assert metrics.total('youtube_quota_units_total') - quota == 2
+    assert [count for _, count, *_ in cache.stats()] == [1]
+
+
+def test_changed_resource_replaces_cached_response(cache):
+    http = FakeHttp(('200', {'etag': 'E1', 'items': []}), ('200', {'etag': 'E2', 'items': [{'id': 'abc'}]}))
+    request(http).execute()
+    assert request(http).execute()['etag'] == 'E2'
+    assert cache.get(request_key('youtube.videos.list', URI))[0] == 'E2'
+
+
+def test_errors_are_not_cached(cache):
+    http = FakeHttp(('500', {'error': {'message': 'backend error'}}))
+    with pytest.raises(HttpError):
+        request(http).execute()
+    assert cache.stats() == []
+
+
+def test_prefer_and_replay_make_no_requests(cache):
+    body = {'etag': 'E1', 'items': []}
+    request(FakeHttp(('200', body))).execute()
+    quota = metrics.total('youtube_quota_units_total')
+    for mode in ('prefer', 'replay'):
+        response_cache.cache.mode = mode
+        http = FakeHttp()
+        assert request(http).execute() == body
+        assert http.sent_headers == []
+    assert metrics.total('youtube_quota_units_total') == quota
+
+    with pytest.raises(CacheMiss):
+        request(FakeHttp(), uri=URI.replace('abc', 'xyz')).execute()
+    with pytest.raises(CacheMiss):
+        request(FakeHttp(), method_id='youtube.commentThreads.list').execute()
+
+
+def test_uncached_methods_pass_through(cache):
+    http = FakeHttp(('200', {'items': []}), ('200', {'items': []}))
+    for _ in range(2):
+        request(http, method_id='youtube.commentThreads.list').execute()
+    assert all('If-None-Match' not in headers for headers in http.sent_headers)
+    assert cache.stats() == []
@@ -0,0 +1,65 @@
+import json
+import sqlite3
+
+import pytest
+
+from scrape_videos import (create_table, load_keywords, load_known_video_ids, page_novelty, pending_keywords,
+                           save_state)
+
+FILE_ORDER = ['SQL', 'SQL tutorial', 'SQL window functions', 'database design']
+
+
+@pytest.fixture
+def keywords_file(tmp_path):
+    path = tmp_path / 'search_keywords.json'
+    path.write_text(json.dumps({'keywords': FILE_ORDER}))
+    return path
+
+
+def test_specific_keywords_first(keywords_file):
+    assert load_keywords(keywords_file) == ['SQL window functions', 'database design', 'SQL tutorial', 'SQL']
+    assert load_keywords(keywords_file, specific_first=False) == FILE_ORDER
+
+
+def test_resume_from_saved_state(keywords_file, tmp_path):
+    search_keywords = load_keywords(keywords_file)
+    state_file = tmp_path / 'scraper_state.json'
+    save_state(state_file, 'SQL tutorial', 'PAGE2', {'SQL window functions', 'database design'})
+    state = json.loads(state_file.read_text())
+    assert state == {'nextPageToken': 'PAGE2', 'keyword': 'SQL tutorial',
+                     'completed': ['SQL window functions', 'database design']}
+    # The interrupted keyword comes first, whatever its position in the file
+    assert pending_keywords(search_keywords, state, FILE_ORDER) == (
+        ['SQL tutorial', 'SQL'], {'SQL window functions', 'database design'})
+    # A keyword added to the file later is not skipped
+    assert pending_keywords(search_keywords + ['SQL joins'], state, FILE_ORDER)[0] == [
+        'SQL tutorial', 'SQL', 'SQL joins']
+
+
+def test_resume_from_state_without_completed_list(keywords_file):
+    """State files of the file-order runs only name the interrupted keyword; those before it are done."""
+    search_keywords = load_keywords(keywords_file)
+    state = {'nextPageToken': 'PAGE5', 'keyword': 'SQL window functions'}
+    assert pending_keywords(search_keywords, state, FILE_ORDER) == (
+        ['SQL window functions', 'database design'], {'SQL', 'SQL tutorial'})
+    # An interrupted keyword that left the file does not mark anything as done
+    assert pending_keywords(search_keywords, {'keyword': 'NoSQL'}, FILE_ORDER) == (search_keywords, set())
+    assert pending_keywords(search_keywords, {}, FILE_ORDER) == (search_keywords, set())
+
+
+def test_page_novelty():
+    conn = sqlite3.connect(':memory:')
+    cursor = conn.cursor()
+    create_table(cursor, 'SQL_tutorial')
+    cursor.executemany("INSERT INTO SQL_tutorial (video_id) VALUES (?)", [('a',), ('b',)])
+    cursor.execute("CREATE TABLE videos (video_id TEXT PRIMARY KEY)")
+    cursor.execute("INSERT INTO videos VALUES ('c')")
+    known = load_known_video_ids(cursor, ['SQL tutorial', 'SQL joins'])
+    assert known == {'a', 'b', 'c'}
+
+    assert page_novelty(['a', 'd', 'e', 'd'], known) == (['d', 'e'], 0.5)
+    assert known == {'a', 'b', 'c', 'd', 'e'}
+    # The same videos on a later page, e.g. under a broader keyword, are no longer new
+    assert page_novelty(['d', 'e', 'b'], known) == ([], 0.0)
+    assert page_novelty([], known) == ([], 0.0)
+    conn.close()
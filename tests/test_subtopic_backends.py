@@ -0,0 +1,66 @@
+import pytest
+
+from subtopic_backends import LlamaCppBackend, StreamingCategoryParser, build_output_grammar
+
+CATEGORIES = {'Joins': ['INNER JOIN'], 'Window Functions': ['OVER'], 'Say "Hi"': ['quote']}
+REPLY = '{"matching_categories": ["Joins", "Unknown", "Say \\"Hi\\"", "Joins", "Window Functions"]}'
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, len(REPLY)])
+def test_parser_across_chunk_boundaries(size):
+    parser = StreamingCategoryParser(CATEGORIES)
+    completed = []
+    for start in range(0, len(REPLY), size):
+        completed += parser.feed(REPLY[start:start + size])
+    # Unknown names and repeats are dropped; each category is emitted once, by the chunk that closes it
+    assert completed == parser.categories == ['Joins', 'Say "Hi"', 'Window Functions']
+    assert parser.done
+
+
+def test_parser_emits_each_category_when_its_string_closes():
+    parser = StreamingCategoryParser(CATEGORIES)
+    assert parser.feed('{"matching_categories": ["Jo') == []
+    assert parser.feed('ins", "Window') == ['Joins']
+    assert parser.feed(' Functions"') == ['Window Functions']
+    assert not parser.done
+    assert parser.feed(']} ["Say \\"Hi\\""]') == []
+    assert parser.done and parser.categories == ['Joins', 'Window Functions']
+
+
+def test_parser_skips_strings_before_the_array():
+    parser = StreamingCategoryParser({'matching_categories': [], 'Joins': []})
+    assert parser.feed('{"matching_categories": []}') == []
+    assert parser.done and parser.categories == []
+
+
+def test_build_output_grammar():
+    assert build_output_grammar(CATEGORIES) == (
+        'root ::= "{" ws "\\"matching_categories\\"" ws ":" ws "[" ws (category (ws "," ws category)*)? ws "]" ws "}"\n'
+        'category ::= "\\"Joins\\""\n'
+        '    | "\\"Window Functions\\""\n'
+        '    | "\\"Say \\"Hi\\"\\""\n'
+        'ws ::= [ \\t\\n]{0,8}\n'
+    )
+
+
+def test_constrained_classify_reads_usage_from_stop_event():
+    backend = LlamaCppBackend(category_terms=CATEGORIES, constrained=True)
+    requests = []
+
+    def stream(path, payload):
+        requests.append(payload)
+        for piece in ['{"matching_categories": ["Jo', 'ins"', ']', '}']:
+            yield {'content': piece, 'stop': False}
+        yield {'content': '', 'stop': True, 'tokens_evaluated': 1200, 'tokens_predicted': 9,
+               'timings': {'prompt_n': 200}}
+
+    backend._stream = stream
+    result = backend.classify('---- INFORMATION START -----\nTitle: SQL joins\n')
+    assert requests[0]['grammar'] == build_output_grammar(CATEGORIES)
+    assert result == {
+        'matching_categories': ['Joins'],
+        'raw_model_output': '{"matching_categories": ["Joins"]}',
+        'prompt_tokens': 1200,
+        'cached_tokens': 1000,
+        'completion_tokens': 9,
+    }
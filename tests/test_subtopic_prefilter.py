@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from subtopic_backends import CHAT_SUFFIX, LlamaCppBackend, MockBackend, build_shortlist_block
+from subtopic_prefilter import SubtopicPrefilter, calibrate, decision_counts
+
+NAMES = ['Joins', 'Subqueries', 'Indexes', 'Transactions']
+TERMS = {name: [name.lower()] for name in NAMES}
+
+
+def eval_set():
+    """Ten passages: similarity rows decreasing from 1.0 to 0.1, with the true category at rank 0 or 1."""
+    similarities = np.array([[0.1 * (10 - i), 0.05, 0.02, 0.01] for i in range(10)])
+    similarities[::2, [0, 1]] = similarities[::2, [1, 0]]
+    items = [{'ground_truth': ['Joins']} for _ in range(10)]
+    return similarities, items
+
+
+def test_calibrate_threshold_and_shortlist():
+    similarities, items = eval_set()
+    calibration = calibrate(similarities, items, NAMES, target_recall=0.8)
+    # Two of ten passages may miss the gate; half of the rest have the true category second
+    assert calibration['threshold'] == pytest.approx(0.3)
+    assert calibration['shortlist_size'] == 2
+    assert calibration['eval'] == {'items': 10, 'items_skipped': 2, 'gate_recall': 0.8,
+                                   'category_recall': 0.8, 'recall_lost': pytest.approx(0.2)}
+
+    calibration = calibrate(similarities, items, NAMES, target_recall=1.0)
+    assert calibration['threshold'] == pytest.approx(0.1)
+    assert calibration['eval']['category_recall'] == 1.0
+
+
+def test_calibrate_without_positives_keeps_every_category():
+    similarities, items = eval_set()
+    calibration = calibrate(similarities, [{'ground_truth': []} for _ in items], NAMES)
+    assert calibration['shortlist_size'] == len(NAMES)
+    assert calibration['eval']['category_recall'] == 1.0
+
+
+def test_calibrate_rejects_empty_eval_set():
+    with pytest.raises(ValueError, match='empty evaluation set'):
+        calibrate(np.empty((0, len(NAMES))), [], NAMES)
+
+
+def test_shortlists_and_lazy_decisions():
+    prefilter = SubtopicPrefilter(np.eye(4), NAMES, threshold=0.6, shortlist_size=2)
+    embeddings = np.array([[0.0, 3.0, 1.0, 0.0], [1.0, 1.0, 1.0, 1.0], [0.0, 0.0, 0.0, 2.0]])
+    decisions = prefilter.decide(['a', 'b', 'c'], embeddings, chunk_size=2)
+    assert decisions == {'a': ['Subqueries', 'Indexes'], 'b': None, 'c': ['Transactions', 'Joins']}
+    assert decision_counts(decisions) == (1, 3, 2)
+
+    lazy = prefilter.lazy_decisions(embeddings, {'a': 0, 'b': 1})
+    assert 'a' in lazy and 'c' not in lazy
+    assert lazy['a'] == decisions['a'] and lazy['b'] is None
+
+
+def test_shortlist_follows_the_shared_prefix():
+    backend = LlamaCppBackend(category_terms=TERMS)
+    payloads = []
+
+    def post(path, payload):
+        payloads.append(payload)
+        return {'content': '{"matching_categories": ["Indexes", "Joins"]}'}
+
+    backend._post = post
+    assert backend.classify('VIDEO\n', ['Joins', 'Subqueries'])['matching_categories'] == ['Joins']
+    assert payloads[0]['prompt'] == (backend.prompt_prefix + build_shortlist_block(['Joins', 'Subqueries'])
+                                     + 'VIDEO\n' + CHAT_SUFFIX)
+    assert backend.classify('VIDEO\n')['matching_categories'] == ['Indexes', 'Joins']
+
+    mock = MockBackend(TERMS)
+    mock.warm_prefix()
+    prefix_tokens = len(mock.prompt_prefix.split())
+    assert mock.classify('joins video', ['Joins'])['cached_tokens'] == prefix_tokens
@@ -0,0 +1,106 @@
+import functools
+import json
+import os
+import sqlite3
+import urllib.parse
+
+import httplib2
+import pytest
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+
+import youtube_client
+from video_ids import count_video_ids, iter_video_ids
+from youtube_client import QuotaExhausted, YouTubeClients, load_discovery_document
+
+QUOTA_ERROR = {'error': {'code': 403, 'message': 'quota', 'errors': [{'reason': 'quotaExceeded'}]}}
+
+
+class FakeHttp:
+    """httplib2.Http stand-in that answers with queued (status, body) pairs and records the API key of each request."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.keys = []
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        self.keys.append(dict(urllib.parse.parse_qsl(urllib.parse.urlparse(uri).query))['key'])
+        status, content = self.responses.pop(0)
+        return httplib2.Response({'status': status}), json.dumps(content).encode('utf-8')
+
+
+@pytest.fixture
+def discovery_file(tmp_path):
+    path = tmp_path / 'youtube_v3_discovery.json'
+    path.write_text(get_static_doc('youtube', 'v3'))
+    return str(path)
+
+
+def clients_with(monkeypatch, discovery_file, http, keys=('K1', 'K2')):
+    built = []
+
+    def build(document, **kwargs):
+        built.append(kwargs['developerKey'])
+        return build_from_document(document, http=http, **kwargs)
+
+    build_from_document = youtube_client.build_from_document
+    monkeypatch.setattr(youtube_client, 'build_from_document', build)
+    return YouTubeClients(list(keys), discovery_file), built
+
+
+def test_quota_error_switches_key(monkeypatch, discovery_file):
+    http = FakeHttp(('200', {'items': [1]}), ('403', QUOTA_ERROR), ('200', {'items': [2]}), ('200', {'items': [3]}))
+    clients, built = clients_with(monkeypatch, discovery_file, http)
+    assert built == []  # Clients are built on first use
+    assert clients.execute(('videos', 'list'), part='id', id='a') == {'items': [1]}
+    assert clients.execute(('videos', 'list'), part='id', id='b') == {'items': [2]}
+    assert clients.execute(('videos', 'list'), part='id', id='c') == {'items': [3]}
+    assert http.keys == ['K1', 'K1', 'K2', 'K2']
+    assert built == ['K1', 'K2']
+
+
+def test_all_keys_exhausted(monkeypatch, discovery_file):
+    http = FakeHttp(('403', QUOTA_ERROR), ('403', QUOTA_ERROR))
+    clients, _ = clients_with(monkeypatch, discovery_file, http)
+    with pytest.raises(QuotaExhausted):
+        clients.execute(('videos', 'list'), part='id', id='a')
+    assert http.keys == ['K1', 'K2']
+
+
+def test_other_errors_are_raised(monkeypatch, discovery_file):
+    http = FakeHttp(('403', {'error': {'code': 403, 'message': 'forbidden'}}))
+    clients, _ = clients_with(monkeypatch, discovery_file, http)
+    with pytest.raises(HttpError):
+        clients.execute(('videos', 'list'), part='id', id='a')
+    assert clients.current_key_index == 0
+
+
+def test_discovery_document_fallbacks(monkeypatch, tmp_path, discovery_file):
+    def offline(*args, **kwargs):
+        raise OSError("no network")
+
+    monkeypatch.setattr(youtube_client.urllib.request, 'urlopen', offline)
+    os.utime(discovery_file, (0, 0))
+    # A stale copy is used when it cannot be refreshed, and always under replay
+    assert load_discovery_document(discovery_file)['name'] == 'youtube'
+    assert load_discovery_document(discovery_file, offline=True)['name'] == 'youtube'
+    # Without a copy on disk the bundled document is used
+    missing = str(tmp_path / 'missing.json')
+    assert load_discovery_document(missing)['name'] == 'youtube'
+    assert load_discovery_document(missing, offline=True)['name'] == 'youtube'
+    assert not os.path.exists(missing)
+
+
+def test_iter_video_ids_resumes_in_id_order():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE videos (video_id TEXT PRIMARY KEY, title TEXT)")
+    conn.executemany("INSERT INTO videos VALUES (?, '')", [(video_id,) for video_id in 'dbeac'])
+    assert count_video_ids(conn) == 5
+    assert list(iter_video_ids(conn)) == list(enumerate('abcde'))
+    assert list(iter_video_ids(conn, 3)) == [(3, 'd'), (4, 'e')]
+    assert list(iter_video_ids(conn, 5)) == []
+
+    query = "SELECT video_id FROM videos WHERE video_id > 'b' ORDER BY video_id"
+    assert count_video_ids(conn, query) == 3
+    assert list(iter_video_ids(conn, 1, query)) == [(1, 'd'), (2, 'e')]
+    conn.close()